@@ -0,0 +1,103 @@
+"""The announcements feed and its unread counter
+
+The announcements page shows WINDOW announcements at a time, newest first,
+and loads the older ones a page at a time through a cursor. Each row is a
+cached fragment dropped only when its announcement (or its author) changes.
+
+The counter of the sidebar compares the post times of the newest
+announcements, cached as one list until an announcement changes, with the
+time of the newest one the user has seen, kept in their session. Reading it
+costs a cache get, the session and the user are loaded anyway. The cache is
+per process, so the list also expires like a cached page (page_timeout()):
+an announcement written by another worker shows up in the counter of this
+one at most that late.
+"""
+from typing import Any, List, Optional
+from django.core.cache import cache
+from django.http import HttpRequest
+from .cache import page_timeout
+from .models import Announcement
+
+# announcements on a page, and the most the counter counts
+WINDOW: int = 10
+
+TIMES_KEY: str = "blog:announcements:times"
+SEEN_KEY: str = "blog_announcements_seen"
+
+
+def newest_first() -> Any:
+    return Announcement.objects.select_related("author__profile").order_by("-datePosted", "-id")
+
+
+def times_query() -> Any:
+    # one more than the window, the counter shows "10+" past it
+    return Announcement.objects.order_by("-datePosted", "-id").values_list(
+        "datePosted", flat=True
+    )[: WINDOW + 1]
+
+
+def recent_times() -> List[float]:
+    """Timestamps of the newest announcements, newest first"""
+    return cache.get_or_set(
+        TIMES_KEY, lambda: [posted.timestamp() for posted in times_query()], page_timeout()
+    )
+
+
+async def arecent_times() -> List[float]:
+    """recent_times for the async views"""
+    times: Optional[List[float]] = await cache.aget(TIMES_KEY)
+    if times is None:
+        times = [posted.timestamp() async for posted in times_query()]
+        await cache.aset(TIMES_KEY, times, page_timeout())
+    return times
+
+
+def evict() -> None:
+    cache.delete(TIMES_KEY)
+
+
+def seen(request: HttpRequest) -> float:
+    """Time of the newest announcement the user has seen, or when they joined"""
+    return request.session.get(SEEN_KEY, request.user.date_joined.timestamp())
+
+
+def count_unread(request: HttpRequest, times: List[float]) -> int:
+    last: float = seen(request)
+    request.unread_announcements = sum(1 for posted in times if posted > last)
+    return request.unread_announcements
+
+
+def unread(request: HttpRequest) -> Optional[int]:
+    """Announcements the user hasn't seen, None for the anonymous users, counted
+    once per request"""
+    if not request.user.is_authenticated:
+        return None
+    if hasattr(request, "unread_announcements"):
+        return request.unread_announcements
+    return count_unread(request, recent_times())
+
+
+async def aunread(request: HttpRequest) -> Optional[int]:
+    """unread for the async views, call it before the render (which can't query)"""
+    if not request.user.is_authenticated:
+        return None
+    if hasattr(request, "unread_announcements"):
+        return request.unread_announcements
+    return count_unread(request, await arecent_times())
+
+
+def mark_seen(request: HttpRequest, shown: List[Announcement]) -> None:
+    """The first page shows the newest announcements"""
+    if not request.user.is_authenticated or not shown:
+        return
+    newest: float = max(announcement.datePosted.timestamp() for announcement in shown)
+    if newest > seen(request):
+        request.session[SEEN_KEY] = newest
+    request.unread_announcements = 0
+
+
+def label(unread_count: Optional[int]) -> str:
+    """What the sidebar shows next to the link"""
+    if not unread_count:
+        return ""
+    return f"{WINDOW}+" if unread_count > WINDOW else str(unread_count)
@@ -0,0 +1,167 @@
+"""Read only JSON API of the posts and announcements
+
+Rows are serialized from .values() dicts, never from model instances. A list
+answers a page of ?limit= rows, newest first, with the urls of the pages
+around it (see CursorPaginator), ?fields= picks the columns and
+?format=ndjson streams every row instead, a JSON object per line, for the
+exports.
+"""
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.generic import View
+from .models import Announcement, Post
+from .pagination import CursorPage, CursorPaginator, InvalidCursor
+
+MAX_LIMIT: int = 100
+
+# rows fetched and written out at a time by the NDJSON mode
+STREAM_CHUNK: int = 2000
+
+
+class InvalidParameter(ValueError):
+    """A query parameter of the request can't be used"""
+
+
+class NotFound(LookupError):
+    """The rows of the request belong to nothing"""
+
+
+class RowCursorPaginator(CursorPaginator):
+    """CursorPaginator of .values() rows"""
+
+    def key_of(self, obj: Any) -> Any:
+        return obj[self.field]
+
+    def pk_of(self, obj: Any) -> int:
+        return obj["id"]
+
+
+class ListAPIView(View):
+    """A list of rows of model, as JSON pages or as NDJSON"""
+
+    replica_reads: bool = True  # see blog/replicas.py
+    model: type = Post
+    # name in the JSON: lookup of the column
+    columns: Dict[str, str] = {}
+    default_fields: List[str] = []
+    limit: int = 20
+
+    def get_queryset(self) -> QuerySet:
+        return self.model.objects.all()
+
+    def get_fields(self) -> Dict[str, str]:
+        """The columns asked for in ?fields=, comma separated"""
+        names: List[str] = [
+            name for name in self.request.GET.get("fields", "").split(",") if name
+        ] or self.default_fields
+        unknown: List[str] = [name for name in names if name not in self.columns]
+        if unknown:
+            raise InvalidParameter(
+                f"Unknown fields {', '.join(unknown)}, the fields are {', '.join(self.columns)}"
+            )
+        return {name: self.columns[name] for name in names}
+
+    def get_limit(self) -> int:
+        try:
+            limit: int = int(self.request.GET.get("limit", self.limit))
+        except ValueError as error:
+            raise InvalidParameter("limit must be a number") from error
+        if not 1 <= limit <= MAX_LIMIT:
+            raise InvalidParameter(f"limit must be between 1 and {MAX_LIMIT}")
+        return limit
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        try:
+            fields: Dict[str, str] = self.get_fields()
+            # the cursors need the ordering columns even when they aren't asked for
+            rows: QuerySet = self.get_queryset().values(
+                *dict.fromkeys([*fields.values(), "id", "datePosted"])
+            )
+            if request.GET.get("format") == "ndjson":
+                return StreamingHttpResponse(
+                    stream(rows, fields), content_type="application/x-ndjson"
+                )
+            page: CursorPage = RowCursorPaginator(rows, self.get_limit()).page(
+                request.GET.get("cursor")
+            )
+        except (InvalidParameter, InvalidCursor) as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        except NotFound as error:
+            return JsonResponse({"error": str(error)}, status=404)
+        return JsonResponse(
+            {
+                "results": [serialize(row, fields) for row in page],
+                "next": self.link(page.next_cursor),
+                "previous": self.link(page.previous_cursor),
+            }
+        )
+
+    def link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query["cursor"] = cursor
+        return f"{self.request.path}?{query.urlencode()}"
+
+
+def serialize(row: Dict[str, Any], fields: Dict[str, str]) -> Dict[str, Any]:
+    return {name: row[lookup] for name, lookup in fields.items()}
+
+
+def stream(rows: QuerySet, fields: Dict[str, str]) -> Iterator[str]:
+    """Every row newest first, STREAM_CHUNK lines per write"""
+    # the response is read after the view returned, outside of the routing of its request
+    rows = rows.using(rows.db).order_by("-datePosted", "-id")
+    encode = DjangoJSONEncoder().encode
+    iterator: Iterator[Dict[str, Any]] = rows.iterator(chunk_size=STREAM_CHUNK)
+    while chunk := list(islice(iterator, STREAM_CHUNK)):
+        yield "".join(f"{encode(serialize(row, fields))}\n" for row in chunk)
+
+
+class PostListAPIView(ListAPIView):
+    """/api/posts/"""
+
+    model: type = Post
+    columns: Dict[str, str] = {
+        "id": "id",
+        "title": "title",
+        "excerpt": "excerpt",
+        "content": "content",
+        "datePosted": "datePosted",
+        "updated": "updated",
+        "author": "author__username",
+    }
+    default_fields: List[str] = ["id", "title", "excerpt", "datePosted", "author"]
+
+
+class UserPostListAPIView(PostListAPIView):
+    """/api/posts/<username>/"""
+
+    def get_queryset(self) -> QuerySet:
+        author_id: Optional[int] = (
+            User.objects.filter(username=self.kwargs["username"])
+            .values_list("id", flat=True)
+            .first()
+        )
+        if author_id is None:
+            raise NotFound(f"No user named {self.kwargs['username']!r}")
+        return Post.objects.filter(author_id=author_id)
+
+
+class AnnouncementListAPIView(ListAPIView):
+    """/api/announcements/"""
+
+    model: type = Announcement
+    columns: Dict[str, str] = {
+        "id": "id",
+        "title": "title",
+        "context": "context",
+        "datePosted": "datePosted",
+        "updated": "updated",
+        "author": "author__username",
+    }
+    default_fields: List[str] = ["id", "title", "context", "datePosted", "author"]
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field: str = "django.db.models.BigAutoField"
     name: str = "blog"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        import blog.instrumentation
+        import blog.signals
+        import blog.sqlite
+
+        post_migrate.connect(blog.signals.reinstall_search_triggers, sender=self)
+        connection_created.connect(blog.sqlite.apply_pragmas)
+        connection_created.connect(blog.instrumentation.install_query_timer)
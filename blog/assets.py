@@ -0,0 +1,234 @@
+"""Static asset pipeline
+
+The third party files are vendored under blog/static/blog/vendor by
+manage.py vendor_assets, which checks them against the integrity hashes they
+were loaded with from the CDNs. At collectstatic BundledManifestStorage
+concatenates and minifies each bundle of BUNDLES, gives every file a content
+hashed name (ManifestStaticFilesStorage) and writes gzip and, when the brotli
+package is installed, brotli variants next to them. collectstatic then
+checks that the templates only reference static files by names that went
+into the manifest (see unhashed_references).
+
+StaticAssetMiddleware serves the collected files when no web server does,
+with the precompressed variant the client accepts and far future headers for
+the hashed names.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpRequest, HttpResponse
+from django.template.utils import get_app_template_dirs
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # the gzip variants are enough
+    brotli = None
+
+# vendored file: (url it came from, integrity of that file)
+VENDOR: Dict[str, Tuple[str, str]] = {
+    "blog/vendor/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+        "sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN",
+    ),
+}
+
+# bundle: the files it is made of, in order
+BUNDLES: Dict[str, List[str]] = {
+    "blog/site.css": ["blog/vendor/bootstrap.min.css", "blog/main.css"],
+}
+
+COMPRESSED_EXTENSIONS: Tuple[str, ...] = (".css", ".js", ".svg", ".txt", ".xml", ".json")
+TEMPLATE_EXTENSIONS: Tuple[str, ...] = (".html", ".txt", ".xml")
+
+# a year, the longest max-age caches are asked to honour
+FAR_FUTURE: int = 365 * 24 * 60 * 60
+
+
+class MissingAsset(FileNotFoundError):
+    """A file of a bundle can't be found, the vendored ones come from vendor_assets"""
+
+
+def minify_css(css: str) -> str:
+    """Drops the comments and the whitespace the browsers don't need"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)  # a space before it is a descendant selector
+    return css.replace(";}", "}").strip()
+
+
+def build_bundle(name: str) -> str:
+    """The minified content of a bundle, from the files the finders find"""
+    parts: List[str] = []
+    for part in BUNDLES[name]:
+        path: Optional[str] = finders.find(part)
+        if path is None:
+            raise MissingAsset(f"{part} of {name} not found, run manage.py vendor_assets")
+        parts.append(minify_css(Path(path).read_text(encoding="utf-8")))
+    return "\n".join(parts)
+
+
+def compress(path: str) -> None:
+    """Writes path.gz and path.br next to the file"""
+    data: bytes = Path(path).read_bytes()
+    Path(f"{path}.gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f"{path}.br").write_bytes(brotli.compress(data))
+
+
+class BundledManifestStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that builds the bundles first and
+    precompresses the hashed files"""
+
+    def post_process(
+        self, paths: Dict[str, Any], dry_run: bool = False, **options: Any
+    ) -> Iterator[Tuple[str, str, bool]]:
+        if not dry_run:
+            for name in BUNDLES:
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(build_bundle(name).encode()))
+                paths[name] = (self, name)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not dry_run and name.endswith(COMPRESSED_EXTENSIONS):
+                compress(self.path(hashed_name))
+            yield name, hashed_name, processed
+
+
+# {% static "x" %} and {% stylesheets "x" %} of the Django templates, static("x") and
+# stylesheets("x") of the Jinja2 ones
+STATIC_REFERENCE: re.Pattern = re.compile(
+    r"""{%\s*(?:static|stylesheets)\s+["']([^"']+)["']"""
+    r"""|\b(?:static|stylesheets)\(\s*["']([^"']+)["']"""
+)
+# css and js loaded by url instead of through static
+HARDCODED_ASSET: re.Pattern = re.compile(
+    r"""(?:src|href)=["']((?:https?:)?//[^"']+\.(?:css|js)|/static/[^"']*)["']"""
+)
+
+
+def template_files() -> Iterator[Path]:
+    dirs: List[Path] = [
+        Path(directory)
+        for dirname in ("templates", "jinja2")
+        for directory in get_app_template_dirs(dirname)
+    ]
+    dirs += [Path(directory) for engine in settings.TEMPLATES for directory in engine["DIRS"]]
+    for directory in dirs:
+        yield from sorted(
+            path for path in directory.rglob("*") if path.suffix in TEMPLATE_EXTENSIONS
+        )
+
+
+def unhashed_references(manifest: Dict[str, str]) -> List[str]:
+    """The references of the templates to static files that have no hashed name"""
+    problems: List[str] = []
+    for path in template_files():
+        source: str = path.read_text(encoding="utf-8")
+        for match in STATIC_REFERENCE.finditer(source):
+            name: str = match.group(1) or match.group(2)
+            if name not in manifest:
+                problems.append(f"{path}: {name} is not in the manifest")
+        for match in HARDCODED_ASSET.finditer(source):
+            problems.append(f"{path}: {match.group(1)} is not loaded through static")
+    return problems
+
+
+def is_bundled() -> bool:
+    """Whether the static files are served collected, bundled and hashed"""
+    return isinstance(staticfiles_storage, BundledManifestStorage)
+
+
+def hashed_names() -> Set[str]:
+    """The content hashed names of the manifest"""
+    return set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """The codings of an Accept-Encoding header and their q-values"""
+    accepted: Dict[str, float] = {}
+    for token in header.split(","):
+        coding, *params = [part.strip() for part in token.split(";")]
+        if not coding:
+            continue
+        quality: float = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """Serves settings.STATIC_ROOT, put it first in MIDDLEWARE"""
+
+    sync_capable: bool = True
+    async_capable: bool = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response: Callable = get_response
+        self.prefix: str = "/" + settings.STATIC_URL.lstrip("/")
+        self.hashed: Optional[Set[str]] = None  # read from the manifest on first use
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        response: Optional[HttpResponse] = self.serve(request)
+        return self.get_response(request) if response is None else response
+
+    async def acall(self, request: HttpRequest) -> HttpResponse:
+        response: Optional[HttpResponse] = self.serve(request)
+        return await self.get_response(request) if response is None else response
+
+    def serve(self, request: HttpRequest) -> Optional[HttpResponse]:
+        if request.method not in ("GET", "HEAD") or not request.path.startswith(self.prefix):
+            return None
+        name: str = request.path[len(self.prefix) :]
+        try:
+            path: str = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        accepted: Dict[str, float] = accepted_encodings(
+            request.headers.get("Accept-Encoding", "")
+        )
+        served: str = path
+        encoding: Optional[str] = None
+        best: float = 0.0
+        for suffix, coding in [(".br", "br"), (".gz", "gzip")]:
+            quality: float = accepted.get(coding, accepted.get("*", 0.0))
+            # br wins the ties, it is the smaller one
+            if quality > best and os.path.isfile(path + suffix):
+                served, encoding, best = path + suffix, coding, quality
+        response: FileResponse = FileResponse(
+            open(served, "rb"),
+            content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        )
+        if encoding:
+            response["Content-Encoding"] = encoding
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if self.hashed is None:
+            self.hashed = hashed_names()
+        if name in self.hashed:
+            patch_cache_control(response, public=True, max_age=FAR_FUTURE, immutable=True)
+        else:
+            patch_cache_control(response, no_cache=True)
+        return response
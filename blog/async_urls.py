@@ -0,0 +1,26 @@
+"""URls of the blog with the read only views served by the async views,
+used instead of blog.urls when settings.BLOG_ASYNC_VIEWS is on"""
+from django.urls import path
+from .async_views import (
+    AsyncPostListView,
+    AsyncPostDetailView,
+    AsyncUserPostListView,
+    AsyncLatestPostsView,
+    AsyncAnnouncementsView,
+)
+from .urls import urlpatterns as sync_urlpatterns
+
+async_views = {
+    "blog-home": AsyncPostListView,
+    "post-detail": AsyncPostDetailView,
+    "allposts-user": AsyncUserPostListView,
+    "posts-latest": AsyncLatestPostsView,
+    "announcements": AsyncAnnouncementsView,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), async_views[pattern.name].as_view(), name=pattern.name)
+    if pattern.name in async_views
+    else pattern
+    for pattern in sync_urlpatterns
+]
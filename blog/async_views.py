@@ -0,0 +1,233 @@
+# pylint: disable=relative-beyond-top-level
+
+"""Async versions of the read only views
+
+Under ASGI the views in views.py run in the sync_to_async thread pool. These
+run on the event loop, load everything the templates need with the async ORM
+and render without touching the database, so they can be routed instead of
+the sync ones (see blog/async_urls.py and settings.BLOG_ASYNC_VIEWS).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Page
+from django.db.models.query import QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+from django.views.generic import View
+from django.views.generic.base import TemplateResponseMixin
+from . import announcements, counters, recent
+from .cache import agenerations, is_cacheable, page_key, page_timeout
+from .conditional import context_validators, is_conditional, not_modified, set_validators
+from .models import Post
+from .pagination import CountedPaginator, CursorPaginator, InvalidCursor
+
+
+class AsyncReadView(TemplateResponseMixin, View):
+    """Base of the async views, serves anonymous hits from the page cache
+    like PageCacheMixin and renders the context of get_context_data"""
+
+    title: str = ""
+    replica_reads: bool = True  # see blog/replicas.py
+
+    def get_cache_scopes(self) -> Optional[List[str]]:
+        """Scopes of the page cache, None keeps the view out of it"""
+        return None
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        # resolves the lazy user here so the templates don't query while rendering
+        request.user = await request.auser()
+        await announcements.aunread(request)
+        scopes: Optional[List[str]] = self.get_cache_scopes()
+        key: Optional[str] = None
+        if scopes and is_cacheable(request):
+            key = page_key(request, scopes, await agenerations(scopes))
+            cached: Optional[HttpResponse] = await cache.aget(key)
+            if cached is not None:
+                return not_modified(request, cached)
+
+        context: Dict[str, Any] = await self.get_context_data()
+        response: HttpResponse = HttpResponse()
+        if is_conditional(request):
+            etag: str = context_validators(request, context)
+            set_validators(response, etag, request.user.is_authenticated)
+            unchanged: HttpResponse = not_modified(request, response)
+            if unchanged is not response:
+                return unchanged
+        context.update(view=self, title=self.title, fragment_timeout=page_timeout())
+        response.content = render_to_string(self.get_template_names(), context, request)
+        if key:
+            await cache.aset(key, response, page_timeout())
+        return response
+
+
+class AsyncPostListMixin:
+    """Paginates posts like CursorPaginationMixin and CountedPaginator do"""
+
+    paginate_by: int = 5
+    context_object_name: str = "posts"
+
+    def get_queryset(self) -> QuerySet[Post]:
+        raise NotImplementedError
+
+    def get_count_key(self) -> str:
+        return counters.ALL_POSTS
+
+    def from_recent(self) -> bool:
+        """Whether the first page can come from the recent posts of the process"""
+        return False
+
+    async def paginate(self, queryset: QuerySet[Post]) -> Dict[str, Any]:
+        cursor: bool = getattr(settings, "BLOG_PAGINATION_MODE", "offset") == "cursor"
+        window: Optional[Tuple[List[Post], int]] = None
+        paginator: Any
+        page: Any
+        if self.from_recent() and recent.is_first_page(self.request, cursor):
+            window = await recent.recent.anewest(self.paginate_by + 1)
+        if window is not None:
+            paginator, page = recent.first_page(queryset, self.paginate_by, cursor, window)
+        elif cursor:
+            paginator = CursorPaginator(queryset, self.paginate_by)
+            try:
+                direction, query = paginator.page_query(self.request.GET.get("cursor"))
+            except InvalidCursor as error:
+                raise Http404(str(error)) from error
+            page = paginator.build_page(
+                direction, [post async for post in query.aiterator()]
+            )
+        else:
+            paginator = CountedPaginator(
+                queryset, self.paginate_by, count_key=self.get_count_key()
+            )
+            paginator.count = await counters.aget(paginator.count_key)
+            number: Any = self.request.GET.get("page") or 1
+            try:
+                if number == "last":
+                    number = paginator.num_pages
+                number = paginator.validate_number(number)
+            except InvalidPage as error:
+                raise Http404(str(error)) from error
+            bottom: int = (number - 1) * self.paginate_by
+            rows: List[Post] = [
+                post
+                async for post in queryset[bottom : bottom + self.paginate_by].aiterator()
+            ]
+            page = Page(rows, number, paginator)
+        return {
+            "paginator": paginator,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+            "object_list": page.object_list,
+            self.context_object_name: page.object_list,
+        }
+
+
+class AsyncPostListView(AsyncPostListMixin, AsyncReadView):
+    """Async PostListView"""
+
+    template_name: str = "blog/home.html"
+    title: str = "Home"
+
+    def get_cache_scopes(self) -> List[str]:
+        return ["posts", "users"]
+
+    def get_queryset(self) -> QuerySet[Post]:
+        return Post.objects.for_listing().order_by("-datePosted", "-id")
+
+    def from_recent(self) -> bool:
+        return True
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        return await self.paginate(self.get_queryset())
+
+
+class AsyncUserPostListView(AsyncPostListMixin, AsyncReadView):
+    """Async UserPostListView"""
+
+    template_name: str = "blog/allpostuser.html"
+
+    def get_cache_scopes(self) -> List[str]:
+        return [f"author:{self.kwargs.get('username')}", "users"]
+
+    def get_queryset(self) -> QuerySet[Post]:
+        return Post.objects.for_listing().filter(author=self.user).order_by("-datePosted", "-id")
+
+    def get_count_key(self) -> str:
+        return counters.author_key(self.user.pk)
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        try:
+            self.user: User = await User.objects.aget(username=self.kwargs.get("username"))
+        except User.DoesNotExist as error:
+            raise Http404("No user found") from error
+        self.title = f"Posts of {self.user}"
+        return await self.paginate(self.get_queryset())
+
+
+class AsyncPostDetailView(AsyncReadView):
+    """Async PostDetailView"""
+
+    template_name: str = "blog/post_detail.html"
+    title: str = "Detail"
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        try:
+            post: Post = await Post.objects.select_related("author__profile").aget(
+                pk=self.kwargs["pk"]
+            )
+        except Post.DoesNotExist as error:
+            raise Http404("No post found") from error
+        return {"post": post, "object": post}
+
+
+class AsyncLatestPostsView(AsyncReadView):
+    """Async LatestPostsView"""
+
+    template_name: str = "blog/latest_posts.html"
+    title: str = "Latest Posts"
+
+    def get_cache_scopes(self) -> List[str]:
+        return ["posts", "users"]
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        window: Optional[Tuple[List[Post], int]] = await recent.recent.anewest(4)
+        if window is None:
+            queryset: QuerySet[Post] = Post.objects.for_listing().order_by("-datePosted", "-id")
+            posts: List[Post] = [post async for post in queryset[:4].aiterator()]
+        else:
+            posts = window[0]
+        return {"latest_posts": posts, "object_list": posts}
+
+
+class AsyncAnnouncementsView(AsyncReadView):
+    """Async AnnouncementsView"""
+
+    template_name: str = "blog/announcements.html"
+    title: str = "Announcements"
+
+    def get_cache_scopes(self) -> List[str]:
+        return ["announcements", "users"]
+
+    async def get_context_data(self) -> Dict[str, Any]:
+        paginator: CursorPaginator = CursorPaginator(
+            announcements.newest_first(), announcements.WINDOW
+        )
+        cursor: Optional[str] = self.request.GET.get("cursor")
+        try:
+            direction, query = paginator.page_query(cursor)
+        except InvalidCursor as error:
+            raise Http404(str(error)) from error
+        page: Any = paginator.build_page(direction, [item async for item in query.aiterator()])
+        if not cursor:
+            announcements.mark_seen(self.request, page.object_list)
+        return {
+            "paginator": paginator,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+            "object_list": page.object_list,
+            "announcements": page.object_list,
+        }
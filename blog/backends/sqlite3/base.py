@@ -0,0 +1,41 @@
+"""The SQLite backend with the transaction_mode option of Django 5.1
+
+A transaction opened with a plain BEGIN reads before it writes. When another
+connection commits in between, SQLite can't upgrade it to a writer and fails
+at once with "database is locked", busy_timeout doesn't help. With
+OPTIONS["transaction_mode"] = "IMMEDIATE" the atomic blocks take the write
+lock at BEGIN, waiting for it up to busy_timeout. Once on Django 5.1 the
+ENGINE can go back to django.db.backends.sqlite3 with the same OPTIONS; until
+then this backend leaves the option to the base class on Django 5.1 and later,
+which pops it and sets transaction_mode itself.
+"""
+from typing import Any, Dict, Optional
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """django.db.backends.sqlite3 that starts the transactions with BEGIN <mode>"""
+
+    transaction_mode: Optional[str] = None
+
+    def get_connection_params(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = super().get_connection_params()
+        if django.VERSION >= (5, 1):  # already popped into self.transaction_mode
+            return kwargs
+        mode: Optional[str] = kwargs.pop("transaction_mode", None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES transaction_mode must be one of {', '.join(TRANSACTION_MODES)}"
+            )
+        self.transaction_mode = mode.upper() if mode else None
+        return kwargs
+
+    def _start_transaction_under_autocommit(self) -> None:
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
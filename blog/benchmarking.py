@@ -0,0 +1,101 @@
+"""Helpers shared by the bench_* management commands"""
+import itertools
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from users.models import Profile
+from . import counters
+from .models import Announcement, AnnouncementFactory, Post, PostFactory
+
+NO_CACHE: Dict[str, Any] = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+@contextmanager
+def temporary_database(file: Optional[str] = None) -> Iterator[None]:
+    """Runs the block against a throw away database so benchmarks never touch
+    real data. SQLite test databases live in memory unless a file is given,
+    which the benchmarks of concurrent connections need"""
+    debug: bool = settings.DEBUG
+    allowed_hosts: List[str] = settings.ALLOWED_HOSTS
+    test_name: Optional[str] = connection.settings_dict["TEST"]["NAME"]
+    settings.DEBUG = False  # keeps connection.queries from growing while seeding
+    settings.ALLOWED_HOSTS = [*allowed_hosts, "testserver"]  # host of the test clients
+    if file:
+        connection.settings_dict["TEST"]["NAME"] = file
+    old_name: str = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict["TEST"]["NAME"] = test_name
+        settings.DEBUG = debug
+        settings.ALLOWED_HOSTS = allowed_hosts
+
+
+def seed_users(count: int) -> List[User]:
+    """Creates users with their profiles in bulk"""
+    User.objects.bulk_create(
+        User(username=f"bench{i}", email=f"bench{i}@example.com") for i in range(count)
+    )
+    users: List[User] = list(User.objects.filter(username__startswith="bench"))
+    Profile.objects.bulk_create(Profile(user=user) for user in users)
+    return users
+
+
+def seed_posts(
+    count: int, users: List[User], batch_size: int = 5000, seed: int = 0, skew: float = 0.0
+) -> None:
+    """Creates posts with PostFactory spread over the given users, the first
+    users write the most with a skew above 0 (the user of rank k writes in
+    proportion to 1 / k ** skew, Zipf's law). bulk_create skips save() and the
+    signals so the excerpts are set here and the counters rebuilt at the end"""
+    rng: random.Random = random.Random(seed)
+    weights: Optional[List[float]] = None
+    if skew:
+        weights = list(itertools.accumulate(1 / rank**skew for rank in range(1, len(users) + 1)))
+    for start in range(0, count, batch_size):
+        size: int = min(batch_size, count - start)
+        authors: List[User] = rng.choices(users, cum_weights=weights, k=size)
+        posts: List[Post] = [PostFactory.build(author=author) for author in authors]
+        for post in posts:
+            # Faker's date_time is naive, each naive row would warn under USE_TZ
+            post.datePosted = timezone.make_aware(post.datePosted, dt_timezone.utc)
+            post.fill_excerpt()
+        Post.objects.bulk_create(posts)
+    counters.rebuild()
+
+
+def seed_announcements(count: int, users: List[User]) -> None:
+    """Creates an announcement a day until today"""
+    now: datetime = timezone.now()
+    Announcement.objects.bulk_create(
+        AnnouncementFactory.build(author=users[i % len(users)], datePosted=now - timedelta(days=i))
+        for i in range(count)
+    )
+
+
+def percentiles(timings: List[float]) -> Dict[str, float]:
+    """p50, p95 and p99 of the timings"""
+    cuts: List[float] = statistics.quantiles(timings, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Returns the median wall time of func in milliseconds"""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
@@ -0,0 +1,126 @@
+"""Cache of the public blog pages
+
+Anonymous GET responses are cached whole. Every cached page belongs to one or
+more scopes ("posts", "author:<username>", "announcements", "users") and the
+cache key contains the current generation of each of them, so a save only has
+to bump the generations it touches and the stale pages are never read again.
+
+Logged in users get their own page but every post row is rendered from a
+fragment cached by post id, only the Update/Delete buttons are rendered per
+user on top of it.
+"""
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpRequest, HttpResponse
+from . import replicas
+
+
+def page_timeout() -> int:
+    """Seconds a cached page lives at most, a page read from a replica may
+    miss the writes of the last moments so it lives no longer than the
+    primary pin of the writer"""
+    timeout: int = getattr(settings, "BLOG_PAGE_CACHE_TIMEOUT", 60 * 10)
+    if replicas.current.get():
+        return min(timeout, replicas.pin_seconds())
+    return timeout
+
+
+def generation_key(scope: str) -> str:
+    return f"blog:gen:{scope}"
+
+
+def generations(scopes: Iterable[str]) -> List[Any]:
+    """Returns the current generation of each scope, starting the missing ones"""
+    keys: List[str] = [generation_key(scope) for scope in scopes]
+    found: dict = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # a fresh timestamp never collides with a generation evicted earlier
+            found[key] = time.time_ns()
+            cache.set(key, found[key], None)
+    return [found[key] for key in keys]
+
+
+async def agenerations(scopes: Iterable[str]) -> List[Any]:
+    """generations for the async views"""
+    keys: List[str] = [generation_key(scope) for scope in scopes]
+    found: dict = await cache.aget_many(keys)
+    missing: dict = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes: str) -> None:
+    """Makes every page cached under the scopes unreachable"""
+    now: int = time.time_ns()
+    cache.set_many({generation_key(scope): now for scope in scopes}, None)
+
+
+def page_key(request: HttpRequest, scopes: List[str], versions: List[Any] = None) -> str:
+    """Cache key of a page, it changes as soon as one of its scopes is bumped"""
+    if versions is None:
+        versions = generations(scopes)
+    path: str = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"blog:page:{path}:{'.'.join(str(version) for version in versions)}"
+
+
+def delete_post_rows(post_ids: Iterable[int]) -> None:
+    """Drops the cached fragments of blog/post_row.html for the posts"""
+    keys: List[str] = []
+    for post_id in post_ids:
+        keys.append(make_template_fragment_key("post-row-by", [post_id, True]))
+        keys.append(make_template_fragment_key("post-row-by", [post_id, False]))
+        keys.append(make_template_fragment_key("post-row-body", [post_id]))
+    cache.delete_many(keys)
+
+
+def delete_announcement_rows(announcement_ids: Iterable[int]) -> None:
+    """Drops the cached rows of blog/announcements.html for the announcements"""
+    cache.delete_many(
+        [make_template_fragment_key("announcement-row", [pk]) for pk in announcement_ids]
+    )
+
+
+def is_cacheable(request: HttpRequest) -> bool:
+    """Only anonymous reads without pending flash messages share a page"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if request.user.is_authenticated:
+        return False
+    return len(messages.get_messages(request)) == 0
+
+
+class PageCacheMixin:
+    """Serves anonymous GET requests of a view from the page cache"""
+
+    def get_cache_scopes(self) -> List[str]:
+        raise NotImplementedError
+
+    def get_context_data(self, **kwargs: Any) -> Dict[Any, Any]:
+        context: Dict[Any, Any] = super().get_context_data(**kwargs)
+        context["fragment_timeout"]: int = page_timeout()
+        return context
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        self.kwargs = kwargs
+        key: str = page_key(request, self.get_cache_scopes())
+        cached: Optional[HttpResponse] = cache.get(key)
+        if cached is not None:
+            return cached
+
+        response: HttpResponse = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, rendered, page_timeout())
+            )
+        return response
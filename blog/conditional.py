@@ -0,0 +1,84 @@
+"""Conditional GET of the read only pages
+
+The validators of a page are computed from the rows it shows, before its
+template is rendered: the ETag hashes their ids, updated times and the author
+fields the templates render, together with the pagination and the viewer.
+A request whose If-None-Match still matches gets a 304 without a render, a
+200 carries the validators so the page cache keeps them with the page.
+
+No page has a Last-Modified: a list also changes when one of its posts is
+deleted and the detail page when its author renames or changes picture, no
+updated time records those.
+"""
+import hashlib
+from typing import Any, Dict, Iterable, Tuple
+from django.contrib import messages
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from . import announcements
+
+
+def fingerprint(row: Any) -> Tuple[Any, ...]:
+    """What a page renders of a post or an announcement and can change"""
+    profile: Any = getattr(row.author, "profile", None)
+    return (row.pk, row.updated, row.author.username, getattr(profile, "image_hash", ""))
+
+
+def is_conditional(request: HttpRequest) -> bool:
+    """Pages with pending flash messages are never the same twice"""
+    return request.method in ("GET", "HEAD") and len(messages.get_messages(request)) == 0
+
+
+def validators(request: HttpRequest, rows: Iterable[Any], *extra: Any) -> str:
+    """ETag of the rows shown to the user of the request, and of their unread counter"""
+    viewer: Any = 0
+    if request.user.is_authenticated:
+        viewer = (request.user.pk, announcements.unread(request))
+    marks: list = [fingerprint(row) for row in rows]
+    digest: str = hashlib.md5(repr((viewer, marks, extra)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def context_validators(request: HttpRequest, context: Dict[str, Any]) -> str:
+    """ETag of a detail (object) or list (object_list) context"""
+    if "object" in context:
+        return validators(request, [context["object"]])
+    page: Any = context.get("page_obj")
+    extra: Tuple[Any, ...] = ()
+    if page is not None:
+        extra = (
+            page.has_previous(),
+            page.has_next(),
+            getattr(context.get("paginator"), "count", None),
+        )
+    return validators(request, context["object_list"], *extra)
+
+
+def set_validators(response: HttpResponse, etag: str, private: bool) -> None:
+    response["ETag"] = etag
+    # stored by the browsers and the CDN but revalidated on every use
+    patch_cache_control(response, no_cache=True, **({"private": True} if private else {}))
+
+
+def not_modified(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+    """A 304 if the validators of the response match the request, else the response"""
+    if response.status_code != 200 or not response.has_header("ETag"):
+        return response
+    return get_conditional_response(request, etag=response["ETag"], response=response)
+
+
+class ConditionalGetMixin:
+    """ETags for a DetailView or a ListView, put it before PageCacheMixin so
+    the cached pages are revalidated too"""
+
+    def render_to_response(self, context: Dict[str, Any], **kwargs: Any) -> HttpResponse:
+        response: HttpResponse = super().render_to_response(context, **kwargs)
+        if is_conditional(self.request):
+            # loads the rows the template is about to render, not more
+            etag: str = context_validators(self.request, context)
+            set_validators(response, etag, self.request.user.is_authenticated)
+        return response
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        # a TemplateResponse isn't rendered yet, a 304 replaces it before it is
+        return not_modified(request, super().dispatch(request, *args, **kwargs))
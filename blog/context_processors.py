@@ -0,0 +1,11 @@
+# pylint: disable=relative-beyond-top-level
+"""Template context processors"""
+from typing import Dict
+from django.http import HttpRequest
+from . import announcements as feed
+
+
+def announcements(request: HttpRequest) -> Dict[str, str]:
+    """Unread counter of the sidebar, empty for the anonymous users so their
+    pages stay shareable in the page cache"""
+    return {"unread_announcements": feed.label(feed.unread(request))}
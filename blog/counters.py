@@ -0,0 +1,89 @@
+"""Denormalized post counters kept by the Post signals"""
+from typing import Dict, List, Tuple
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from .models import Post, PostCounter
+
+ALL_POSTS: str = "posts"
+
+
+def author_key(author_id: int) -> str:
+    return f"author:{author_id}"
+
+
+def count_posts(key: str) -> int:
+    """Counts the posts of a counter from the posts table"""
+    if key == ALL_POSTS:
+        return Post.objects.count()
+    return Post.objects.filter(author_id=int(key.split(":", 1)[1])).count()
+
+
+async def acount_posts(key: str) -> int:
+    """count_posts for the async views"""
+    if key == ALL_POSTS:
+        return await Post.objects.acount()
+    return await Post.objects.filter(author_id=int(key.split(":", 1)[1])).acount()
+
+
+def add(key: str, delta: int) -> None:
+    """Adds delta to a counter, a missing counter is counted from scratch
+    (the post being saved or deleted is already counted then). A counter that
+    drifted stops at 0, the CHECK of the column would fail the delete"""
+    with transaction.atomic():
+        if not PostCounter.objects.filter(key=key).update(
+            count=Greatest(F("count") + delta, 0)
+        ):
+            PostCounter.objects.get_or_create(key=key, defaults={"count": count_posts(key)})
+
+
+def get(key: str) -> int:
+    """Returns a counter, counting and storing it the first time it is asked"""
+    count = PostCounter.objects.filter(key=key).values_list("count", flat=True).first()
+    if count is None:
+        counter, _ = PostCounter.objects.get_or_create(
+            key=key, defaults={"count": count_posts(key)}
+        )
+        count = counter.count
+    return count
+
+
+async def aget(key: str) -> int:
+    """get for the async views"""
+    count = await PostCounter.objects.filter(key=key).values_list("count", flat=True).afirst()
+    if count is None:
+        counter, _ = await PostCounter.objects.aget_or_create(
+            key=key, defaults={"count": await acount_posts(key)}
+        )
+        count = counter.count
+    return count
+
+
+def actual_counts() -> Dict[str, int]:
+    """Counts every counter from the posts table"""
+    counts: Dict[str, int] = {ALL_POSTS: Post.objects.count()}
+    for row in Post.objects.order_by().values("author_id").annotate(total=Count("id")):
+        counts[author_key(row["author_id"])] = row["total"]
+    return counts
+
+
+def drift() -> List[Tuple[str, int, int]]:
+    """Returns (key, stored, actual) for every counter that is wrong"""
+    actual: Dict[str, int] = actual_counts()
+    stored: Dict[str, int] = dict(PostCounter.objects.values_list("key", "count"))
+    return [
+        (key, stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(actual) | set(stored))
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+@transaction.atomic
+def rebuild() -> int:
+    """Replaces every counter with the real count, returns how many rows were written"""
+    counts: Dict[str, int] = actual_counts()
+    PostCounter.objects.all().delete()
+    PostCounter.objects.bulk_create(
+        PostCounter(key=key, count=count) for key, count in counts.items()
+    )
+    return len(counts)
@@ -0,0 +1,145 @@
+"""RSS and Atom feeds of the posts, for the whole site and for each author
+
+A feed is built once per change of its scopes (like the pages of
+PageCacheMixin) and served from the cache afterwards, with an ETag of its
+content so the readers that poll it mostly get a 304.
+"""
+import hashlib
+from datetime import datetime
+from typing import Any, List
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sites.shortcuts import get_current_site
+from django.contrib.syndication.views import Feed, add_domain
+from django.core.cache import cache
+from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, quote_etag
+from django.utils.feedgenerator import Atom1Feed, SyndicationFeed
+from .cache import page_key, page_timeout
+from .conditional import not_modified
+from .models import Post
+
+# posts in a feed
+FEED_SIZE: int = 20
+
+
+def feed_max_age() -> int:
+    """Seconds the readers and the CDN may use a feed without asking again"""
+    return getattr(settings, "BLOG_FEED_MAX_AGE", 5 * 60)
+
+
+class CachedFeed(Feed):
+    """Feed served from the page cache"""
+
+    replica_reads: bool = True  # see blog/replicas.py
+
+    def get_cache_scopes(self, **kwargs: Any) -> List[str]:
+        raise NotImplementedError
+
+    def __call__(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        # the links of a feed are absolute
+        key: str = (
+            f"{page_key(request, self.get_cache_scopes(**kwargs))}:"
+            f"{request.scheme}://{request.get_host()}"
+        )
+        # built by one thread at a time when the backend is single flight
+        response: HttpResponse = cache.get_or_set(
+            key, lambda: self.build(request, *args, **kwargs), page_timeout()
+        )
+        return not_modified(request, response)
+
+    def build(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        response: HttpResponse = super().__call__(request, *args, **kwargs)
+        response["ETag"] = quote_etag(hashlib.md5(response.content).hexdigest())
+        patch_cache_control(response, public=True, max_age=feed_max_age())
+        return response
+
+    def item_title(self, item: Post) -> str:
+        return item.title
+
+    def item_description(self, item: Post) -> str:
+        return item.content
+
+    def item_author_name(self, item: Post) -> str:
+        return item.author.username
+
+    def item_author_link(self, item: Post) -> str:
+        return reverse("allposts-user", kwargs={"username": item.author.username})
+
+    def get_feed(self, obj: Any, request: HttpRequest) -> SyndicationFeed:
+        """The item links are made absolute by Feed, the author links aren't"""
+        feed: SyndicationFeed = super().get_feed(obj, request)
+        domain: str = get_current_site(request).domain
+        for item in feed.items:
+            if item["author_link"]:
+                item["author_link"] = add_domain(domain, item["author_link"], request.is_secure())
+        return feed
+
+    def item_pubdate(self, item: Post) -> datetime:
+        return item.datePosted
+
+    def item_updateddate(self, item: Post) -> datetime:
+        return item.updated
+
+
+class LatestPostsFeed(CachedFeed):
+    """/feed/rss/"""
+
+    title: str = "Latest posts"
+    description: str = "The newest posts of the blog"
+
+    def get_cache_scopes(self, **kwargs: Any) -> List[str]:
+        return ["posts", "users"]
+
+    def link(self) -> str:
+        return reverse("blog-home")
+
+    def items(self) -> QuerySet[Post]:
+        return Post.objects.select_related("author").order_by("-datePosted", "-id")[
+            :FEED_SIZE
+        ]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """/feed/atom/"""
+
+    feed_type: type = Atom1Feed
+    subtitle: str = LatestPostsFeed.description
+
+
+class UserPostsFeed(CachedFeed):
+    """/allposts/<username>/rss/"""
+
+    def get_cache_scopes(self, **kwargs: Any) -> List[str]:
+        return [f"author:{kwargs['username']}", "users"]
+
+    def get_object(self, request: HttpRequest, *args: Any, **kwargs: Any) -> User:
+        return get_object_or_404(User, username=kwargs["username"])
+
+    def title(self, obj: User) -> str:
+        return f"Posts of {obj.username}"
+
+    def description(self, obj: User) -> str:
+        return f"The newest posts of {obj.username}"
+
+    def link(self, obj: User) -> str:
+        return reverse("allposts-user", kwargs={"username": obj.username})
+
+    def items(self, obj: User) -> QuerySet[Post]:
+        return (
+            Post.objects.select_related("author")
+            .filter(author=obj)
+            .order_by("-datePosted", "-id")[:FEED_SIZE]
+        )
+
+
+class UserPostsAtomFeed(UserPostsFeed):
+    """/allposts/<username>/atom/"""
+
+    feed_type: type = Atom1Feed
+
+    def subtitle(self, obj: User) -> str:
+        return self.description(obj)
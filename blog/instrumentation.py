@@ -0,0 +1,273 @@
+"""Where the time of a request goes
+
+InstrumentationMiddleware times every request and adds up, for that request
+only, the queries of every connection (through an execute wrapper), the
+template renders (through the DjangoTemplates and Jinja2 backends below) and
+the reads of the cache (through the cache backends below). The numbers go out
+as a Server-Timing header and a JSON log line, the SQL of a request slower
+than settings.BLOG_SLOW_REQUEST_MS, when it is set, is logged as a warning
+and the totals per url name are kept for the staff only RequestStatsView.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+from django.template.backends.jinja2 import Jinja2 as BaseJinja2
+from .sharded_cache import ShardedLRUCache
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# statements of a request kept for the slow request log
+MAX_SQL: int = 200
+
+
+@dataclass
+class RequestStats:
+    """What one request spent"""
+
+    start: float = field(default_factory=time.perf_counter)
+    db_ms: float = 0.0
+    queries: int = 0
+    sql: List[Tuple[float, str]] = field(default_factory=list)
+    template_ms: float = 0.0
+    rendering: int = 0  # depth of nested renders, only the outer one is timed
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template_ms:.1f}",
+                f'cache;desc="{self.cache_hits} hits / {self.cache_misses} misses"',
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+
+current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def time_query(execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+    """Execute wrapper of every connection (see install_query_timer), adds the
+    query to the stats of the request, the context var follows the async views
+    into the threads that run their queries"""
+    stats: Optional[RequestStats] = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed: float = (time.perf_counter() - start) * 1000
+        stats.db_ms += elapsed
+        stats.queries += 1
+        if len(stats.sql) < MAX_SQL:
+            stats.sql.append((elapsed, sql))
+
+
+def install_query_timer(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """connection_created receiver, a connection is created again when it reconnects"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedTemplate:
+    """Template of the backends below, times its renders"""
+
+    def __init__(self, template: Any) -> None:
+        self.template: Any = template
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.template, name)
+
+    def render(self, context: Optional[Dict[str, Any]] = None, request: Any = None) -> str:
+        stats: Optional[RequestStats] = current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        stats.rendering += 1
+        start: float = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.rendering -= 1
+            if not stats.rendering:
+                stats.template_ms += (time.perf_counter() - start) * 1000
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """The Django template backend with timed renders"""
+
+    def from_string(self, template_code: str) -> TimedTemplate:
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name: str) -> TimedTemplate:
+        return TimedTemplate(super().get_template(template_name))
+
+
+class Jinja2(BaseJinja2):
+    """The Jinja2 template backend with timed renders"""
+
+    def from_string(self, template_code: str) -> TimedTemplate:
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name: str) -> TimedTemplate:
+        return TimedTemplate(super().get_template(template_name))
+
+
+class CacheStatsMixin:
+    """Counts the hits and misses of a cache backend in the stats of the request"""
+
+    missing: object = object()
+
+    def get(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        value: Any = super().get(key, self.missing, version)
+        stats: Optional[RequestStats] = current.get()
+        if stats is not None:
+            if value is self.missing:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is self.missing else value
+
+
+class InstrumentedShardedCache(CacheStatsMixin, ShardedLRUCache):
+    """ShardedLRUCache with hit and miss counts"""
+
+
+class Totals:
+    """Request stats added up per url name, for this process"""
+
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.by_name: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, stats: RequestStats, total_ms: float, slow: bool) -> None:
+        with self.lock:
+            row: Dict[str, float] = self.by_name.setdefault(
+                name,
+                dict.fromkeys(
+                    [
+                        "requests",
+                        "total_ms",
+                        "max_ms",
+                        "db_ms",
+                        "queries",
+                        "template_ms",
+                        "cache_hits",
+                        "cache_misses",
+                        "slow",
+                    ],
+                    0,
+                ),
+            )
+            row["requests"] += 1
+            row["total_ms"] += total_ms
+            row["max_ms"] = max(row["max_ms"], total_ms)
+            row["db_ms"] += stats.db_ms
+            row["queries"] += stats.queries
+            row["template_ms"] += stats.template_ms
+            row["cache_hits"] += stats.cache_hits
+            row["cache_misses"] += stats.cache_misses
+            row["slow"] += slow
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """The totals with the means per request"""
+        with self.lock:
+            rows: Dict[str, Dict[str, float]] = {
+                name: dict(row) for name, row in sorted(self.by_name.items())
+            }
+        for row in rows.values():
+            for key in ["total_ms", "db_ms", "queries", "template_ms"]:
+                row[f"mean_{key}"] = row[key] / row["requests"]
+        return rows
+
+    def clear(self) -> None:
+        with self.lock:
+            self.by_name.clear()
+
+
+totals: Totals = Totals()
+
+
+def slow_request_ms() -> Optional[float]:
+    """The slow request threshold, None turns the slow request log off"""
+    return getattr(settings, "BLOG_SLOW_REQUEST_MS", None)
+
+
+class InstrumentationMiddleware:
+    """Times the requests, put it first in MIDDLEWARE so it sees the whole request"""
+
+    sync_capable: bool = True
+    async_capable: bool = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response: Callable = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        stats: RequestStats = RequestStats()
+        token = current.set(stats)
+        try:
+            response: HttpResponse = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.finish(request, response, stats)
+        return response
+
+    async def acall(self, request: HttpRequest) -> HttpResponse:
+        stats: RequestStats = RequestStats()
+        token = current.set(stats)
+        try:
+            response: HttpResponse = await self.get_response(request)
+        finally:
+            current.reset(token)
+        self.finish(request, response, stats)
+        return response
+
+    def finish(self, request: HttpRequest, response: HttpResponse, stats: RequestStats) -> None:
+        total_ms: float = stats.total_ms()
+        response["Server-Timing"] = stats.server_timing(total_ms)
+        match = getattr(request, "resolver_match", None)
+        name: str = match.view_name if match else "<unresolved>"
+        threshold: Optional[float] = slow_request_ms()
+        slow: bool = threshold is not None and total_ms >= threshold
+        totals.add(name, stats, total_ms, slow)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": name,
+                    "status": response.status_code,
+                    "total_ms": round(total_ms, 2),
+                    "db_ms": round(stats.db_ms, 2),
+                    "queries": stats.queries,
+                    "template_ms": round(stats.template_ms, 2),
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                }
+            )
+        )
+        if slow:
+            logger.warning(
+                "Slow request %s %s took %.0fms, %d queries:\n%s",
+                request.method,
+                request.get_full_path(),
+                total_ms,
+                stats.queries,
+                "\n".join(f"{elapsed:8.2f}ms {sql}" for elapsed, sql in stats.sql),
+            )
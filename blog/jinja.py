@@ -0,0 +1,55 @@
+# pylint: disable=relative-beyond-top-level
+"""Jinja2 environment of the ports of the read only templates
+
+The ports live in blog/jinja2/ under the names of the Django templates they
+replace, and are only picked when the Jinja2 engine comes first in
+settings.TEMPLATES (settings.BLOG_TEMPLATE_ENGINE = 'jinja2'), the other
+templates keep rendering with the Django engine. The helpers of the Django
+templates are globals here: url(), static(), stylesheets(), avatar_url(), the
+date filter, and cached() for the fragments of {% cache %}, under the same
+keys so blog.cache.delete_post_rows drops them for both engines.
+"""
+from typing import Any, Callable, Optional
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.defaultfilters import date
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+from markupsafe import Markup
+from users.templatetags.avatars import avatar_url
+from .templatetags.assets import stylesheets
+
+
+def url(name: str, *args: Any, **kwargs: Any) -> str:
+    """{% url %}, url("post-detail", post.id)"""
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def date_filter(value: Any, arg: Optional[str] = None) -> str:
+    """|date of the Django templates, in the current time zone like there"""
+    return date(template_localtime(value), arg)
+
+
+def cached(name: str, vary_on: list, timeout: Optional[int], caller: Callable) -> Markup:
+    """{% cache %} as a call block, {% call cached("name", [post.pk], timeout) %}"""
+    key: str = make_template_fragment_key(name, vary_on)
+    value: Optional[str] = cache.get(key)
+    if value is None:
+        value = str(caller())
+        cache.set(key, value, timeout)
+    return Markup(value)
+
+
+def environment(**options: Any) -> Environment:
+    env: Environment = Environment(**options)
+    env.globals.update(
+        url=url,
+        static=static,
+        stylesheets=stylesheets,
+        avatar_url=avatar_url,
+        cached=cached,
+    )
+    env.filters["date"] = date_filter
+    return env
@@ -0,0 +1,60 @@
+"""Rows per second of the JSON API against the rendered home page"""
+import time
+from typing import Any, Callable, List
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import Client, override_settings
+from django.urls import reverse
+from ...benchmarking import NO_CACHE, measure, seed_posts, seed_users, temporary_database
+from ...views import PostListView
+
+
+class Command(BaseCommand):
+    """manage.py bench_api"""
+
+    help: str = (
+        "Times the home page, pages of the JSON API and its NDJSON export on a seeded "
+        "database without the cache and reports the posts served per second"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with temporary_database(), override_settings(CACHES=NO_CACHE):
+            start: float = time.perf_counter()
+            seed_posts(options["posts"], seed_users(options["users"]))
+            self.stdout.write(
+                f"Seeded {options['posts']} posts in {time.perf_counter() - start:.1f}s"
+            )
+            client: Client = Client()
+            api: str = reverse("api-posts")
+            per_page: int = PostListView.paginate_by
+
+            def get(url: str, **query: Any) -> Callable[[], None]:
+                return lambda: client.get(url, query).content
+
+            cases: List[Any] = [
+                ("home.html", per_page, get(reverse("blog-home")), options["repeat"]),
+                ("json", per_page, get(api, limit=per_page), options["repeat"]),
+                ("json", 100, get(api, limit=100), options["repeat"]),
+                (
+                    "json content",
+                    100,
+                    get(api, limit=100, fields="id,title,content"),
+                    options["repeat"],
+                ),
+                (
+                    "ndjson",
+                    options["posts"],
+                    lambda: b"".join(client.get(api, {"format": "ndjson"}).streaming_content),
+                    1,
+                ),
+            ]
+            self.stdout.write(f"{'response':>14} {'posts':>8} {'ms':>10} {'posts/s':>10}")
+            for label, rows, fetch, repeat in cases:
+                elapsed: float = measure(fetch, repeat)
+                self.stdout.write(
+                    f"{label:>14} {rows:>8} {elapsed:>10.2f} {rows / elapsed * 1000:>10.0f}"
+                )
@@ -0,0 +1,74 @@
+"""Compares the sync and the async read views under the ASGI handler"""
+import asyncio
+import time
+from typing import Any, Dict, List
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import AsyncClient, override_settings
+from django.urls import include, path, reverse
+from ...benchmarking import NO_CACHE, seed_posts, seed_users, temporary_database
+from ...models import Post
+
+# root url conf of the async run, the async blog urls shadow the ones of blogpage.urls
+urlpatterns: List[Any] = [
+    path("", include("blog.async_urls")),
+    path("", include("blogpage.urls")),
+]
+
+
+async def run(urls: List[str], requests: int, concurrency: int) -> float:
+    """Sends the requests through the ASGI handler, returns requests per second"""
+    client: AsyncClient = AsyncClient()
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            response = await client.get(urls[index % len(urls)])
+            assert response.status_code == 200, response.status_code
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    """manage.py bench_asgi"""
+
+    help: str = "Throughput of concurrent requests to the sync and the async read views"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--posts", type=int, default=20_000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", default="1,10,50")
+        parser.add_argument(
+            "--with-cache",
+            action="store_true",
+            help="Keep the page cache on, by default every request renders",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with temporary_database():
+            seed_posts(options["posts"], seed_users(options["users"]))
+            user: User = User.objects.first()
+            post: Post = Post.objects.first()
+            urls: List[str] = [
+                reverse("blog-home"),
+                reverse("blog-home") + "?page=3",
+                reverse("post-detail", kwargs={"pk": post.pk}),
+                reverse("allposts-user", kwargs={"username": user.username}),
+                reverse("posts-latest"),
+                reverse("announcements"),
+            ]
+            caches: Dict[str, Any] = {} if options["with_cache"] else {"CACHES": NO_CACHE}
+            self.stdout.write(f"{'concurrency':>12} {'sync req/s':>12} {'async req/s':>12}")
+            for concurrency in [int(value) for value in options["concurrency"].split(",")]:
+                results: List[float] = []
+                for urlconf in ["blogpage.urls", __name__]:
+                    with override_settings(ROOT_URLCONF=urlconf, **caches):
+                        results.append(
+                            asyncio.run(run(urls, options["requests"], concurrency))
+                        )
+                self.stdout.write(
+                    f"{concurrency:>12} {results[0]:>12.1f} {results[1]:>12.1f}"
+                )
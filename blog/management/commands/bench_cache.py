@@ -0,0 +1,113 @@
+"""Throughput of ShardedLRUCache and LocMemCache under many threads"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandParser
+from ...sharded_cache import ShardedLRUCache
+
+
+def backends(max_entries: int) -> Dict[str, BaseCache]:
+    """Fresh caches of each kind, their names keep them apart from the real one"""
+    suffix: str = str(time.time_ns())
+    options: Dict[str, Any] = {"OPTIONS": {"MAX_ENTRIES": max_entries}}
+    return {
+        "locmem": LocMemCache(f"bench-locmem-{suffix}", options),
+        "sharded": ShardedLRUCache(f"bench-sharded-{suffix}", options),
+    }
+
+
+def run_threads(count: int, work: Callable[[int], None]) -> float:
+    """Starts work(index) on count threads at once, returns the seconds until the last ends"""
+    barrier: threading.Barrier = threading.Barrier(count + 1)
+
+    def target(index: int) -> None:
+        barrier.wait()
+        work(index)
+
+    threads: List[threading.Thread] = [
+        threading.Thread(target=target, args=(index,)) for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start: float = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """manage.py bench_cache"""
+
+    help: str = (
+        "Runs a skewed mix of gets and sets on LocMemCache and ShardedLRUCache from "
+        "several threads, then a stampede of threads on one expired key"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--threads", default="1,4,16")
+        parser.add_argument("--ops", type=int, default=20_000, help="per thread")
+        parser.add_argument("--keys", type=int, default=20_000)
+        parser.add_argument("--max-entries", type=int, default=10_000)
+        parser.add_argument("--sets", type=float, default=0.1, help="share of the ops")
+        parser.add_argument("--value-size", type=int, default=1024)
+        parser.add_argument("--stampede", type=int, default=32, help="threads")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        value: bytes = b"x" * options["value_size"]
+        self.stdout.write(
+            f"{options['keys']} keys, {options['max_entries']} entries, "
+            f"{options['sets']:.0%} sets\n"
+            f"{'backend':>8} {'threads':>8} {'ops/s':>10} {'hit rate':>9} {'evictions':>10}"
+        )
+        for threads in [int(count) for count in options["threads"].split(",")]:
+            # the same skewed keys for both backends, a few are hot
+            plans: List[List[str]] = [
+                [
+                    f"key:{int(options['keys'] * rng.random() ** 3)}"
+                    for rng in [random.Random(index)]
+                    for _ in range(options["ops"])
+                ]
+                for index in range(threads)
+            ]
+            for name, cache in backends(options["max_entries"]).items():
+                hits: List[int] = [0] * threads
+
+                def work(index: int) -> None:
+                    # apart from the seeds of the plans, the sets would only hit their keys
+                    rng: random.Random = random.Random(f"sets:{index}")
+                    for key in plans[index]:
+                        if rng.random() < options["sets"]:
+                            cache.set(key, value, 300)
+                        elif cache.get(key) is not None:
+                            hits[index] += 1
+
+                elapsed: float = run_threads(threads, work)
+                gets: float = threads * options["ops"] * (1 - options["sets"])
+                evictions: Any = cache.stats()["evictions"] if hasattr(cache, "stats") else "-"
+                self.stdout.write(
+                    f"{name:>8} {threads:>8} {threads * options['ops'] / elapsed:>10.0f} "
+                    f"{sum(hits) / gets:>9.1%} {evictions:>10}"
+                )
+        self.stampede(options["stampede"], options["max_entries"])
+
+    def stampede(self, threads: int, max_entries: int) -> None:
+        """Every thread asks for the same missing key, computing it takes 50ms"""
+        self.stdout.write(
+            f"\nStampede of {threads} threads\n{'backend':>8} {'computed':>9} {'ms':>8}"
+        )
+        for name, cache in backends(max_entries).items():
+            computed: List[int] = []
+
+            def compute() -> bytes:
+                computed.append(1)
+                time.sleep(0.05)
+                return b"page"
+
+            elapsed: float = run_threads(
+                threads, lambda index: cache.get_or_set("hot", compute, 300)
+            )
+            self.stdout.write(f"{name:>8} {len(computed):>9} {elapsed * 1000:>8.0f}")
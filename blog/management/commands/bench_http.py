@@ -0,0 +1,230 @@
+"""Latency of every page of the site on a seeded database"""
+import json
+import resource
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from ...benchmarking import (
+    NO_CACHE,
+    percentiles,
+    seed_announcements,
+    seed_posts,
+    seed_users,
+    temporary_database,
+)
+from ...models import Post
+
+
+@dataclass
+class Case:
+    """One url requested again and again by one kind of client"""
+
+    name: str  # url name, namespaced like in reverse()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    query: str = ""
+    client: str = "anonymous"  # anonymous, user (the busiest author) or staff
+    relogin: bool = False  # the request logs the client out
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}{'?' + self.query if self.query else ''} [{self.client}]"
+
+    def url(self) -> str:
+        return reverse(self.name, kwargs=self.kwargs) + (f"?{self.query}" if self.query else "")
+
+
+def url_names(patterns: List[Any], namespace: str = "") -> Set[str]:
+    """Every named url of the url conf"""
+    names: Set[str] = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner: str = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            names |= url_names(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(namespace + pattern.name)
+    return names
+
+
+def build_cases(author: User, post: Post) -> List[Case]:
+    """The pages of blog/urls.py and blogpage/urls.py, the public ones both
+    from the page cache (anonymous) and rendered (logged in)"""
+    cases: List[Case] = []
+    for client in ["anonymous", "user"]:
+        cases += [
+            Case("blog-home", client=client),
+            Case("blog-home", query="page=last", client=client),
+            Case("post-detail", {"pk": post.pk}, client=client),
+            Case("allposts-user", {"username": author.username}, client=client),
+            Case("allposts-user", {"username": author.username}, "page=last", client),
+            Case("posts-latest", client=client),
+            Case("announcements", client=client),
+            Case("post-search", query="q=report", client=client),
+        ]
+    cases += [
+        Case("posts-rss"),
+        Case("posts-atom"),
+        Case("user-posts-rss", {"username": author.username}),
+        Case("user-posts-atom", {"username": author.username}),
+        Case("api-posts"),
+        Case("api-posts", query="limit=100&fields=id,title,content"),
+        Case("api-user-posts", {"username": author.username}),
+        Case("api-announcements"),
+        Case("post-create", client="user"),
+        Case("post-update", {"pk": post.pk}, client="user"),
+        Case("post-delete", {"pk": post.pk}, client="user"),
+        Case("login"),
+        Case("register"),
+        Case("logout_view"),
+        Case("logout_user", client="user", relogin=True),
+        Case("profile", client="user"),
+        Case("reset-password", client="user"),
+        Case("request-stats", client="staff"),
+        Case("admin:index", client="staff"),
+        Case("admin:blog_post_changelist", client="staff"),
+    ]
+    return cases
+
+
+class QueryCounter:
+    """Counts the queries of the connection without keeping their sql"""
+
+    def __init__(self) -> None:
+        self.count: int = 0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    """manage.py bench_http"""
+
+    help: str = (
+        "Seeds users with skewed post counts, requests every page through the test client "
+        "and reports p50/p95/p99 latency, queries per request and peak RSS"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--announcements", type=int, default=50)
+        parser.add_argument(
+            "--skew", type=float, default=1.1, help="Zipf exponent of the posts per author"
+        )
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per page")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--no-cache", action="store_true", help="Use the dummy cache")
+        parser.add_argument("--only", default="", help="Comma separated url names to run")
+        parser.add_argument("--json", dest="json_path", help="Writes the results to this file")
+        parser.add_argument("--compare", help="Results of an earlier run to compare p50 with")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2")
+        baseline: Dict[str, Any] = {}
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = {row["label"]: row for row in json.load(file)["results"]}
+
+        with temporary_database(), override_settings(
+            **({"CACHES": NO_CACHE} if options["no_cache"] else {})
+        ):
+            start: float = time.perf_counter()
+            users: List[User] = seed_users(options["users"])
+            seed_posts(options["posts"], users, skew=options["skew"])
+            seed_announcements(options["announcements"], users)
+            staff: User = User.objects.create(
+                username="benchstaff", is_staff=True, is_superuser=True
+            )
+            self.stdout.write(
+                f"Seeded {options['users']} users and {options['posts']} posts "
+                f"in {time.perf_counter() - start:.1f}s, peak RSS {peak_rss_kb() / 1024:.0f}MB"
+            )
+            author: User = users[0]  # the busiest author with a skew
+            post: Post = Post.objects.filter(author=author).order_by("-datePosted").first()
+            logins: Dict[str, Optional[User]] = {"anonymous": None, "user": author, "staff": staff}
+
+            cases: List[Case] = build_cases(author, post)
+            only: Set[str] = set(filter(None, options["only"].split(",")))
+            if only:
+                cases = [case for case in cases if case.name in only]
+            # the pages of the admin are Django's, only two are timed
+            missing: Set[str] = {
+                name
+                for name in url_names(get_resolver().url_patterns)
+                if not name.startswith("admin:")
+            } - {case.name for case in build_cases(author, post)}
+
+            results: List[Dict[str, Any]] = []
+            self.stdout.write(
+                f"{'page':<52} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'vs p50':>8}"
+            )
+            for case in cases:
+                result: Dict[str, Any] = self.run_case(case, logins[case.client], options)
+                results.append(result)
+                old: Optional[Dict[str, Any]] = baseline.get(result["label"])
+                change: str = f"{result['p50'] / old['p50'] - 1:+.0%}" if old else ""
+                self.stdout.write(
+                    f"{result['label']:<52} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                    f"{result['p99']:>8.2f} {result['queries']:>8.1f} {change:>8}"
+                )
+            self.stdout.write(f"Peak RSS {peak_rss_kb() / 1024:.0f}MB")
+            if missing:
+                self.stdout.write(f"Not benchmarked: {', '.join(sorted(missing))}")
+
+        if options["json_path"]:
+            report: Dict[str, Any] = {
+                "date": datetime.now(timezone.utc).isoformat(),
+                "django": django.get_version(),
+                "options": {
+                    key: options[key]
+                    for key in ["users", "posts", "announcements", "skew", "requests", "no_cache"]
+                },
+                "peak_rss_kb": peak_rss_kb(),
+                "results": results,
+            }
+            with open(options["json_path"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+    def run_case(self, case: Case, user: Optional[User], options: Dict[str, Any]) -> Dict[str, Any]:
+        client: Client = Client()
+        url: str = case.url()
+        timings: List[float] = []
+        queries: int = 0
+        status: Set[int] = set()
+        for index in range(options["warmup"] + options["requests"]):
+            if user is not None and (index == 0 or case.relogin):
+                client.force_login(user)
+            counter: QueryCounter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start: float = time.perf_counter()
+                response = client.get(url)
+                elapsed: float = (time.perf_counter() - start) * 1000
+            status.add(response.status_code)
+            if index >= options["warmup"]:
+                timings.append(elapsed)
+                queries += counter.count
+        if status - {200, 302}:
+            raise CommandError(f"{case.label} answered {sorted(status)}")
+        return {
+            **asdict(case),
+            "label": case.label,
+            "url": url,
+            "status": sorted(status),
+            **percentiles(timings),
+            "mean": sum(timings) / len(timings),
+            "queries": queries / len(timings),
+            "peak_rss_kb": peak_rss_kb(),
+        }
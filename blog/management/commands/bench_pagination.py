@@ -0,0 +1,46 @@
+"""Compares offset and cursor pagination from the first to a deep page"""
+from typing import Any, List
+from django.core.management.base import BaseCommand, CommandParser
+from django.core.paginator import Paginator
+from django.db.models.query import QuerySet
+from ...benchmarking import measure, seed_posts, seed_users, temporary_database
+from ...models import Post
+from ...pagination import FORWARD, CursorPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    """manage.py bench_pagination"""
+
+    help: str = "Times offset and cursor pagination of the home page on a seeded database"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--posts", type=int, default=50_005)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--per-page", type=int, default=5)
+        parser.add_argument("--pages", default="1,10,100,1000,10000")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        per_page: int = options["per_page"]
+        pages: List[int] = [int(page) for page in options["pages"].split(",")]
+        with temporary_database():
+            seed_posts(options["posts"], seed_users(options["users"]))
+            queryset: QuerySet = Post.objects.order_by("-datePosted", "-id")
+            self.stdout.write(f"{'page':>8} {'offset ms':>12} {'cursor ms':>12}")
+            for number in pages:
+                if (number - 1) * per_page >= options["posts"]:
+                    self.stderr.write(f"page {number} is past the seeded posts, skipped")
+                    continue
+                offset_ms: float = measure(
+                    lambda: list(Paginator(queryset, per_page).page(number)),
+                    options["repeat"],
+                )
+                cursor: Any = None
+                if number > 1:
+                    last: Post = queryset[(number - 1) * per_page - 1]
+                    cursor = encode_cursor(FORWARD, last.datePosted, last.pk)
+                cursor_ms: float = measure(
+                    lambda: list(CursorPaginator(queryset, per_page).page(cursor)),
+                    options["repeat"],
+                )
+                self.stdout.write(f"{number:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
@@ -0,0 +1,49 @@
+"""Compares the FTS5 search with a LIKE scan"""
+import time
+from typing import Any, List
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Q
+from ...benchmarking import measure, seed_posts, seed_users, temporary_database
+from ...models import Post
+from ...search import SearchPaginator
+
+
+class Command(BaseCommand):
+    """manage.py bench_search"""
+
+    help: str = "Times the first page of a search with FTS5 and with LIKE on a seeded database"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--terms", default="report,peace goal,responsib,nonexistentword")
+        parser.add_argument("--per-page", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with temporary_database():
+            start: float = time.perf_counter()
+            seed_posts(options["posts"], seed_users(options["users"]))
+            self.stdout.write(
+                f"Seeded {options['posts']} posts in {time.perf_counter() - start:.1f}s "
+                f"(indexed by the triggers)"
+            )
+            self.stdout.write(f"{'terms':>20} {'fts ms':>10} {'like ms':>10}")
+            per_page: int = options["per_page"]
+            for terms in options["terms"].split(","):
+                words: List[str] = terms.split()
+                like: Q = Q()
+                for word in words:
+                    like &= Q(title__icontains=word) | Q(content__icontains=word)
+                fts_ms: float = measure(
+                    lambda: list(SearchPaginator(terms, per_page).page()), options["repeat"]
+                )
+                like_ms: float = measure(
+                    lambda: list(
+                        Post.objects.for_listing().filter(like).order_by("-datePosted")[
+                            :per_page
+                        ]
+                    ),
+                    options["repeat"],
+                )
+                self.stdout.write(f"{terms:>20} {fts_ms:>10.2f} {like_ms:>10.2f}")
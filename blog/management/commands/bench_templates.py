@@ -0,0 +1,66 @@
+"""Render time of a page of posts with the Django and the Jinja2 engine"""
+from typing import Any, Dict, List
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand, CommandParser
+from django.core.paginator import Page, Paginator
+from django.http import HttpRequest
+from django.template import engines
+from django.test import RequestFactory, override_settings
+from ...benchmarking import NO_CACHE, measure, seed_posts, seed_users, temporary_database
+from ...models import Post
+
+
+class Command(BaseCommand):
+    """manage.py bench_templates"""
+
+    help: str = (
+        "Renders blog/home.html with a page of posts loaded beforehand through each "
+        "template engine, with the post row fragments cached and without"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--per-page", type=int, default=50)
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--template", default="blog/home.html")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        per_page: int = options["per_page"]
+        with temporary_database():
+            users: List[User] = seed_users(options["users"])
+            # twice the page so the pagination links render too
+            seed_posts(per_page * 2, users)
+            posts: List[Post] = list(Post.objects.for_listing().order_by("-datePosted"))
+            page: Page = Paginator(posts, per_page).page(1)
+            request: HttpRequest = RequestFactory().get("/")
+            request.session = SessionStore()
+            # the busiest author sees the buttons of their posts on top of the fragments
+            request.user = max(
+                users,
+                key=lambda user: sum(post.author_id == user.pk for post in page.object_list),
+            )
+            context: Dict[str, Any] = {
+                "posts": page.object_list,
+                "page_obj": page,
+                "paginator": page.paginator,
+                "is_paginated": True,
+                "title": "Home",
+                "fragment_timeout": 600,
+            }
+            self.stdout.write(
+                f"{options['template']} with {per_page} posts\n"
+                f"{'engine':>8} {'fragments':>10} {'ms':>8} {'renders/s':>10}"
+            )
+            for name in ("django", "jinja2"):
+                template: Any = engines[name].get_template(options["template"])
+                for fragments in ("cached", "rendered"):
+                    caches: Dict[str, Any] = settings.CACHES if fragments == "cached" else NO_CACHE
+                    with override_settings(CACHES=caches):
+                        elapsed: float = measure(
+                            lambda: template.render(dict(context), request), options["repeat"]
+                        )
+                    self.stdout.write(
+                        f"{name:>8} {fragments:>10} {elapsed:>8.2f} {1000 / elapsed:>10.0f}"
+                    )
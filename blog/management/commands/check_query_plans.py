@@ -0,0 +1,68 @@
+"""Fails when a list view query stops using the timeline indexes"""
+import re
+from typing import Any, Iterable, List, Tuple
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import RequestFactory
+from django.utils import timezone
+from ...pagination import BACKWARD, FORWARD, CursorPaginator, encode_cursor
+from ...views import LatestPostsView, PostListView
+
+# "SCAN blog_post" alone is a full table scan, a scan that walks an index is fine
+FULL_SCAN: re.Pattern = re.compile(r"^SCAN (?!.*\b(INDEX|VIRTUAL TABLE)\b)")
+TEMP_SORT: re.Pattern = re.compile(r"USE TEMP B-TREE")
+
+
+def view_queryset(view_class: type, **kwargs: Any) -> QuerySet:
+    """Returns the queryset a view would paginate"""
+    view: Any = view_class()
+    view.setup(RequestFactory().get("/"), **kwargs)
+    return view.get_queryset()
+
+
+def cursor_query(queryset: QuerySet, direction: str) -> QuerySet:
+    """Returns the query CursorPaginator runs for a page in the middle of the list"""
+    cursor: str = encode_cursor(direction, timezone.now(), 1)
+    return CursorPaginator(queryset, 5).page_query(cursor)[1]
+
+
+class Command(BaseCommand):
+    """manage.py check_query_plans"""
+
+    help: str = (
+        "Runs EXPLAIN QUERY PLAN on the main query of every post list and fails "
+        "if one of them scans the table or sorts in a temp b-tree"
+    )
+
+    def queries(self) -> Iterable[Tuple[str, QuerySet]]:
+        """The main query of each list view"""
+        home: QuerySet = view_queryset(PostListView)
+        by_author: QuerySet = home.filter(author_id=1).order_by("-datePosted", "-id")
+        yield "blog-home", home[5:10]
+        yield "blog-home count", home.values("pk")
+        yield "blog-home cursor next", cursor_query(home, FORWARD)
+        yield "blog-home cursor previous", cursor_query(home, BACKWARD)
+        yield "allposts-user", by_author[5:10]
+        yield "allposts-user count", by_author.values("pk")
+        yield "allposts-user cursor next", cursor_query(by_author, FORWARD)
+        yield "allposts-user cursor previous", cursor_query(by_author, BACKWARD)
+        yield "posts-latest", view_queryset(LatestPostsView)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN checks only run on SQLite")
+        failures: List[str] = []
+        for label, queryset in self.queries():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan: List[str] = [row[-1] for row in cursor.fetchall()]
+            bad: List[str] = [
+                step for step in plan if FULL_SCAN.search(step) or TEMP_SORT.search(step)
+            ]
+            status: str = "FAIL" if bad else "ok"
+            self.stdout.write(f"{status:>4}  {label}: {' | '.join(plan)}")
+            failures.extend(f"{label}: {step}" for step in bad)
+        if failures:
+            raise CommandError("Queries without index:\n" + "\n".join(failures))
@@ -0,0 +1,28 @@
+"""collectstatic that checks the templates against the manifest it wrote"""
+from typing import Any, List
+from django.contrib.staticfiles.management.commands.collectstatic import (
+    Command as CollectStaticCommand,
+)
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import CommandError
+from ...assets import MissingAsset, is_bundled, unhashed_references
+
+
+class Command(CollectStaticCommand):
+    """manage.py collectstatic"""
+
+    def handle(self, **options: Any) -> Any:
+        try:
+            result: Any = super().handle(**options)
+        except MissingAsset as error:
+            raise CommandError(str(error)) from error
+        if is_bundled() and not options["dry_run"]:
+            problems: List[str] = unhashed_references(staticfiles_storage.hashed_files)
+            if problems:
+                raise CommandError(
+                    "The templates reference static files without a hashed name:\n"
+                    + "\n".join(problems)
+                )
+            if options["verbosity"]:
+                self.stdout.write("Every static file of the templates has a hashed name")
+        return result
@@ -0,0 +1,45 @@
+"""Exports posts or announcements as NDJSON or CSV"""
+import sys
+from typing import Any, TextIO
+from django.core.management.base import BaseCommand, CommandParser
+from ... import transfer
+
+
+class Command(BaseCommand):
+    """manage.py export_posts"""
+
+    help: str = "Writes every post (or announcement) in the format import_posts reads"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "file", nargs="?", default="-", help="Path of the file, - writes the standard output"
+        )
+        parser.add_argument("--model", choices=list(transfer.MODELS), default="post")
+        parser.add_argument("--format", choices=transfer.FORMATS, default="ndjson")
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Rows fetched from the database at a time"
+        )
+
+    def report(self, rows: int, rate: float) -> None:
+        self.stderr.write(f"{rows} rows, {rate:.0f} rows/s")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        model = transfer.MODELS[options["model"]]
+        stream: TextIO = (
+            sys.stdout
+            if options["file"] == "-"
+            else open(options["file"], "w", encoding="utf-8", newline="")
+        )
+        progress: transfer.Progress = transfer.Progress(self.report)
+        try:
+            transfer.write_rows(
+                stream,
+                options["format"],
+                transfer.columns(model),
+                transfer.export_rows(model, options["chunk_size"]),
+                progress,
+            )
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        progress.done()
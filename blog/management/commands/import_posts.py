@@ -0,0 +1,60 @@
+"""Imports posts or announcements from an NDJSON or CSV file"""
+import sys
+from typing import Any, TextIO
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from ... import transfer
+
+
+class Command(BaseCommand):
+    """manage.py import_posts"""
+
+    help: str = (
+        "Creates posts (or announcements) from NDJSON or CSV rows with the columns "
+        "title, content (context for announcements), datePosted and author (a username)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("file", help="Path of the file, - reads the standard input")
+        parser.add_argument("--model", choices=list(transfer.MODELS), default="post")
+        parser.add_argument("--format", choices=transfer.FORMATS, default="ndjson")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT")
+        parser.add_argument(
+            "--transaction-size", type=int, default=10000, help="Rows per transaction"
+        )
+        parser.add_argument(
+            "--skip-unknown-authors",
+            action="store_true",
+            help="Skip the rows of missing users instead of stopping",
+        )
+
+    def report(self, rows: int, rate: float) -> None:
+        self.stderr.write(f"{rows} rows, {rate:.0f} rows/s")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        model = transfer.MODELS[options["model"]]
+        stream: TextIO = (
+            sys.stdin
+            if options["file"] == "-"
+            else open(options["file"], encoding="utf-8", newline="")
+        )
+        progress: transfer.Progress = transfer.Progress(self.report)
+        try:
+            skipped: int = transfer.import_rows(
+                model,
+                transfer.read_rows(stream, options["format"]),
+                batch_size=options["batch_size"],
+                transaction_size=options["transaction_size"],
+                skip_unknown=options["skip_unknown_authors"],
+                progress=progress,
+            )
+        except (transfer.UnknownAuthor, KeyError, ValueError) as error:
+            raise CommandError(
+                f"{error!r} after {progress.rows} rows, the rows before it are imported"
+            ) from error
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        progress.done()
+        self.stdout.write(
+            f"Imported {progress.rows - skipped} {options['model']}s, skipped {skipped}"
+        )
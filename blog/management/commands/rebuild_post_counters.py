@@ -0,0 +1,29 @@
+"""Rebuilds the denormalized post counters"""
+from typing import Any, List, Tuple
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from ... import counters
+
+
+class Command(BaseCommand):
+    """manage.py rebuild_post_counters"""
+
+    help: str = "Counts the posts from scratch and rewrites the PostCounter table"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the counters that drifted, exits with an error if any did",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        drifted: List[Tuple[str, int, int]] = counters.drift()
+        for key, stored, actual in drifted:
+            self.stdout.write(f"{key}: stored {stored}, actual {actual}")
+        if options["check"]:
+            if drifted:
+                raise CommandError(f"{len(drifted)} counters drifted")
+            self.stdout.write("Counters are correct")
+            return
+        written: int = counters.rebuild()
+        self.stdout.write(f"Rebuilt {written} counters, {len(drifted)} had drifted")
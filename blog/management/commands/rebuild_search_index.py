@@ -0,0 +1,28 @@
+"""Rebuilds the full text index of the posts"""
+import time
+from typing import Any
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from ... import search
+
+
+class Command(BaseCommand):
+    """manage.py rebuild_search_index"""
+
+    help: str = "Re-reads every post into the FTS5 search index and reinstalls its triggers"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--optimize", action="store_true", help="Merge the index segments afterwards"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        connection = connections[options["database"]]
+        if not search.is_supported(connection):
+            raise CommandError("The search index needs SQLite with FTS5")
+        start: float = time.perf_counter()
+        search.rebuild(connection)
+        if options["optimize"]:
+            search.optimize(connection)
+        self.stdout.write(f"Search index rebuilt in {time.perf_counter() - start:.2f}s")
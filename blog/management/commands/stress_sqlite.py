@@ -0,0 +1,156 @@
+"""Concurrent readers and writers on an SQLite file, with and without the
+pragmas and the IMMEDIATE transactions of the settings"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+from ... import counters, sqlite
+from ...benchmarking import percentiles, seed_posts, seed_users, temporary_database
+from ...models import Post
+
+
+def work(
+    kind: str,
+    operation: Callable[[random.Random], None],
+    deadline: float,
+    seed: int,
+    results: Any,
+) -> None:
+    """Runs one operation in a loop on its own connection until the deadline,
+    in a process of its own like the workers of a web server"""
+    rng: random.Random = random.Random(seed)
+    timings: List[float] = []
+    errors: Counter = Counter()
+    try:
+        while time.time() < deadline:
+            start: float = time.perf_counter()
+            try:
+                operation(rng)
+            except OperationalError as error:
+                errors[f"{kind}: {error} after {time.perf_counter() - start:.1f}s"] += 1
+            else:
+                timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connections.close_all()
+        results.put((kind, timings, errors))
+
+
+def write(user_ids: List[int]) -> Callable[[random.Random], None]:
+    """What the create and update views do, a post save with its counters,
+    search index and cache signals"""
+
+    def operation(rng: random.Random) -> None:
+        if rng.random() < 0.7:
+            Post(title="stress", content="stress " * 40, author_id=rng.choice(user_ids)).save()
+        else:
+            post: Post = Post.objects.filter(pk__lte=rng.randint(1, 10_000)).last()
+            post.title = f"updated {rng.random()}"
+            post.save()
+
+    return operation
+
+
+def read(user_ids: List[int]) -> Callable[[random.Random], None]:
+    """What the home, user and detail pages query"""
+
+    def operation(rng: random.Random) -> None:
+        counters.get(counters.ALL_POSTS)
+        list(Post.objects.for_listing().order_by("-datePosted")[:5])
+        list(
+            Post.objects.for_listing()
+            .filter(author_id=rng.choice(user_ids))
+            .order_by("-datePosted")[:5]
+        )
+        Post.objects.select_related("author__profile").filter(pk=rng.randint(1, 10_000)).first()
+
+    return operation
+
+
+class Command(BaseCommand):
+    """manage.py stress_sqlite"""
+
+    help: str = (
+        "Runs concurrent reader and writer processes against an SQLite file, with SQLite's "
+        "defaults then with BLOG_SQLITE_PRAGMAS and the transaction_mode of DATABASES, "
+        "and counts the lock errors"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        # more processes than cores measures the scheduler rather than SQLite
+        parser.add_argument("--writers", type=int, default=4 * (os.cpu_count() or 1))
+        parser.add_argument("--readers", type=int, default=4 * (os.cpu_count() or 1))
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--posts", type=int, default=10_000)
+        parser.add_argument("--users", type=int, default=100)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "sqlite":
+            self.stderr.write("Only SQLite databases are stressed")
+            return
+        # (pragmas, OPTIONS of the connection), default is SQLite's own rollback
+        # journal with deferred transactions
+        tuned: Dict[str, Any] = dict(connection.settings_dict["OPTIONS"])
+        default: Dict[str, Any] = {
+            key: value for key, value in tuned.items() if key != "transaction_mode"
+        }
+        modes: Dict[str, Any] = {"default": ({}, default), "tuned": (sqlite.pragmas(), tuned)}
+        self.stdout.write(
+            f"{'mode':>8} {'writes/s':>9} {'reads/s':>9} {'write p95':>10} "
+            f"{'read p95':>9} {'errors':>7}"
+        )
+        try:
+            for mode, (pragmas, connection_options) in modes.items():
+                connection.settings_dict["OPTIONS"] = connection_options
+                with tempfile.TemporaryDirectory() as directory, override_settings(
+                    BLOG_SQLITE_PRAGMAS=pragmas
+                ), temporary_database(os.path.join(directory, "stress.sqlite3")):
+                    self.run_mode(mode, options)
+        finally:
+            connection.settings_dict["OPTIONS"] = tuned
+
+    def run_mode(self, mode: str, options: Dict[str, Any]) -> None:
+        users: List[User] = seed_users(options["users"])
+        seed_posts(options["posts"], users)
+        user_ids: List[int] = [user.id for user in users]
+        # the forked workers open their own connections, with the pragmas
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        deadline: float = time.time() + options["seconds"]
+        processes: List[Any] = [
+            context.Process(target=work, args=("write", write(user_ids), deadline, seed, results))
+            for seed in range(options["writers"])
+        ] + [
+            context.Process(target=work, args=("read", read(user_ids), deadline, seed, results))
+            for seed in range(options["readers"])
+        ]
+        for process in processes:
+            process.start()
+        timings: Dict[str, List[float]] = {"write": [], "read": []}
+        errors: Counter = Counter()
+        for _ in processes:
+            kind, worker_timings, worker_errors = results.get()
+            timings[kind] += worker_timings
+            errors += worker_errors
+        for process in processes:
+            process.join()
+        write_ms: List[float] = timings["write"]
+        read_ms: List[float] = timings["read"]
+
+        def p95(timings: List[float]) -> float:
+            return percentiles(timings)["p95"] if len(timings) > 1 else max(timings, default=0)
+
+        self.stdout.write(
+            f"{mode:>8} {len(write_ms) / options['seconds']:>9.0f} "
+            f"{len(read_ms) / options['seconds']:>9.0f} {p95(write_ms):>8.1f}ms "
+            f"{p95(read_ms):>7.1f}ms {sum(errors.values()):>7}"
+        )
+        for message, count in errors.most_common():
+            self.stdout.write(f"{'':>8} {count} x {message}")
@@ -0,0 +1,39 @@
+"""Copies the primary SQLite file over its replicas"""
+import sqlite3
+from typing import Any, List
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from ... import replicas
+
+
+class Command(BaseCommand):
+    """manage.py sync_replicas"""
+
+    help: str = (
+        "Copies the default SQLite database into the files of BLOG_REPLICA_DATABASES with "
+        "SQLite's online backup, a stand in for replication when testing locally"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("aliases", nargs="*", help="Replicas to copy to, all by default")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        aliases: List[str] = options["aliases"] or replicas.replicas()
+        if not aliases:
+            raise CommandError("No replicas, set BLOG_REPLICA_DATABASES")
+        unknown: List[str] = sorted(set(aliases) - set(replicas.replicas()))
+        if unknown:
+            raise CommandError(f"Not replicas: {', '.join(unknown)}")
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("Only SQLite databases are copied")
+        primary.ensure_connection()
+        for alias in aliases:
+            connections[alias].close()
+            target: sqlite3.Connection = sqlite3.connect(connections[alias].settings_dict["NAME"])
+            try:
+                # a consistent snapshot even while the primary is written to
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Copied default to {alias}")
@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 19:39
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    PostCounter = apps.get_model('blog', 'PostCounter')
+    counters = [PostCounter(key='posts', count=Post.objects.count())]
+    for row in Post.objects.order_by().values('author_id').annotate(total=Count('id')):
+        counters.append(PostCounter(key=f"author:{row['author_id']}", count=row['total']))
+    PostCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Full text index of the posts, see blog/search.py
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from blog import search
+
+    search.rebuild(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    from blog import search
+
+    if not search.is_supported(schema_editor.connection):
+        return
+    for trigger in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {search.TABLE}_{trigger}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {search.TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_postcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
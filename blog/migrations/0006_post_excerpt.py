@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-18 19:49
+
+from django.db import migrations, models, transaction
+from django.db.models.functions import Substr
+
+BATCH_SIZE = 5000
+
+
+def fill_excerpts(apps, schema_editor):
+    # an UPDATE per range of ids, in its own transaction, so the contents
+    # never go through python and the table is not locked for the whole run
+    Post = apps.get_model('blog', 'Post')
+    db = schema_editor.connection.alias
+    last_id = Post.objects.using(db).aggregate(models.Max('id'))['id__max'] or 0
+    for start in range(0, last_id, BATCH_SIZE):
+        with transaction.atomic(using=db):
+            Post.objects.using(db).filter(id__gt=start, id__lte=start + BATCH_SIZE).update(
+                excerpt=Substr('content', 1, 50)
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('blog', '0005_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-18 21:02
+
+import django.utils.timezone
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 5000
+
+
+def fill_updated(apps, schema_editor):
+    # the rows were last changed when they were posted as far as we know,
+    # an UPDATE per range of ids like 0006_post_excerpt
+    db = schema_editor.connection.alias
+    for name in ['Post', 'Announcement']:
+        model = apps.get_model('blog', name)
+        last_id = model.objects.using(db).aggregate(models.Max('id'))['id__max'] or 0
+        for start in range(0, last_id, BATCH_SIZE):
+            with transaction.atomic(using=db):
+                model.objects.using(db).filter(
+                    id__gt=start, id__lte=start + BATCH_SIZE
+                ).update(updated=models.F('datePosted'))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('blog', '0006_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,86 @@
 """Models"""
+from typing import Any
 from factory import Factory, Faker
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
 
 
+class PostQuerySet(models.QuerySet):
+    """Queries shared by the views that list posts"""
+
+    LISTING_FIELDS: tuple = (
+        "title",
+        "excerpt",
+        "datePosted",
+        "updated",
+        "author__username",
+        "author__profile__image",
+        "author__profile__image_hash",
+    )
+
+    def for_listing(self) -> "PostQuerySet":
+        """Joins the author and the profile in the same query and only loads
+        the columns that the post list templates render"""
+        return self.select_related("author__profile").only(*self.LISTING_FIELDS)
+
 
 class Post(models.Model):
     """A model for user that can post update delete"""
 
+    EXCERPT_LENGTH: int = 50
+
     title: models.CharField = models.CharField(max_length=100)
     content: models.TextField = models.TextField()
+    # start of the content for the lists, so they never load the content
+    excerpt: models.CharField = models.CharField(
+        max_length=EXCERPT_LENGTH, blank=True, editable=False
+    )
     datePosted: models.DateTimeField = models.DateTimeField(default=timezone.now)
+    # last save, validates the cached copies of the pages (see blog/conditional.py)
+    updated: models.DateTimeField = models.DateTimeField(auto_now=True)
     author: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects: PostQuerySet = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes: list = [
+            # every list is newest first, the id breaks ties for cursor pagination
+            models.Index(fields=["-datePosted", "-id"], name="post_timeline_idx"),
+            models.Index(
+                fields=["author", "-datePosted", "-id"], name="post_author_timeline_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         """Sets the display name of this object"""
         return f"{self.title}"
 
+    @classmethod
+    def from_db(cls, db: str, field_names: list, values: list) -> "Post":
+        instance: Post = super().from_db(db, field_names, values)
+        # remembers the stored author so the counters can follow a change of author
+        instance._saved_author_id = instance.__dict__.get("author_id")
+        return instance
+
+    def fill_excerpt(self) -> None:
+        """Sets the excerpt from the content, for the posts that skip save() like bulk_create"""
+        self.excerpt = self.content[: self.EXCERPT_LENGTH]
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Saves in a transaction so the post_save handlers that update the
+        counters commit or roll back together with the post"""
+        if "content" in self.__dict__:  # a deferred content can't have changed
+            self.fill_excerpt()
+            if kwargs.get("update_fields") and "content" in kwargs["update_fields"]:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "excerpt"}
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated"}
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self._saved_author_id = self.author_id
+
     def get_absolute_url(self) -> str:
         """Creates a url for this post to reach it's details"""
         return reverse("post-detail", kwargs={"pk": self.pk})
@@ -30,13 +92,32 @@ class Announcement(models.Model):
     title: models.CharField = models.CharField(max_length=50)
     context: models.TextField = models.TextField()
     datePosted: models.DateTimeField = models.DateTimeField(default=timezone.now)
+    updated: models.DateTimeField = models.DateTimeField(auto_now=True)
     author: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes: list = [
+            # newest first a page at a time, like the posts
+            models.Index(fields=["-datePosted", "-id"], name="announcement_timeline_idx"),
+        ]
+
     def __str__(self) -> str:
         """Sets the display name of this object"""
         return f"{self.title}"
 
 
+class PostCounter(models.Model):
+    """Denormalized number of posts so the paginators don't run COUNT(*),
+    the key is "posts" for every post and "author:<id>" for the posts of a user"""
+
+    key: models.CharField = models.CharField(max_length=40, primary_key=True)
+    count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        """Sets the display name of this object"""
+        return f"{self.key}: {self.count}"
+
+
 class PostFactory(Factory):
     """A test model for testing post"""
 
@@ -0,0 +1,205 @@
+"""Keyset (cursor) pagination for the post timelines"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+from . import counters
+
+FORWARD: str = "n"
+BACKWARD: str = "p"
+
+
+class InvalidCursor(InvalidPage):
+    """The cursor given in the url can not be decoded"""
+
+
+def encode_cursor(direction: str, key: Any, pk: int) -> str:
+    """Packs the position of a row into an opaque url safe token"""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw: bytes = json.dumps([direction, key, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, Any, int]:
+    """Unpacks a token made by encode_cursor, the key is left as json gave it"""
+    try:
+        padded: str = token + "=" * (-len(token) % 4)
+        direction, key, pk = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (FORWARD, BACKWARD):
+            raise ValueError(direction)
+        # int() of a float like 1e400 and the databases past 64 bits raise OverflowError
+        if not isinstance(pk, int) or not -(2**63) <= pk < 2**63:
+            raise ValueError(pk)
+        return direction, key, pk
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor("Invalid cursor") from error
+
+
+class CursorPage(Sequence):
+    """A page of a CursorPaginator, mimics the parts of Page the templates use"""
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        paginator: "CursorPaginator",
+        has_next: bool,
+        has_previous: bool,
+    ) -> None:
+        self.object_list: List[Any] = object_list
+        self.paginator: CursorPaginator = paginator
+        self._has_next: bool = has_next
+        self._has_previous: bool = has_previous
+
+    def __repr__(self) -> str:
+        return f"<CursorPage of {len(self.object_list)} objects>"
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """Token of the page after this one"""
+        if not self._has_next:
+            return None
+        last: Any = self.object_list[-1]
+        return encode_cursor(FORWARD, self.paginator.key_of(last), self.paginator.pk_of(last))
+
+    @property
+    def previous_cursor(self) -> Optional[str]:
+        """Token of the page before this one"""
+        if not self._has_previous:
+            return None
+        first: Any = self.object_list[0]
+        return encode_cursor(BACKWARD, self.paginator.key_of(first), self.paginator.pk_of(first))
+
+
+class CursorPaginator:
+    """Paginates a queryset newest first on (field, id) without OFFSET or COUNT"""
+
+    is_cursor: bool = True
+
+    def __init__(
+        self, object_list: QuerySet, per_page: int, field: str = "datePosted"
+    ) -> None:
+        self.object_list: QuerySet = object_list
+        self.per_page: int = int(per_page)
+        self.field: str = field
+
+    def key_of(self, obj: Any) -> datetime:
+        """Returns the ordering value of a row"""
+        return getattr(obj, self.field)
+
+    def pk_of(self, obj: Any) -> int:
+        return obj.pk
+
+    def page_query(self, cursor: Optional[str] = None) -> Tuple[Optional[str], QuerySet]:
+        """Returns the direction of the cursor and the query of the page, the
+        query fetches one extra row to tell whether there is a page after it"""
+        if not cursor:
+            return None, self._newest_first()[: self.per_page + 1]
+
+        direction, value, pk = decode_cursor(cursor)
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError) as error:
+            raise InvalidCursor("Invalid cursor") from error
+        if direction == FORWARD:
+            # the leading range keeps the index seekable, the OR alone would scan it
+            after: Q = Q(**{f"{self.field}__lte": value}) & (
+                Q(**{f"{self.field}__lt": value}) | Q(id__lt=pk)
+            )
+            return direction, self._newest_first().filter(after)[: self.per_page + 1]
+
+        before: Q = Q(**{f"{self.field}__gte": value}) & (
+            Q(**{f"{self.field}__gt": value}) | Q(id__gt=pk)
+        )
+        return direction, self.object_list.filter(before).order_by(self.field, "id")[
+            : self.per_page + 1
+        ]
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Returns the page that starts right after (or ends right before) the cursor"""
+        direction, query = self.page_query(cursor)
+        return self.build_page(direction, list(query))
+
+    def build_page(self, direction: Optional[str], rows: List[Any]) -> CursorPage:
+        """Makes the page out of the rows fetched by page_query"""
+        has_more: bool = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            return CursorPage(rows, self, True, has_more)
+        return CursorPage(rows, self, has_more, direction == FORWARD)
+
+    def _newest_first(self) -> QuerySet:
+        return self.object_list.order_by(f"-{self.field}", "-id")
+
+
+class CountedPaginator(Paginator):
+    """Paginator that reads the number of posts from a PostCounter instead of COUNT(*)"""
+
+    def __init__(self, *args: Any, count_key: str = counters.ALL_POSTS, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.count_key: str = count_key
+
+    @cached_property
+    def count(self) -> int:
+        return counters.get(self.count_key)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator of the admin changelists, a whole table is counted by its
+    PostCounter (count_key, when there is one) and a filtered list only up to
+    MAX_COUNT rows, past which it shows as MAX_COUNT"""
+
+    MAX_COUNT: int = 10_000
+    count_key: Optional[str] = None
+
+    @cached_property
+    def count(self) -> int:
+        if self.count_key is not None and not self.object_list.query.where:
+            return counters.get(self.count_key)
+        return self.object_list.values("pk").order_by()[: self.MAX_COUNT].count()
+
+
+class PostEstimatedCountPaginator(EstimatedCountPaginator):
+    count_key: Optional[str] = counters.ALL_POSTS
+
+
+class CursorPaginationMixin:
+    """ListView mixin that switches to keyset pagination when
+    settings.BLOG_PAGINATION_MODE is "cursor" """
+
+    cursor_kwarg: str = "cursor"
+
+    def get_pagination_mode(self) -> str:
+        return getattr(settings, "BLOG_PAGINATION_MODE", "offset")
+
+    def paginate_queryset(self, queryset: QuerySet, page_size: int) -> Tuple[Any, ...]:
+        if self.get_pagination_mode() != "cursor":
+            return super().paginate_queryset(queryset, page_size)
+        paginator: CursorPaginator = CursorPaginator(queryset, page_size)
+        try:
+            page: CursorPage = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as error:
+            raise Http404(str(error)) from error
+        return (paginator, page, page.object_list, page.has_other_pages())
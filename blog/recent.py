@@ -0,0 +1,191 @@
+# pylint: disable=relative-beyond-top-level
+"""The newest posts of the process, kept in memory
+
+The latest posts page and the first page of the post list show the same few
+newest posts to everyone. RecentPosts keeps the newest settings.BLOG_RECENT_POSTS
+of them, with their author and profile joined, and the number of posts, so
+those pages are served without a query.
+
+The post signals keep it up to date once the writes commit: a saved post is
+read back (once, by the writer) and put in its place, newest first on
+(datePosted, id), so a post backdated out of the window leaves it and one
+dated into it enters it. When a post leaves a full window the window is read
+again to fill the gap.
+
+Writes that skip the signals (bulk imports) bump the "posts" generation of
+the page cache, a username or a picture change bumps "users": the buffer
+remembers the generations it is up to date with and reloads when they moved
+on, checking them costs a cache read. The generations live in the cache, so
+with the default in process cache the writes of the other processes (the
+other workers, run_jobs, import_posts, a shell) never bump them here: the
+buffer is read again once it is settings.BLOG_RECENT_POSTS_MAX_AGE seconds
+old (BLOG_PAGE_CACHE_TIMEOUT by default, like the cached pages), until then
+those writes don't show up.
+"""
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Page
+from django.db import DatabaseError, DEFAULT_DB_ALIAS
+from django.db.models.query import QuerySet
+from . import counters, replicas
+from .cache import agenerations, generations
+from .models import Post
+from .pagination import CountedPaginator, CursorPaginator
+
+# the page cache scopes whose rows the buffer holds
+SCOPES: Tuple[str, ...] = ("posts", "users")
+
+
+def size() -> int:
+    return getattr(settings, "BLOG_RECENT_POSTS", 10)
+
+
+def max_age() -> float:
+    return getattr(
+        settings, "BLOG_RECENT_POSTS_MAX_AGE", getattr(settings, "BLOG_PAGE_CACHE_TIMEOUT", 600)
+    )
+
+
+def position(post: Post) -> Tuple[Any, int]:
+    """Sort key of the timeline, the biggest is the newest"""
+    return (post.datePosted, post.pk)
+
+
+def newest_first() -> QuerySet:
+    return Post.objects.for_listing().order_by("-datePosted", "-id")
+
+
+class RecentPosts:
+    """The newest posts, newest first, and the number of posts"""
+
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.posts: List[Post] = []
+        self.count: int = 0
+        # generations of SCOPES the posts are up to date with, None until loaded
+        self.versions: Optional[List[Any]] = None
+        # time.monotonic() of the last load, the local writes don't make it younger
+        self.loaded_at: float = 0.0
+
+    def load(self) -> None:
+        """Reads the window from the primary, a replica may not have the last writes"""
+        token: Any = replicas.current.set(None)
+        try:
+            versions: List[Any] = generations(SCOPES)
+            posts: List[Post] = list(newest_first().using(DEFAULT_DB_ALIAS)[: size()])
+            count: int = counters.get(counters.ALL_POSTS)
+        finally:
+            replicas.current.reset(token)
+        with self.lock:
+            self.posts, self.count, self.versions = posts, count, versions
+            self.loaded_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.posts, self.count, self.versions = [], 0, None
+
+    def snapshot(self, limit: int, versions: List[Any]) -> Optional[Tuple[List[Post], int]]:
+        with self.lock:
+            if self.versions != versions or time.monotonic() - self.loaded_at > max_age():
+                return None
+            return self.posts[:limit], self.count
+
+    def newest(self, limit: int) -> Optional[Tuple[List[Post], int]]:
+        """The newest limit posts and the number of posts, None when the
+        buffer is too small for them"""
+        if limit > size():
+            return None
+        found: Optional[Tuple[List[Post], int]] = self.snapshot(limit, generations(SCOPES))
+        if found is None:
+            self.load()
+            found = self.posts[:limit], self.count
+        return found
+
+    async def anewest(self, limit: int) -> Optional[Tuple[List[Post], int]]:
+        """newest for the async views"""
+        if limit > size():
+            return None
+        found: Optional[Tuple[List[Post], int]] = self.snapshot(
+            limit, await agenerations(SCOPES)
+        )
+        if found is None:
+            await sync_to_async(self.load)()
+            found = self.posts[:limit], self.count
+        return found
+
+    def saved(self, post_id: int, created: bool) -> None:
+        """Puts a saved post in its place, or out of the window, call it once
+        the save is committed"""
+        if self.versions is None:
+            return  # loads up to date on its first read
+        fresh: Optional[Post] = newest_first().using(DEFAULT_DB_ALIAS).filter(pk=post_id).first()
+        with self.lock:
+            self.count += created
+            posts: List[Post] = [kept for kept in self.posts if kept.pk != post_id]
+            # every other post is in the window, or the post is newer than its last one
+            if fresh is not None and (
+                self.count - 1 <= len(posts) or posts and position(fresh) > position(posts[-1])
+            ):
+                posts.append(fresh)
+                posts.sort(key=position, reverse=True)
+            self.posts = posts[: size()]
+        self.refresh()
+
+    def deleted(self, post_id: int) -> None:
+        """Call it once the delete is committed"""
+        if self.versions is None:
+            return
+        with self.lock:
+            self.count -= 1
+            self.posts = [kept for kept in self.posts if kept.pk != post_id]
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reloads a window a post left with a gap (the next posts are only in
+        the database), else marks it up to date with the generations the
+        signals of the write just bumped"""
+        with self.lock:
+            short: bool = len(self.posts) < min(size(), self.count)
+        if short:
+            self.load()
+            return
+        versions: List[Any] = generations(SCOPES)
+        with self.lock:
+            self.versions = versions
+
+
+recent: RecentPosts = RecentPosts()
+
+
+def warm() -> None:
+    """Loads the buffer when the process starts, a database without the blog
+    tables (before migrate) leaves it to the first read"""
+    try:
+        recent.load()
+    except DatabaseError:
+        recent.clear()
+
+
+def is_first_page(request: Any, cursor: bool) -> bool:
+    if cursor:
+        return not request.GET.get("cursor")
+    return request.GET.get("page") in (None, "", "1")
+
+
+def first_page(
+    queryset: QuerySet, page_size: int, cursor: bool, window: Tuple[List[Post], int]
+) -> Tuple[Any, Any]:
+    """(paginator, page) of the first page of queryset, the newest posts,
+    made of a window of the buffer with page_size + 1 posts"""
+    posts, count = window
+    if cursor:
+        paginator: Any = CursorPaginator(queryset, page_size)
+        page: Any = paginator.build_page(None, list(posts))
+        return paginator, page
+    paginator = CountedPaginator(queryset, page_size)
+    paginator.count = count
+    return paginator, Page(list(posts[:page_size]), 1, paginator)
+
@@ -0,0 +1,110 @@
+"""Reads of the read only pages from the replicas of the database
+
+settings.BLOG_REPLICAS names the database aliases that hold copies of the
+default one. ReplicaMiddleware picks one of them for the requests of the
+views with replica_reads = True and ReplicaRouter sends the reads of those
+requests there, everything else (writes, auth, sessions, the jobs) stays on
+the primary. A client that just wrote gets a cookie that keeps it on the
+primary for settings.BLOG_REPLICA_PIN_SECONDS, so it reads its own writes
+while the replicas catch up.
+"""
+import random
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
+
+PIN_COOKIE: str = "blog_primary"
+
+# apps whose rows are read right after they are written or must never be stale
+PRIMARY_APPS: frozenset = frozenset(["auth", "sessions", "contenttypes", "admin", "jobs"])
+
+current: ContextVar[Optional[str]] = ContextVar("replica", default=None)
+
+
+def replicas() -> List[str]:
+    return getattr(settings, "BLOG_REPLICAS", [])
+
+
+def pin_seconds() -> int:
+    return getattr(settings, "BLOG_REPLICA_PIN_SECONDS", 10)
+
+
+class ReplicaRouter:
+    """Sends the reads of the replica requests to their replica"""
+
+    def db_for_read(self, model: type, **hints: Any) -> Optional[str]:
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return current.get()
+
+    def db_for_write(self, model: type, **hints: Any) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> bool:
+        return True  # every alias holds the same rows
+
+    def allow_migrate(self, db: str, app_label: str, **hints: Any) -> bool:
+        return db not in replicas()  # the replicas are copies, migrated with the primary
+
+
+def reads_from_replica(request: HttpRequest) -> bool:
+    if request.method not in ("GET", "HEAD") or PIN_COOKIE in request.COOKIES:
+        return False
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    # class based views, or callable instances like the feeds
+    view: Any = getattr(match.func, "view_class", match.func)
+    return getattr(view, "replica_reads", False)
+
+
+class ReplicaMiddleware:
+    """Routes the replica requests and pins the clients that wrote to the primary"""
+
+    sync_capable: bool = True
+    async_capable: bool = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response: Callable = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        token = current.set(self.choose(request))
+        try:
+            response: HttpResponse = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.pin(request, response)
+
+    async def acall(self, request: HttpRequest) -> HttpResponse:
+        token = current.set(self.choose(request))
+        try:
+            response: HttpResponse = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.pin(request, response)
+
+    @staticmethod
+    def choose(request: HttpRequest) -> Optional[str]:
+        """One replica per request so all its reads see the same copy"""
+        if replicas() and reads_from_replica(request):
+            return random.choice(replicas())
+        return None
+
+    @staticmethod
+    def pin(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if replicas() and request.method not in ("GET", "HEAD", "OPTIONS") and (
+            response.status_code < 400
+        ):
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=pin_seconds(), httponly=True, samesite="Lax"
+            )
+        return response
@@ -0,0 +1,172 @@
+"""Full text search of the posts on an SQLite FTS5 index
+
+blog_post_fts is an external content FTS5 table over blog_post(title, content),
+triggers on blog_post keep it in sync so bulk_create and queryset updates are
+indexed too. Django rebuilds blog_post when a migration alters it and the
+triggers go with the old table, so install() also runs after every migrate.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+from .models import Post
+from .pagination import BACKWARD, FORWARD, CursorPage, InvalidCursor, decode_cursor
+
+TABLE: str = "blog_post_fts"
+# a title hit counts five times a content hit
+RANKING: str = f"bm25({TABLE}, 5.0, 1.0)"
+MARK_START: str = "\x02"
+MARK_END: str = "\x03"
+
+SCHEMA: List[str] = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        title, content, content='blog_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_update AFTER UPDATE OF title, content
+    ON blog_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+
+def is_supported(connection: BaseDatabaseWrapper) -> bool:
+    return connection.vendor == "sqlite"
+
+
+def install(connection: BaseDatabaseWrapper) -> None:
+    """Creates the index and its triggers if they are missing"""
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+
+def rebuild(connection: BaseDatabaseWrapper) -> None:
+    """Re-reads every post into the index"""
+    if not is_supported(connection):
+        return
+    install(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def optimize(connection: BaseDatabaseWrapper) -> None:
+    """Merges the index segments, worth it after big imports"""
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def matching(queryset: Any, query: str) -> Any:
+    """Filters a queryset of posts down to the ones the index matches"""
+    expression: str = match_expression(query)
+    if not expression:
+        return queryset
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [expression])
+    )
+
+
+def match_expression(query: str) -> str:
+    """Turns user input into an FTS5 query: every word must match, the last
+    one as a prefix so results show up while typing"""
+    words: List[str] = re.findall(r"\w+", query)
+    if not words:
+        return ""
+    terms: List[str] = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(text: str) -> SafeString:
+    """Escapes a snippet and turns the FTS5 markers into <mark> tags"""
+    return mark_safe(
+        escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+    )
+
+
+class SearchPaginator:
+    """Cursor paginator over the ranked matches of a query, ordered by (rank, id)"""
+
+    is_cursor: bool = True
+
+    def __init__(self, query: str, per_page: int, using: str = "default") -> None:
+        self.query: str = query
+        self.expression: str = match_expression(query)
+        self.per_page: int = int(per_page)
+        self.using: str = using
+
+    def key_of(self, post: Post) -> float:
+        return post.search_rank
+
+    def pk_of(self, post: Post) -> int:
+        return post.pk
+
+    def rows(self, cursor: Optional[str]) -> Tuple[Optional[str], List[Tuple]]:
+        """Returns the direction of the cursor and (id, score, title, snippet) rows"""
+        where: str = ""
+        params: List[Any] = [self.expression]
+        order: str = "score, id"
+        direction: Optional[str] = None
+        if cursor:
+            direction, score, pk = decode_cursor(cursor)
+            if not isinstance(score, (int, float)):
+                raise InvalidCursor("Invalid cursor")
+            if direction == FORWARD:
+                where = "WHERE score > %s OR (score = %s AND id > %s)"
+            else:
+                where = "WHERE score < %s OR (score = %s AND id < %s)"
+                order = "score DESC, id DESC"
+            params += [score, score, pk]
+        params.append(self.per_page + 1)
+        sql: str = f"""
+            SELECT id, score, title, snippet FROM (
+                SELECT rowid AS id, {RANKING} AS score,
+                    highlight({TABLE}, 0, '{MARK_START}', '{MARK_END}') AS title,
+                    snippet({TABLE}, 1, '{MARK_START}', '{MARK_END}', '…', 20) AS snippet
+                FROM {TABLE} WHERE {TABLE} MATCH %s
+            ) {where} ORDER BY {order} LIMIT %s
+        """
+        with connections[self.using].cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            return direction, db_cursor.fetchall()
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Returns a page of posts with search_rank, highlighted_title and snippet set"""
+        if not self.expression:
+            return CursorPage([], self, False, False)
+        direction, rows = self.rows(cursor)
+        has_more: bool = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+        posts: Dict[int, Post] = Post.objects.for_listing().in_bulk(
+            [row[0] for row in rows]
+        )
+        results: List[Post] = []
+        for pk, score, title, snippet in rows:
+            if pk not in posts:  # deleted since the index was read
+                continue
+            post: Post = posts[pk]
+            post.search_rank = score
+            post.highlighted_title = highlight(title)
+            post.snippet = highlight(snippet)
+            results.append(post)
+        if direction == BACKWARD:
+            return CursorPage(results, self, True, has_more)
+        return CursorPage(results, self, has_more, direction == FORWARD)
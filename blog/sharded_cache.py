@@ -0,0 +1,258 @@
+"""In process cache backend for the threaded and ASGI workers
+
+LocMemCache puts every key behind one lock and culls a third of the keys,
+hot ones included, when it is full. ShardedLRUCache splits the keys over
+SHARDS dicts with a lock each, so threads touching different keys rarely
+wait on each other, and evicts the least recently used key of a full shard
+one at a time. Entries expire like in LocMemCache.
+
+get_or_set() is single flight: when a key is missing (or expired) only the
+first thread computes it, the others asking for the same key meanwhile wait
+for its value instead of computing it again. The stores count their hits,
+misses, expirations and evictions, see stats().
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAT_NAMES: Tuple[str, ...] = ("hits", "misses", "expirations", "evictions", "coalesced")
+
+
+@dataclass
+class Flight:
+    """A computation of a missing key and the threads waiting for it"""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    waiters: int = 0
+
+
+@dataclass
+class Shard:
+    """Keys whose hash falls on this shard: key -> (expiry, pickled value),
+    the least recently used first"""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = field(
+        default_factory=OrderedDict
+    )
+    flights: Dict[str, Flight] = field(default_factory=dict)
+    stats: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(STAT_NAMES, 0))
+
+
+# shards of every cache of the process by name, the backend instances are per thread
+_stores: Dict[str, List[Shard]] = {}
+_stores_lock: threading.Lock = threading.Lock()
+
+
+class ShardedLRUCache(BaseCache):
+    """Lock sharded LRU cache with TTLs, OPTIONS: MAX_ENTRIES for the whole
+    cache and SHARDS"""
+
+    pickle_protocol: int = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name: str, params: Dict[str, Any]) -> None:
+        super().__init__(params)
+        options: Dict[str, Any] = params.get("OPTIONS", {})
+        count: int = int(options.get("SHARDS", 16))
+        with _stores_lock:
+            self.shards: List[Shard] = _stores.setdefault(
+                name, [Shard() for _ in range(count)]
+            )
+        self.shard_size: int = max(1, self._max_entries // len(self.shards))
+
+    def shard(self, key: str) -> Shard:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def lookup(self, shard: Shard, key: str, counted: bool = True) -> Optional[bytes]:
+        """The pickled value of a live key, marked as used, call it under the lock"""
+        entry: Optional[Tuple[Optional[float], bytes]] = shard.entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.time():
+            del shard.entries[key]
+            shard.stats["expirations"] += 1
+            entry = None
+        if entry is None:
+            shard.stats["misses"] += counted
+            return None
+        shard.entries.move_to_end(key)
+        shard.stats["hits"] += counted
+        return entry[1]
+
+    def store(self, shard: Shard, key: str, pickled: bytes, timeout: Any) -> None:
+        """Call it under the lock"""
+        if key in shard.entries:
+            shard.entries.move_to_end(key)
+        else:
+            while len(shard.entries) >= self.shard_size:
+                shard.entries.popitem(last=False)
+                shard.stats["evictions"] += 1
+        shard.entries[key] = (self.get_backend_timeout(timeout), pickled)
+
+    def is_live(self, shard: Shard, key: str) -> bool:
+        entry: Optional[Tuple[Optional[float], bytes]] = shard.entries.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > time.time())
+
+    def get(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        key = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            pickled: Optional[bytes] = self.lookup(shard, key)
+        return default if pickled is None else pickle.loads(pickled)
+
+    def set(
+        self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> None:
+        key = self.make_and_validate_key(key, version=version)
+        pickled: bytes = pickle.dumps(value, self.pickle_protocol)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            self.store(shard, key, pickled, timeout)
+
+    def add(
+        self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        pickled: bytes = pickle.dumps(value, self.pickle_protocol)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            if self.is_live(shard, key):
+                return False
+            self.store(shard, key, pickled, timeout)
+            return True
+
+    def touch(
+        self, key: str, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            if not self.is_live(shard, key):
+                return False
+            shard.entries[key] = (self.get_backend_timeout(timeout), shard.entries[key][1])
+            shard.entries.move_to_end(key)
+            return True
+
+    def incr(self, key: str, delta: int = 1, version: Optional[int] = None) -> Any:
+        key = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            if not self.is_live(shard, key):
+                raise ValueError(f"Key '{key}' not found")
+            expiry, pickled = shard.entries[key]
+            value: Any = pickle.loads(pickled) + delta
+            shard.entries[key] = (expiry, pickle.dumps(value, self.pickle_protocol))
+            shard.entries.move_to_end(key)
+        return value
+
+    def has_key(self, key: str, version: Optional[int] = None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            return self.is_live(shard, key)
+
+    def delete(self, key: str, version: Optional[int] = None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(key)
+        with shard.lock:
+            return shard.entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        for shard in self.shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def get_or_set(
+        self,
+        key: str,
+        default: Any,
+        timeout: Any = DEFAULT_TIMEOUT,
+        version: Optional[int] = None,
+    ) -> Any:
+        value: Any = self.get(key, self._missing_key, version=version)
+        if value is not self._missing_key:
+            return value
+        if not callable(default):
+            # not through super(), its second get() would count the miss twice
+            if self.add(key, default, timeout, version):
+                return default
+            return self.get(key, default, version=version)  # another thread added it
+        full_key: str = self.make_and_validate_key(key, version=version)
+        shard: Shard = self.shard(full_key)
+        with shard.lock:
+            flight: Flight = shard.flights.setdefault(full_key, Flight())
+            flight.waiters += 1
+        try:
+            with flight.lock:
+                # the thread that held the lock has stored the value by now
+                with shard.lock:
+                    pickled: Optional[bytes] = self.lookup(shard, full_key, counted=False)
+                    if pickled is not None:
+                        shard.stats["coalesced"] += 1
+                if pickled is not None:
+                    return pickle.loads(pickled)
+                value = default()
+                self.set(key, value, timeout, version)
+                return value
+        finally:
+            with shard.lock:
+                flight.waiters -= 1
+                if not flight.waiters:
+                    del shard.flights[full_key]
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of this cache in this process since it started, and its size"""
+        totals: Dict[str, int] = dict.fromkeys(STAT_NAMES, 0)
+        totals["entries"] = 0
+        for shard in self.shards:
+            with shard.lock:
+                for name in STAT_NAMES:
+                    totals[name] += shard.stats[name]
+                totals["entries"] += len(shard.entries)
+        return totals
+
+    # nothing here waits on I/O, the event loop can take the locks itself
+    # instead of going through a thread like the BaseCache versions do
+
+    async def aget(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        return self.get(key, default, version)
+
+    async def aset(
+        self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> None:
+        self.set(key, value, timeout, version)
+
+    async def aadd(
+        self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> bool:
+        return self.add(key, value, timeout, version)
+
+    async def adelete(self, key: str, version: Optional[int] = None) -> bool:
+        return self.delete(key, version)
+
+    async def aget_many(self, keys: List[str], version: Optional[int] = None) -> Dict[str, Any]:
+        return self.get_many(keys, version)
+
+    async def aset_many(
+        self, data: Dict[str, Any], timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> List[str]:
+        return self.set_many(data, timeout, version)
+
+    async def ahas_key(self, key: str, version: Optional[int] = None) -> bool:
+        return self.has_key(key, version)
+
+    async def adelete_many(self, keys: List[str], version: Optional[int] = None) -> None:
+        self.delete_many(keys, version)
+
+    async def atouch(
+        self, key: str, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None
+    ) -> bool:
+        return self.touch(key, timeout, version)
+
+    async def aincr(self, key: str, delta: int = 1, version: Optional[int] = None) -> Any:
+        return self.incr(key, delta, version)
+
+    async def aclear(self) -> None:
+        self.clear()
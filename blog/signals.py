@@ -0,0 +1,138 @@
+# pylint: disable=unused-argument
+# pylint: disable=relative-beyond-top-level
+"""Signals"""
+from typing import Any, List, Optional
+from django.db import connections, transaction
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from users.models import Profile
+from . import announcements, cache, counters, search
+from .recent import recent
+from .models import Post, PostCounter, Announcement
+
+
+def evict_posts_of(user_id: int) -> None:
+    """Drops the cached rows of every post of the user"""
+    post_ids = Post.objects.filter(author_id=user_id).values_list("pk", flat=True)
+    batch: list = []
+    for post_id in post_ids.iterator(chunk_size=1000):
+        batch.append(post_id)
+        if len(batch) == 1000:
+            cache.delete_post_rows(batch)
+            batch = []
+    cache.delete_post_rows(batch)
+
+
+def evict_announcements_of(user_id: int) -> None:
+    """Drops the cached rows of every announcement of the user, there are few"""
+    cache.delete_announcement_rows(
+        Announcement.objects.filter(author_id=user_id).values_list("pk", flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Post)
+def evict_post(sender: type, instance: Post, **kwargs: Any) -> None:
+    """A post shows up on the main pages and on the page of its author, and
+    until this save on the page of its old author"""
+    scopes: List[str] = ["posts", f"author:{instance.author.username}"]
+    old_author_id: Optional[int] = getattr(instance, "_saved_author_id", None)
+    if old_author_id is not None and old_author_id != instance.author_id:
+        old_username: QuerySet = User.objects.filter(pk=old_author_id).values_list(
+            "username", flat=True
+        )
+        scopes.extend(f"author:{username}" for username in old_username)
+    cache.bump(*scopes)
+    cache.delete_post_rows([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender: type, instance: Post, created: bool, **kwargs: Any) -> None:
+    """Runs inside the transaction of Post.save"""
+    if kwargs.get("raw"):
+        return
+    if created:
+        counters.add(counters.ALL_POSTS, 1)
+        counters.add(counters.author_key(instance.author_id), 1)
+        return
+    old_author_id = getattr(instance, "_saved_author_id", None)
+    if old_author_id is not None and old_author_id != instance.author_id:
+        counters.add(counters.author_key(old_author_id), -1)
+        counters.add(counters.author_key(instance.author_id), 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender: type, instance: Post, **kwargs: Any) -> None:
+    """Runs inside the transaction of the delete collector"""
+    counters.add(counters.ALL_POSTS, -1)
+    counters.add(counters.author_key(instance.author_id), -1)
+
+
+@receiver(post_save, sender=Post)
+def place_saved_post(sender: type, instance: Post, created: bool, **kwargs: Any) -> None:
+    """The recent posts are shared by the process, they only take committed
+    posts, a rolled back save leaves the generation evict_post bumped behind
+    and the window reloads"""
+    if kwargs.get("raw"):
+        recent.clear()  # the author of a fixture may not be loaded yet
+        return
+    post_id: int = instance.pk
+    transaction.on_commit(lambda: recent.saved(post_id, created), using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post(sender: type, instance: Post, **kwargs: Any) -> None:
+    post_id: int = instance.pk  # the collector clears it after the delete
+    transaction.on_commit(lambda: recent.deleted(post_id), using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=User)
+def drop_author_counter(sender: type, instance: User, **kwargs: Any) -> None:
+    """The posts are gone by now, so is the need for their counter"""
+    PostCounter.objects.filter(key=counters.author_key(instance.pk)).delete()
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def evict_announcement(sender: type, instance: Announcement, **kwargs: Any) -> None:
+    """Announcements show up on their own page and in the unread counters"""
+    cache.bump("announcements")
+    cache.delete_announcement_rows([instance.pk])
+    announcements.evict()
+
+
+@receiver([post_save, post_delete], sender=User)
+def evict_user(sender: type, instance: User, **kwargs: Any) -> None:
+    """Usernames are on every page, logins only touch last_login so they are skipped"""
+    update_fields = kwargs.get("update_fields")
+    if kwargs.get("created") or (update_fields and "username" not in update_fields):
+        return
+    cache.bump("users")
+    evict_posts_of(instance.pk)
+    evict_announcements_of(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def evict_profile(sender: type, instance: Profile, **kwargs: Any) -> None:
+    """Profile pictures are on every page, next to the posts and announcements"""
+    if kwargs["signal"] is post_save and (
+        kwargs["created"] or not instance.image_changed() and not instance.image_hash_changed()
+    ):
+        return  # the picture and its resized copies are the same
+    if not (
+        Post.objects.filter(author_id=instance.user_id).exists()
+        or Announcement.objects.filter(author_id=instance.user_id).exists()
+    ):
+        return  # no page shows the picture, like the first one of a new user
+    cache.bump("users")
+    evict_posts_of(instance.user_id)
+    evict_announcements_of(instance.user_id)
+
+
+def reinstall_search_triggers(sender: Any, using: str, **kwargs: Any) -> None:
+    """A migration that rebuilds blog_post drops the triggers of the search index"""
+    connection = connections[using]
+    if search.is_supported(connection) and search.TABLE in (
+        connection.introspection.table_names()
+    ):
+        search.install(connection)
@@ -0,0 +1,34 @@
+"""Settings of the SQLite connections
+
+SQLite keeps most of its settings per connection, so the PRAGMAs of
+settings.BLOG_SQLITE_PRAGMAS run on every connection Django opens (see
+BlogConfig.ready). WAL lets readers run while a writer commits instead of
+failing with "database is locked", busy_timeout makes the writers wait for
+each other, mmap_size and cache_size keep the hot pages in memory.
+"""
+from typing import Any, Dict
+from django.conf import settings
+
+
+def pragmas() -> Dict[str, Any]:
+    return getattr(settings, "BLOG_SQLITE_PRAGMAS", {})
+
+
+def apply_pragmas(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """connection_created receiver"""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def current_pragmas(connection: Any) -> Dict[str, Any]:
+    """The values the connection runs with, for the checks and the benchmarks"""
+    values: Dict[str, Any] = {}
+    with connection.cursor() as cursor:
+        for name in pragmas():
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,25 @@
+# pylint: disable=relative-beyond-top-level
+"""Template tags of the static asset pipeline"""
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from ..assets import BUNDLES, VENDOR, is_bundled
+
+register: template.Library = template.Library()
+
+
+@register.simple_tag
+def stylesheets(bundle: str) -> str:
+    """<link> of the hashed bundle once collected, else of each of its files,
+    from its CDN while a vendored one is not downloaded yet"""
+    if is_bundled():
+        return format_html('<link rel="stylesheet" href="{}">', static(bundle))
+    links: list = []
+    for part in BUNDLES[bundle]:
+        if part in VENDOR and finders.find(part) is None:
+            url, integrity = VENDOR[part]
+            links.append((url, format_html(' integrity="{}" crossorigin="anonymous"', integrity)))
+        else:
+            links.append((static(part), ""))
+    return format_html_join("\n", '<link rel="stylesheet" href="{}"{}>', links)
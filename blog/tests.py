@@ -1,17 +1,49 @@
 # pylint: disable=import-error
 # pylint: disable=relative-beyond-top-level
 """Modules for testing"""
+import base64
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
 from typing import Any, Dict, List
+from unittest import mock, skipIf
 from faker import Faker
-from django.http import HttpRequest
-from django.test import TestCase, Client
-from django.urls import reverse, resolve
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpRequest, HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
+from django.utils import timezone
+from django.urls import include, path, reverse, resolve
 from django.core import exceptions as exception
+from django.core.management import call_command, CommandError
+from django.core.cache import cache
 from django.contrib.auth.models import User
+from jobs.queue import run_pending
+from blogpage.settings import MEDIA_ROOT
 from users.models import UserFactory
-from .models import Post, Announcement, PostFactory, AnnouncementFactory
-from . import views
+from .models import Post, PostCounter, Announcement, PostFactory, AnnouncementFactory
+from . import announcements, assets, counters, instrumentation, recent, replicas, sqlite, views
+from .pagination import CursorPaginator
+from .sharded_cache import ShardedLRUCache
+from .cache import bump, page_timeout
+from .backends.sqlite3.base import DatabaseWrapper
+from .templatetags.assets import stylesheets
 
+# root url conf of AsyncViewTest, the async blog urls shadow the ones of blogpage.urls
+urlpatterns: List[Any] = [
+    path("", include("blog.async_urls")),
+    path("", include("blogpage.urls")),
+]
 
 
 class PostTest(TestCase):
@@ -42,6 +74,18 @@ class PostTest(TestCase):
         self.assertEqual(post_updated.title, self.post.title)
         print("test_post_updated is ok")
 
+    def test_post_excerpt(self) -> None:
+        """Checks the excerpt follows the content"""
+        self.assertEqual(self.post.excerpt, self.post.content[:50])
+        self.post.content = "x" * 80
+        self.post.save(update_fields=["content"])
+        self.assertEqual(Post.objects.get(id=self.post.id).excerpt, "x" * 50)
+        listed: Post = Post.objects.for_listing().get(id=self.post.id)
+        listed.title = "Renamed"
+        listed.save()  # the content is deferred, the excerpt stays
+        self.assertEqual(Post.objects.get(id=self.post.id).excerpt, "x" * 50)
+        print("test_post_excerpt is ok")
+
     def test_post_deleted(self) -> None:
         """Checks post is deleted"""
         self.post.delete()
@@ -216,3 +260,1422 @@ class ViewTest(TestCase):
         response_delete: HttpRequest = self.client.delete(url_delete)
         self.assertEqual(response_delete.status_code, 302)
         print("test_post_view_delete is ok")
+
+
+@override_settings(BLOG_PAGINATION_MODE="cursor")
+class CursorPaginationTest(TestCase):
+    """Tests keyset pagination of the post lists"""
+
+    def setUp(self) -> None:
+        self.user: User = UserFactory()
+        self.user.save()
+        # logged in so the pages are rendered instead of served from the page cache
+        self.client.force_login(self.user)
+        now = timezone.now()
+        # pairs of posts share a timestamp so the id tie breaker is exercised
+        for i in range(12):
+            PostFactory(author=self.user, datePosted=now - timedelta(days=i // 2)).save()
+        self.expected: List[int] = list(
+            Post.objects.order_by("-datePosted", "-id").values_list("id", flat=True)
+        )
+
+    def walk(self, url: str) -> List[List[int]]:
+        """Follows the next cursors until the last page"""
+        pages: List[List[int]] = []
+        response: HttpRequest = self.client.get(url)
+        while True:
+            pages.append([post.id for post in response.context["posts"]])
+            page_obj = response.context["page_obj"]
+            if not page_obj.has_next():
+                return pages
+            response = self.client.get(url, {"cursor": page_obj.next_cursor})
+
+    def test_cursor_walks_forward_and_back(self) -> None:
+        """Checks every post is listed once and previous cursors return the same pages"""
+        for url in [
+            reverse("blog-home"),
+            reverse("allposts-user", kwargs={"username": self.user.username}),
+        ]:
+            with self.subTest(url=url):
+                pages: List[List[int]] = self.walk(url)
+                self.assertEqual(sum(pages, []), self.expected)
+                self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+                response: HttpRequest = self.client.get(url)
+                response = self.client.get(
+                    url, {"cursor": response.context["page_obj"].next_cursor}
+                )
+                response = self.client.get(
+                    url, {"cursor": response.context["page_obj"].previous_cursor}
+                )
+                self.assertEqual([post.id for post in response.context["posts"]], pages[0])
+                self.assertFalse(response.context["page_obj"].has_previous())
+        print("test_cursor_walks_forward_and_back is ok")
+
+    def test_invalid_cursor(self) -> None:
+        """Checks a broken cursor gives 404 instead of an error"""
+        response: HttpRequest = self.client.get(reverse("blog-home"), {"cursor": "abc"})
+        self.assertEqual(response.status_code, 404)
+        for pk in ["1e400", "1" + "0" * 30, '"1"', "1.5", "null"]:
+            token: str = base64.urlsafe_b64encode(
+                f'["n", "2020-01-01T00:00:00+00:00", {pk}]'.encode()
+            ).decode()
+            with self.subTest(pk=pk):
+                response = self.client.get(reverse("blog-home"), {"cursor": token})
+                self.assertEqual(response.status_code, 404)
+        print("test_invalid_cursor is ok")
+
+
+class ListQueryCountTest(TestCase):
+    """Tests that the post lists don't query per post"""
+
+    def setUp(self) -> None:
+        self.users: List[User] = [UserFactory() for _ in range(3)]
+        for user in self.users:
+            user.save()
+        for i in range(7):
+            PostFactory(author=self.users[i % 3]).save()
+        cache.clear()
+
+    def test_list_views_query_count(self) -> None:
+        """Checks every list view runs a fixed number of queries whatever the authors are"""
+        username: str = self.users[0].username
+        recent.recent.load()
+        cases: List[Any] = [
+            (reverse("blog-home"), 0),  # the first page is in blog/recent.py
+            (reverse("blog-home") + "?page=2", 2),  # count, posts
+            (reverse("allposts-user", kwargs={"username": username}), 3),  # user, count, posts
+            (reverse("posts-latest"), 0),
+        ]
+        for url, queries in cases:
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                response: HttpRequest = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        cache.clear()
+        recent.recent.load()
+        with override_settings(BLOG_PAGINATION_MODE="cursor"), self.assertNumQueries(0):
+            self.client.get(reverse("blog-home"))
+        cursor: str = CursorPaginator(Post.objects.all(), 5).page().next_cursor
+        with override_settings(BLOG_PAGINATION_MODE="cursor"), self.assertNumQueries(1):
+            self.client.get(reverse("blog-home"), {"cursor": cursor})
+        print("test_list_views_query_count is ok")
+
+    def test_for_listing_defers_unused_columns(self) -> None:
+        """Checks the listing query only loads what the templates show"""
+        post: Post = Post.objects.for_listing().first()
+        self.assertIn("password", post.author.get_deferred_fields())
+        self.assertIn("email", post.author.get_deferred_fields())
+        self.assertIn("content", post.get_deferred_fields())
+        self.assertEqual(post.excerpt, Post.objects.get(pk=post.pk).content[:50])
+        print("test_for_listing_defers_unused_columns is ok")
+
+
+class QueryPlanTest(TestCase):
+    """Tests the list queries use the timeline indexes"""
+
+    def test_check_query_plans(self) -> None:
+        """Runs the EXPLAIN QUERY PLAN check, it raises CommandError on a table scan"""
+        call_command("check_query_plans", stdout=io.StringIO())
+        print("test_check_query_plans is ok")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PageCacheTest(TestCase):
+    """Tests the anonymous page cache and its eviction"""
+
+    def setUp(self) -> None:
+        shutil.copy(os.path.join(MEDIA_ROOT, "default.png"), settings.MEDIA_ROOT)
+        cache.clear()
+        self.author: User = UserFactory()
+        self.author.save()
+        self.other: User = UserFactory()
+        self.other.save()
+        self.post: Post = PostFactory(author=self.author)
+        self.post.save()
+        PostFactory(author=self.other).save()
+        self.home: str = reverse("blog-home")
+        self.other_page: str = reverse(
+            "allposts-user", kwargs={"username": self.other.username}
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(settings.MEDIA_ROOT)
+        super().tearDownClass()
+
+    def test_anonymous_pages_cached(self) -> None:
+        """Checks a second anonymous hit does not touch the database"""
+        urls: List[str] = [
+            self.home,
+            self.other_page,
+            reverse("posts-latest"),
+            reverse("announcements"),
+        ]
+        for url in urls:
+            first: HttpRequest = self.client.get(url)
+            with self.subTest(url=url), self.assertNumQueries(0):
+                second: HttpRequest = self.client.get(url)
+            self.assertEqual(first.content, second.content)
+        print("test_anonymous_pages_cached is ok")
+
+    def test_post_save_evicts_its_pages_only(self) -> None:
+        """Checks an edit shows up on the main page and leaves other authors cached"""
+        self.client.get(self.home)
+        self.client.get(self.other_page)
+        self.post.title = "A brand new title"
+        self.post.save()
+        self.assertContains(self.client.get(self.home), "A brand new title")
+        with self.assertNumQueries(0):
+            self.client.get(self.other_page)
+        print("test_post_save_evicts_its_pages_only is ok")
+
+    def test_author_change_evicts_both_authors(self) -> None:
+        """Checks a post given to another author leaves the page of the old one"""
+        author_page: str = reverse("allposts-user", kwargs={"username": self.author.username})
+        self.assertContains(self.client.get(author_page), self.post.title)
+        self.client.get(self.other_page)
+        self.post.author = self.other
+        self.post.save()
+        self.assertNotContains(self.client.get(author_page), self.post.title)
+        self.assertContains(self.client.get(self.other_page), self.post.title)
+        print("test_author_change_evicts_both_authors is ok")
+
+    def test_announcement_save_evicts(self) -> None:
+        """Checks a new announcement shows up"""
+        url: str = reverse("announcements")
+        self.client.get(url)
+        AnnouncementFactory(author=self.author, title="Server moved").save()
+        self.assertContains(self.client.get(url), "Server moved")
+        print("test_announcement_save_evicts is ok")
+
+    def test_login_does_not_evict(self) -> None:
+        """Checks the last_login update of a login keeps the pages"""
+        self.client.get(self.home)
+        self.author.set_password("abc12345")
+        self.author.save()
+        self.client.get(self.home)
+        Client().login(username=self.author.username, password="abc12345")
+        with self.assertNumQueries(0):
+            self.client.get(self.home)
+        print("test_login_does_not_evict is ok")
+
+    def test_registration_does_not_evict(self) -> None:
+        """Checks a new user, and the job building their first picture, keep the pages"""
+        run_pending()  # the pictures of the authors
+        self.client.get(self.home)
+        response: HttpResponse = Client().post(
+            reverse("register"),
+            {
+                "username": "newcomer",
+                "email": "newcomer@example.com",
+                "password1": "A-long-pass-123",
+                "password2": "A-long-pass-123",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        run_pending()
+        self.assertNotEqual(User.objects.get(username="newcomer").profile.image_hash, "")
+        with self.assertNumQueries(0):
+            self.client.get(self.home)
+        print("test_registration_does_not_evict is ok")
+
+    def test_author_picture_evicts(self) -> None:
+        """Checks the new copies of the picture of an author show up"""
+        run_pending()
+        self.client.get(self.home)
+        self.author.profile.image_hash = "0" * 32
+        self.author.profile.save(update_fields=["image_hash"])
+        self.assertContains(self.client.get(self.home), f"avatars/{'0' * 32}/")
+        print("test_author_picture_evicts is ok")
+
+    def test_logged_in_user_gets_own_buttons(self) -> None:
+        """Checks cached rows still get the Update/Delete buttons of the viewer"""
+        update_url: str = reverse("post-update", kwargs={"pk": self.post.pk})
+        self.client.get(self.home)
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(self.home), update_url)
+        self.client.force_login(self.other)
+        self.assertNotContains(self.client.get(self.home), update_url)
+        self.post.title = "Renamed for everybody"
+        self.post.save()
+        self.assertContains(self.client.get(self.home), "Renamed for everybody")
+        print("test_logged_in_user_gets_own_buttons is ok")
+
+
+class PostCounterTest(TestCase):
+    """Tests the denormalized post counters"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.other: User = UserFactory()
+        self.other.save()
+        self.posts: List[Post] = [PostFactory(author=self.user) for _ in range(3)]
+        for post in self.posts:
+            post.save()
+
+    def stored(self, key: str) -> int:
+        return PostCounter.objects.get(key=key).count
+
+    def test_counters_follow_posts(self) -> None:
+        """Checks create, delete and a change of author update the counters"""
+        self.assertEqual(self.stored(counters.ALL_POSTS), 3)
+        self.assertEqual(self.stored(counters.author_key(self.user.pk)), 3)
+
+        self.posts[0].delete()
+        moved: Post = Post.objects.get(pk=self.posts[1].pk)
+        moved.author = self.other
+        moved.save()
+        self.assertEqual(self.stored(counters.ALL_POSTS), 2)
+        self.assertEqual(self.stored(counters.author_key(self.user.pk)), 1)
+        self.assertEqual(self.stored(counters.author_key(self.other.pk)), 1)
+        self.assertEqual(counters.drift(), [])
+        print("test_counters_follow_posts is ok")
+
+    def test_drifted_counter_does_not_block_delete(self) -> None:
+        """Checks a counter that drifted to 0 stays at 0 and the delete goes through"""
+        PostCounter.objects.filter(key=counters.ALL_POSTS).update(count=0)
+        self.posts[0].delete()
+        self.assertFalse(Post.objects.filter(pk=self.posts[0].pk).exists())
+        self.assertEqual(self.stored(counters.ALL_POSTS), 0)
+        self.assertEqual(self.stored(counters.author_key(self.user.pk)), 2)
+        print("test_drifted_counter_does_not_block_delete is ok")
+
+    def test_lists_do_not_count(self) -> None:
+        """Checks the paginated lists read the counter instead of running COUNT(*)"""
+        urls: List[str] = [
+            reverse("blog-home"),
+            reverse("allposts-user", kwargs={"username": self.user.username}),
+        ]
+        for url in urls:
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response: HttpRequest = self.client.get(url)
+            self.assertEqual(response.context["paginator"].count, 3)
+            self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+        print("test_lists_do_not_count is ok")
+
+    def test_rebuild_command(self) -> None:
+        """Checks --check reports drift and a rebuild fixes it"""
+        PostCounter.objects.filter(key=counters.ALL_POSTS).update(count=42)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_post_counters", "--check", stdout=io.StringIO())
+        call_command("rebuild_post_counters", stdout=io.StringIO())
+        self.assertEqual(self.stored(counters.ALL_POSTS), 3)
+        call_command("rebuild_post_counters", "--check", stdout=io.StringIO())
+        print("test_rebuild_command is ok")
+
+
+class TransferTest(TestCase):
+    """Tests the import_posts and export_posts commands"""
+
+    def setUp(self) -> None:
+        self.users: List[User] = [UserFactory() for _ in range(2)]
+        for user in self.users:
+            user.save()
+        for i in range(5):
+            PostFactory(author=self.users[i % 2]).save()
+        AnnouncementFactory(author=self.users[0]).save()
+        self.directory: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_export_import_round_trip(self) -> None:
+        """Checks exported posts come back the same, with their counters and excerpts"""
+        expected: List[Any] = list(
+            Post.objects.order_by("id").values_list("title", "content", "datePosted", "author")
+        )
+        for fmt in ["ndjson", "csv"]:
+            with self.subTest(fmt=fmt):
+                path: str = os.path.join(self.directory, f"posts.{fmt}")
+                call_command("export_posts", path, format=fmt, chunk_size=2, stderr=io.StringIO())
+                Post.objects.all().delete()
+                cache.clear()
+                output: io.StringIO = io.StringIO()
+                with CaptureQueriesContext(connection) as queries:
+                    call_command(
+                        "import_posts", path, format=fmt, stdout=output, stderr=io.StringIO()
+                    )
+                sql: List[str] = [query["sql"] for query in queries.captured_queries]
+                self.assertEqual(len([query for query in sql if "auth_user" in query]), 1)
+                self.assertEqual(len([query for query in sql if query.startswith("INSERT")]), 1)
+                self.assertIn("Imported 5 posts", output.getvalue())
+                self.assertEqual(
+                    list(
+                        Post.objects.order_by("id").values_list(
+                            "title", "content", "datePosted", "author"
+                        )
+                    ),
+                    expected,
+                )
+                self.assertEqual(counters.drift(), [])
+                post: Post = Post.objects.first()
+                self.assertEqual(post.excerpt, post.content[:50])
+                self.assertContains(self.client.get(reverse("blog-home")), post.excerpt)
+        print("test_export_import_round_trip is ok")
+
+    def test_import_announcements(self) -> None:
+        """Checks announcements go through the same commands"""
+        path: str = os.path.join(self.directory, "announcements.csv")
+        call_command(
+            "export_posts", path, model="announcement", format="csv", stderr=io.StringIO()
+        )
+        self.assertEqual(len(announcements.recent_times()), 1)
+        call_command(
+            "import_posts",
+            path,
+            model="announcement",
+            format="csv",
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+        self.assertEqual(Announcement.objects.count(), 2)
+        self.assertEqual(len(announcements.recent_times()), 2)  # in the unread counts
+        print("test_import_announcements is ok")
+
+    def test_import_unknown_author(self) -> None:
+        """Checks a missing author stops the import unless it is skipped"""
+        path: str = os.path.join(self.directory, "posts.ndjson")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write('{"title": "a", "content": "b", "author": "nobody"}\n')
+            file.write(f'{{"title": "c", "content": "d", "author": "{self.users[0]}"}}\n')
+        with self.assertRaises(CommandError):
+            call_command("import_posts", path, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        output: io.StringIO = io.StringIO()
+        call_command(
+            "import_posts",
+            path,
+            skip_unknown_authors=True,
+            transaction_size=1,
+            stdout=output,
+            stderr=io.StringIO(),
+        )
+        self.assertIn("Imported 1 posts, skipped 1", output.getvalue())
+        self.assertEqual(counters.drift(), [])
+        print("test_import_unknown_author is ok")
+
+
+class SearchTest(TestCase):
+    """Tests the full text search of posts"""
+
+    def setUp(self) -> None:
+        self.user: User = UserFactory()
+        self.user.save()
+        self.in_title: Post = Post(
+            title="Django tips", content="Short post", author=self.user
+        )
+        self.in_title.save()
+        self.in_content: Post = Post(
+            title="Misc", content="Some words about <b>django</b> and more", author=self.user
+        )
+        self.in_content.save()
+        self.url: str = reverse("post-search")
+
+    def search(self, query: str, **params: str) -> List[Post]:
+        response: HttpRequest = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "blog/search.html")
+        return list(response.context["posts"])
+
+    def test_ranked_and_highlighted(self) -> None:
+        """Checks title hits come first and snippets are escaped and highlighted"""
+        posts: List[Post] = self.search("djan")
+        self.assertEqual([post.id for post in posts], [self.in_title.id, self.in_content.id])
+        self.assertEqual(posts[1].snippet, "Some words about &lt;b&gt;<mark>django</mark>&lt;/b&gt; and more")
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(self.search(""), [])
+        print("test_ranked_and_highlighted is ok")
+
+    def test_index_follows_changes(self) -> None:
+        """Checks updates, deletes and bulk_create reach the index"""
+        self.in_title.title = "Flask tips"
+        self.in_title.save()
+        self.in_content.delete()
+        Post.objects.bulk_create([Post(title="Bulk django", content="x", author=self.user)])
+        self.assertEqual([post.title for post in self.search("django")], ["Bulk django"])
+        self.assertEqual([post.title for post in self.search("flask")], ["Flask tips"])
+        print("test_index_follows_changes is ok")
+
+    def test_cursor_pages(self) -> None:
+        """Checks the results are paged with cursors"""
+        Post.objects.bulk_create(
+            Post(title=f"Paged {i}", content="pagination", author=self.user) for i in range(12)
+        )
+        response: HttpRequest = self.client.get(self.url, {"q": "pagination"})
+        first: List[int] = [post.id for post in response.context["posts"]]
+        self.assertContains(response, "q=pagination&amp;cursor=")
+        response = self.client.get(
+            self.url, {"q": "pagination", "cursor": response.context["page_obj"].next_cursor}
+        )
+        second: List[int] = [post.id for post in response.context["posts"]]
+        self.assertEqual((len(first), len(second)), (10, 2))
+        self.assertEqual(len(set(first) | set(second)), 12)
+        response = self.client.get(
+            self.url, {"q": "pagination", "cursor": response.context["page_obj"].previous_cursor}
+        )
+        self.assertEqual([post.id for post in response.context["posts"]], first)
+        print("test_cursor_pages is ok")
+
+
+class SQLiteSettingsTest(TestCase):
+    """Tests the pragmas and the IMMEDIATE transactions of the SQLite connections"""
+
+    def test_connection_settings(self) -> None:
+        """Checks a new connection runs in WAL and takes the write lock at BEGIN"""
+        directory: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path: str = os.path.join(directory, "db.sqlite3")
+        wrapper: DatabaseWrapper = DatabaseWrapper({**connection.settings_dict, "NAME": path})
+        self.addCleanup(wrapper.close)
+        pragmas: Dict[str, Any] = sqlite.current_pragmas(wrapper)
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["busy_timeout"], 5000)
+        self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesRegex(sqlite3.OperationalError, "locked"):
+            other.execute("BEGIN IMMEDIATE")
+        wrapper.connection.rollback()
+        other.execute("BEGIN IMMEDIATE")
+        print("test_connection_settings is ok")
+
+
+class InstrumentationTest(TestCase):
+    """Tests the request timings of InstrumentationMiddleware"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        instrumentation.totals.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.post: Post = PostFactory(author=self.user)
+        self.post.save()
+
+    @staticmethod
+    def timings(response: HttpRequest) -> Dict[str, str]:
+        """Server-Timing as {metric: its parameters}"""
+        return dict(
+            metric.strip().split(";", 1) for metric in response["Server-Timing"].split(",")
+        )
+
+    def test_server_timing(self) -> None:
+        """Checks the header counts the queries, the render and the page cache"""
+        with CaptureQueriesContext(connection) as queries:
+            first: HttpRequest = self.client.get(reverse("blog-home"))
+        timings: Dict[str, str] = self.timings(first)
+        self.assertIn(f'desc="{len(queries)} queries"', timings["db"])
+        self.assertNotEqual(timings["tpl"], "dur=0.0")
+        self.assertNotIn("/ 0 misses", timings["cache"])
+        second: HttpRequest = self.client.get(reverse("blog-home"))
+        timings = self.timings(second)
+        self.assertIn('desc="0 queries"', timings["db"])
+        self.assertEqual(timings["tpl"], "dur=0.0")
+        self.assertIn("/ 0 misses", timings["cache"])
+        print("test_server_timing is ok")
+
+    @override_settings(BLOG_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self) -> None:
+        """Checks a slow request logs its SQL and every request a JSON line"""
+        with self.assertLogs("blog.instrumentation", "INFO") as logs:
+            self.client.get(reverse("post-detail", kwargs={"pk": self.post.pk}))
+        line: Dict[str, Any] = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line["view"], line["status"]), ("post-detail", 200))
+        self.assertIn('FROM "blog_post"', logs.records[1].getMessage())
+        print("test_slow_request_logs_sql is ok")
+
+    @override_settings(ROOT_URLCONF="blog.tests")
+    async def test_async_server_timing(self) -> None:
+        """Checks the queries of the async views are counted too"""
+        response: HttpRequest = await self.async_client.get(
+            reverse("post-detail", kwargs={"pk": self.post.pk})
+        )
+        self.assertNotIn('desc="0 queries"', self.timings(response)["db"])
+        print("test_async_server_timing is ok")
+
+    def test_request_stats(self) -> None:
+        """Checks the totals per url name are only shown to the staff"""
+        self.client.get(reverse("blog-home"))
+        self.client.get(reverse("blog-home"))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("request-stats")).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        views: Dict[str, Any] = self.client.get(reverse("request-stats")).json()["views"]
+        self.assertEqual(views["blog-home"]["requests"], 2)
+        self.assertGreater(views["blog-home"]["mean_total_ms"], 0)
+        print("test_request_stats is ok")
+
+
+class ConditionalGetTest(TestCase):
+    """Tests the pages answer 304 to the requests that have them already"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.posts: List[Post] = []
+        for _ in range(3):
+            post: Post = PostFactory(author=self.user)
+            post.save()
+            self.posts.append(post)
+        self.detail: str = reverse("post-detail", kwargs={"pk": self.posts[0].pk})
+
+    def revalidate(self, url: str, response: HttpRequest) -> HttpRequest:
+        return self.client.get(url, headers={"if-none-match": response["ETag"]})
+
+    def test_detail(self) -> None:
+        """Checks the detail page is validated by the post and its author"""
+        first: HttpRequest = self.client.get(self.detail)
+        self.assertIn("no-cache", first["Cache-Control"])
+        self.assertNotIn("Last-Modified", first)
+        with self.assertNumQueries(1), self.assertTemplateNotUsed("blog/post_detail.html"):
+            again: HttpRequest = self.revalidate(self.detail, first)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.user.username = "renamed"
+        self.user.save()
+        renamed: HttpRequest = self.revalidate(self.detail, first)
+        self.assertContains(renamed, "renamed")
+        self.posts[0].title = "changed"
+        self.posts[0].save()
+        self.assertEqual(self.revalidate(self.detail, renamed).status_code, 200)
+        print("test_detail is ok")
+
+    def test_lists(self) -> None:
+        """Checks the lists are revalidated from the page cache and change with their rows"""
+        for url in [reverse("blog-home"), reverse("posts-latest"), reverse("announcements")]:
+            with self.subTest(url=url):
+                first: HttpRequest = self.client.get(url)
+                self.assertEqual(self.revalidate(url, first).status_code, 304)
+        home: str = reverse("blog-home")
+        first = self.client.get(home)
+        self.posts[1].delete()
+        self.assertEqual(self.revalidate(home, first).status_code, 200)
+        self.assertNotIn("Last-Modified", first)
+        print("test_lists is ok")
+
+    def test_per_user(self) -> None:
+        """Checks a logged in user doesn't revalidate the anonymous page"""
+        anonymous: HttpRequest = self.client.get(self.detail)
+        self.client.force_login(self.user)
+        mine: HttpRequest = self.revalidate(self.detail, anonymous)
+        self.assertEqual(mine.status_code, 200)
+        self.assertIn("private", mine["Cache-Control"])
+        self.assertEqual(self.revalidate(self.detail, mine).status_code, 304)
+        print("test_per_user is ok")
+
+
+class ApiTest(TestCase):
+    """Tests the JSON API"""
+
+    def setUp(self) -> None:
+        self.user: User = UserFactory()
+        self.user.save()
+        self.other: User = UserFactory()
+        self.other.save()
+        now = timezone.now()
+        for days in range(7):
+            Post(
+                title=f"post {days}",
+                content="content " * 20,
+                datePosted=now - timedelta(days=days),
+                author=self.user if days % 2 else self.other,
+            ).save()
+        AnnouncementFactory(author=self.user).save()
+
+    def test_pages(self) -> None:
+        """Checks the posts come newest first a page at a time with the picked fields"""
+        url: str = reverse("api-posts")
+        with self.assertNumQueries(1):
+            first: Dict[str, Any] = self.client.get(url, {"limit": 3}).json()
+        self.assertEqual([row["title"] for row in first["results"]], ["post 0", "post 1", "post 2"])
+        self.assertIsNone(first["previous"])
+        second: Dict[str, Any] = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [row["title"] for row in second["results"]], ["post 3", "post 4", "post 5"]
+        )
+        back: Dict[str, Any] = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+        picked: Dict[str, Any] = self.client.get(url, {"fields": "title,author"}).json()
+        self.assertEqual(set(picked["results"][0]), {"title", "author"})
+        self.assertEqual(picked["results"][0]["author"], self.other.username)
+        print("test_pages is ok")
+
+    def test_author_and_announcements(self) -> None:
+        """Checks the posts of an author and the announcements"""
+        mine: Dict[str, Any] = self.client.get(
+            reverse("api-user-posts", kwargs={"username": self.user.username})
+        ).json()
+        self.assertEqual(len(mine["results"]), 3)
+        self.assertEqual({row["author"] for row in mine["results"]}, {self.user.username})
+        missing = self.client.get(reverse("api-user-posts", kwargs={"username": "nobody"}))
+        self.assertEqual(missing.status_code, 404)
+        listed: Dict[str, Any] = self.client.get(reverse("api-announcements")).json()
+        self.assertEqual(len(listed["results"]), 1)
+        print("test_author_and_announcements is ok")
+
+    def test_bad_parameters(self) -> None:
+        """Checks the invalid parameters are a 400 with the reason"""
+        overflow: str = base64.urlsafe_b64encode(b'["n", "2020-01-01", 1e400]').decode()
+        for query in [
+            {"fields": "password"},
+            {"limit": "x"},
+            {"limit": 1000},
+            {"cursor": "x"},
+            {"cursor": overflow},
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(reverse("api-posts"), query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        print("test_bad_parameters is ok")
+
+    def test_ndjson(self) -> None:
+        """Checks the NDJSON mode streams every row"""
+        response = self.client.get(reverse("api-posts"), {"format": "ndjson", "fields": "id,title"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows: List[Dict[str, Any]] = [
+            json.loads(line) for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0], {"id": rows[0]["id"], "title": "post 0"})
+        print("test_ndjson is ok")
+
+
+class FeedTest(TestCase):
+    """Tests the RSS and Atom feeds"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.other: User = UserFactory()
+        self.other.save()
+        self.post: Post = PostFactory(author=self.user, datePosted=timezone.now())
+        self.post.save()
+        self.others: Post = PostFactory(author=self.other, datePosted=timezone.now())
+        self.others.save()
+
+    def test_site_feeds(self) -> None:
+        """Checks the feeds list the posts and are served from the cache"""
+        for name, content_type in [
+            ("posts-rss", "application/rss+xml"),
+            ("posts-atom", "application/atom+xml"),
+        ]:
+            with self.subTest(name=name):
+                response: HttpRequest = self.client.get(reverse(name))
+                self.assertTrue(response["Content-Type"].startswith(content_type))
+                self.assertContains(response, self.post.title)
+                self.assertContains(response, self.others.title)
+                self.assertIn("max-age=300", response["Cache-Control"])
+                with self.assertNumQueries(0):
+                    again: HttpRequest = self.client.get(
+                        reverse(name), headers={"if-none-match": response["ETag"]}
+                    )
+                self.assertEqual(again.status_code, 304)
+        print("test_site_feeds is ok")
+
+    def test_rebuilt_on_change(self) -> None:
+        """Checks a new post is in the feed at once"""
+        self.client.get(reverse("posts-rss"))
+        post: Post = PostFactory(author=self.user, datePosted=timezone.now())
+        post.save()
+        self.assertContains(self.client.get(reverse("posts-rss")), post.title)
+        print("test_rebuilt_on_change is ok")
+
+    def test_author_feeds(self) -> None:
+        """Checks an author's feed only has their posts"""
+        for name in ["user-posts-rss", "user-posts-atom"]:
+            with self.subTest(name=name):
+                response: HttpRequest = self.client.get(
+                    reverse(name, kwargs={"username": self.user.username})
+                )
+                self.assertContains(response, self.post.title)
+                self.assertNotContains(response, self.others.title)
+                if name == "user-posts-atom":
+                    self.assertContains(
+                        response, f"<uri>http://testserver/allposts/{self.user.username}/</uri>"
+                    )
+                missing: HttpRequest = self.client.get(
+                    reverse(name, kwargs={"username": "nobody"})
+                )
+                self.assertEqual(missing.status_code, 404)
+        print("test_author_feeds is ok")
+
+
+class StaticAssetsTest(TestCase):
+    """Tests the bundled, hashed and compressed static files"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.root: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        # the vendored files may not be downloaded, main.css alone makes the bundle
+        bundles = mock.patch.dict(assets.BUNDLES, {"blog/site.css": ["blog/main.css"]})
+        bundles.start()
+        self.addCleanup(bundles.stop)
+        storages = override_settings(
+            STATIC_ROOT=self.root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "blog.assets.BundledManifestStorage"},
+            },
+        )
+        storages.enable()
+        self.addCleanup(storages.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.bundle: str = staticfiles_storage.stored_name("blog/site.css")
+
+    def test_bundle(self) -> None:
+        """Checks the bundle is minified, hashed, compressed and linked by the pages"""
+        self.assertRegex(self.bundle, r"^blog/site\.[0-9a-f]{12}\.css$")
+        path: str = os.path.join(self.root, self.bundle)
+        with open(path, encoding="utf-8") as file:
+            css: str = file.read()
+        self.assertIn(".homecontainer{", css)
+        self.assertNotIn("\n    ", css)
+        self.assertTrue(os.path.exists(f"{path}.gz"))
+        page: str = self.client.get(reverse("blog-home")).content.decode()
+        self.assertIn(f'href="/static/{self.bundle}"', page)
+        self.assertNotIn("cdn", page)
+        print("test_bundle is ok")
+
+    def test_served(self) -> None:
+        """Checks the middleware serves the gzip variant for a year"""
+        middleware = assets.StaticAssetMiddleware(lambda request: HttpResponse(status=404))
+        request: HttpRequest = RequestFactory().get(
+            f"/static/{self.bundle}", headers={"accept-encoding": "gzip"}
+        )
+        response = middleware(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        with open(os.path.join(self.root, self.bundle), "rb") as file:
+            self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), file.read())
+        plain = middleware(RequestFactory().get("/static/blog/main.css"))
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("no-cache", plain["Cache-Control"])
+        outside = middleware(RequestFactory().get("/static/../manage.py"))
+        self.assertEqual(outside.status_code, 404)
+        print("test_served is ok")
+
+    def test_refused_encodings(self) -> None:
+        """Checks codings with q=0 and tokens that only contain gzip are not served"""
+        middleware = assets.StaticAssetMiddleware(lambda request: HttpResponse(status=404))
+        for accept, expected in [
+            ("gzip, br;q=0", "gzip"),
+            ("br;q=0, gzip;q=0", None),
+            ("x-notgzip", None),
+            ("*;q=0.5", "br" if assets.brotli is not None else "gzip"),
+        ]:
+            request: HttpRequest = RequestFactory().get(
+                f"/static/{self.bundle}", headers={"accept-encoding": accept}
+            )
+            with self.subTest(accept=accept):
+                self.assertEqual(middleware(request).get("Content-Encoding"), expected)
+        print("test_refused_encodings is ok")
+
+    @skipIf(assets.brotli is None, "brotli is not installed")
+    def test_served_brotli(self) -> None:
+        """Checks the middleware prefers the brotli variant when both are accepted"""
+        middleware = assets.StaticAssetMiddleware(lambda request: HttpResponse(status=404))
+        request: HttpRequest = RequestFactory().get(
+            f"/static/{self.bundle}", headers={"accept-encoding": "gzip, br"}
+        )
+        response = middleware(request)
+        self.assertEqual(response["Content-Encoding"], "br")
+        with open(os.path.join(self.root, self.bundle), "rb") as file:
+            self.assertEqual(
+                assets.brotli.decompress(b"".join(response.streaming_content)), file.read()
+            )
+        print("test_served_brotli is ok")
+
+    def test_template_check(self) -> None:
+        """Checks collectstatic fails on templates that skip the hashed names"""
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "bad.html"), "w", encoding="utf-8") as file:
+                file.write(
+                    '{% load static %}<img src="{% static "blog/missing.png" %}">'
+                    '<script src="https://code.jquery.com/jquery.js"></script>'
+                )
+            engine: Dict[str, Any] = {**settings.TEMPLATES[0], "DIRS": [directory]}
+            with override_settings(TEMPLATES=[engine]):
+                problems: List[str] = assets.unhashed_references(staticfiles_storage.hashed_files)
+                with self.assertRaises(CommandError):
+                    call_command("collectstatic", interactive=False, verbosity=0)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("blog/missing.png", problems[0])
+        print("test_template_check is ok")
+
+    def test_unbundled(self) -> None:
+        """Checks the uncollected files are linked one by one, from the CDN until vendored"""
+        parts: List[str] = ["blog/vendor/bootstrap.min.css", "blog/main.css"]
+        with override_settings(
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            }
+        ), mock.patch.dict(assets.BUNDLES, {"blog/site.css": parts}), mock.patch(
+            "blog.templatetags.assets.finders.find", return_value=None
+        ):
+            html: str = stylesheets("blog/site.css")
+        self.assertIn(f'href="{assets.VENDOR[parts[0]][0]}" integrity=', html)
+        self.assertIn('href="/static/blog/main.css"', html)
+        print("test_unbundled is ok")
+
+
+class AnnouncementFeedTest(TestCase):
+    """Tests the announcements window and the unread counter"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.set_password("abc12345")
+        self.user.save()
+        self.user.date_joined = timezone.now() - timedelta(days=30)
+        self.user.save()
+        self.items: List[Announcement] = [self.announce(days) for days in range(12, 0, -1)]
+
+    def announce(self, days_ago: int) -> Announcement:
+        announcement: Announcement = Announcement(
+            title=f"Notice {days_ago}",
+            context="Read me",
+            author=self.user,
+            datePosted=timezone.now() - timedelta(days=days_ago),
+        )
+        announcement.save()
+        return announcement
+
+    def test_window(self) -> None:
+        """Checks a page holds the newest WINDOW announcements in one query"""
+        with CaptureQueriesContext(connection) as queries:
+            response: HttpRequest = self.client.get(reverse("announcements"))
+        shown: List[Announcement] = list(response.context["announcements"])
+        self.assertEqual(shown, self.items[::-1][:10])
+        self.assertEqual(
+            len([query for query in queries if "blog_announcement" in query["sql"]]), 1
+        )
+        older: HttpRequest = self.client.get(
+            reverse("announcements"), {"cursor": response.context["page_obj"].next_cursor}
+        )
+        self.assertEqual(list(older.context["announcements"]), self.items[1::-1])
+        self.assertContains(older, "Newer")
+        print("test_window is ok")
+
+    def test_unread(self) -> None:
+        """Checks the counter shows until the announcements page is seen,
+        from the cache once counted"""
+        self.client.login(username=self.user.username, password="abc12345")
+        self.assertContains(self.client.get(reverse("blog-home")), ">10+</span>")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("blog-home"))
+        self.assertFalse([query for query in queries if "blog_announcement" in query["sql"]])
+        self.client.get(reverse("announcements"))
+        self.assertNotContains(self.client.get(reverse("blog-home")), 'class="badge')
+        self.announce(0)
+        self.assertContains(self.client.get(reverse("blog-home")), ">1</span>")
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse("blog-home")), 'class="badge')
+        print("test_unread is ok")
+
+    def test_row_evicted(self) -> None:
+        """Checks an edit replaces the cached row of the announcement"""
+        self.client.login(username=self.user.username, password="abc12345")
+        self.assertContains(self.client.get(reverse("announcements")), "Notice 1<")
+        self.items[-1].title = "Changed"
+        self.items[-1].save()
+        response: HttpRequest = self.client.get(reverse("announcements"))
+        self.assertContains(response, "Changed")
+        self.assertNotContains(response, "Notice 1<")
+        print("test_row_evicted is ok")
+
+    @override_settings(BLOG_PAGE_CACHE_TIMEOUT=60)
+    def test_times_expire(self) -> None:
+        """Checks the counter sees an announcement of another process (no
+        signals here) once the cached times expired"""
+        self.client.login(username=self.user.username, password="abc12345")
+        self.client.get(reverse("announcements"))
+        self.assertNotContains(self.client.get(reverse("blog-home")), 'class="badge')
+        Announcement.objects.bulk_create(
+            [Announcement(title="Elsewhere", context="Read me", author=self.user)]
+        )
+        self.assertNotContains(self.client.get(reverse("blog-home")), 'class="badge')
+        with mock.patch("blog.sharded_cache.time.time", return_value=time.time() + 61):
+            self.assertContains(self.client.get(reverse("blog-home")), ">1</span>")
+        print("test_times_expire is ok")
+
+
+class JinjaTemplatesTest(TestCase):
+    """Tests the Jinja2 ports render the pages like the Django templates"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.set_password("abc12345")
+        self.user.save()
+        self.posts: List[Post] = []
+        for number in range(7):
+            post: Post = Post(
+                title=f"Jinja post {number}", content="Rendered <twice>", author=self.user
+            )
+            post.save()
+            self.posts.append(post)
+        announcement: Announcement = AnnouncementFactory(author=self.user)
+        announcement.save()
+        self.urls: List[str] = [
+            reverse("blog-home"),
+            reverse("blog-home") + "?page=2",
+            reverse("post-detail", args=[self.posts[0].pk]),
+            reverse("allposts-user", args=[self.user.username]),
+            reverse("posts-latest"),
+            reverse("announcements"),
+            reverse("post-search") + "?q=jinja",
+        ]
+
+    def render(self, url: str, engine: str) -> HttpResponse:
+        cache.clear()
+        templates: List[Dict[str, Any]] = sorted(
+            settings.TEMPLATES, key=lambda options: options["NAME"] != engine
+        )
+        with override_settings(TEMPLATES=templates):
+            response: HttpResponse = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_same_pages(self) -> None:
+        """Checks every port renders the same html as its Django template"""
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.login(username=self.user.username, password="abc12345")
+            for url in self.urls:
+                with self.subTest(url=url, logged_in=logged_in):
+                    django: HttpResponse = self.render(url, "django")
+                    jinja: HttpResponse = self.render(url, "jinja2")
+                    # only the Django templates are recorded by the test client
+                    self.assertTrue(django.templates)
+                    self.assertFalse(jinja.templates)
+                    self.assertEqual(normalize(jinja), normalize(django))
+        print("test_same_pages is ok")
+
+    def test_fragments(self) -> None:
+        """Checks the cached post rows of the ports are dropped on save"""
+        templates: List[Dict[str, Any]] = sorted(
+            settings.TEMPLATES, key=lambda options: options["NAME"] != "jinja2"
+        )
+        with override_settings(TEMPLATES=templates):
+            self.client.login(username=self.user.username, password="abc12345")
+            self.assertContains(self.client.get(reverse("blog-home")), "Jinja post 6")
+            self.posts[6].title = "Renamed"
+            self.posts[6].save()
+            response: HttpResponse = self.client.get(reverse("blog-home"))
+        self.assertContains(response, "Renamed")
+        self.assertNotContains(response, "Jinja post 6")
+        print("test_fragments is ok")
+
+
+def normalize(response: HttpResponse) -> str:
+    """The html of a response without the whitespace between the tags"""
+    html: str = re.sub(r"\s+", " ", response.content.decode())
+    return re.sub(r"\s*(<|>)\s*", r"\1", html).strip()
+
+class ShardedCacheTest(TestCase):
+    """Tests the sharded LRU cache backend"""
+
+    def make(self, **options: Any) -> ShardedLRUCache:
+        return ShardedLRUCache(f"test-{time.time_ns()}", {"OPTIONS": options})
+
+    def test_lru(self) -> None:
+        """Checks a full shard evicts its least recently used key"""
+        lru: ShardedLRUCache = self.make(MAX_ENTRIES=2, SHARDS=1)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        self.assertEqual(lru.get("a"), 1)  # b is the oldest now
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get_many(["a", "c"]), {"a": 1, "c": 3})
+        self.assertEqual(lru.stats()["evictions"], 1)
+        self.assertEqual(lru.stats()["entries"], 2)
+        self.assertTrue(lru.touch("a"))  # c is the oldest now
+        lru.set("d", 4)
+        self.assertIsNone(lru.get("c"))
+        self.assertEqual(lru.get("a"), 1)
+        print("test_lru is ok")
+
+    def test_get_or_set_counts(self) -> None:
+        """Checks get_or_set of a plain value counts one miss, then one hit"""
+        lru: ShardedLRUCache = self.make()
+        self.assertEqual(lru.get_or_set("plain", 1), 1)
+        self.assertEqual(lru.get_or_set("plain", 2), 1)
+        self.assertEqual((lru.stats()["misses"], lru.stats()["hits"]), (1, 1))
+        print("test_get_or_set_counts is ok")
+
+    def test_ttl(self) -> None:
+        """Checks the keys expire and the cache API behaves like LocMemCache's"""
+        lru: ShardedLRUCache = self.make()
+        lru.set("short", "x", 10)
+        self.assertFalse(lru.add("short", "y"))
+        self.assertTrue(lru.add("count", 1))
+        self.assertEqual(lru.incr("count"), 2)
+        with mock.patch("blog.sharded_cache.time.time", return_value=time.time() + 11):
+            self.assertFalse(lru.has_key("short"))
+            self.assertIsNone(lru.get("short"))
+            self.assertTrue(lru.add("short", "y"))
+        self.assertEqual(lru.stats()["expirations"], 1)
+        lru.set("forever", "x", None)
+        self.assertTrue(lru.touch("forever", 5))
+        self.assertTrue(lru.delete("forever"))
+        self.assertFalse(lru.delete("forever"))
+        with self.assertRaises(ValueError):
+            lru.incr("missing")
+        print("test_ttl is ok")
+
+    def test_single_flight(self) -> None:
+        """Checks the threads asking for a missing key compute it once"""
+        lru: ShardedLRUCache = self.make()
+        computed: List[int] = []
+
+        def compute() -> str:
+            computed.append(1)
+            # holds the key until every thread waits for it
+            deadline: float = time.time() + 5
+            while time.time() < deadline and sum(
+                flight.waiters for shard in lru.shards for flight in shard.flights.values()
+            ) < 8:
+                time.sleep(0.001)
+            return "page"
+
+        results: List[str] = []
+        threads: List[threading.Thread] = [
+            threading.Thread(target=lambda: results.append(lru.get_or_set("hot", compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(computed, [1])
+        self.assertEqual(results, ["page"] * 8)
+        self.assertEqual(lru.stats()["coalesced"], 7)
+        self.assertFalse(any(shard.flights for shard in lru.shards))
+        print("test_single_flight is ok")
+
+
+class AdminTest(TestCase):
+    """Tests the admin changelists don't scan or count the whole tables"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.admin: User = User.objects.create_superuser("boss", "boss@example.com", "abc12345")
+        self.client.force_login(self.admin)
+        self.posts: List[Post] = []
+        for days_ago in (400, 40, 1):
+            post: Post = Post(
+                title=f"Admin post {days_ago}",
+                content="x" * 500,
+                author=self.admin,
+                datePosted=timezone.now() - timedelta(days=days_ago),
+            )
+            post.save()
+            self.posts.append(post)
+        self.url: str = reverse("admin:blog_post_changelist")
+
+    def post_queries(self, params: Dict[str, str]) -> List[str]:
+        with CaptureQueriesContext(connection) as queries:
+            response: HttpResponse = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.changelist: Any = response.context["cl"]
+        return [query["sql"] for query in queries if '"blog_post"' in query["sql"]]
+
+    def test_changelist(self) -> None:
+        """Checks the list reads the counter, joins the authors and skips the content"""
+        sqls: List[str] = self.post_queries({})
+        self.assertEqual(self.changelist.result_count, 3)
+        self.assertFalse([sql for sql in sqls if "COUNT(" in sql])
+        rows: List[str] = [sql for sql in sqls if "SUBSTR" in sql]
+        self.assertEqual(len(rows), 1)
+        self.assertIn('"auth_user"', rows[0])
+        self.assertIn('SUBSTR("blog_post"."content", 1, 80)', rows[0])
+        self.assertEqual(rows[0].count('"blog_post"."content"'), 1)
+        self.assertFalse([sql for sql in sqls if "DISTINCT" in sql])
+        print("test_changelist is ok")
+
+    def test_filtered_counts(self) -> None:
+        """Checks searches and the date hierarchy count the matches, capped"""
+        sqls: List[str] = self.post_queries({"q": "admin"})
+        self.assertEqual(self.changelist.result_count, 3)
+        self.assertTrue([sql for sql in sqls if "blog_post_fts" in sql])
+        year: int = self.posts[2].datePosted.year
+        self.post_queries({"datePosted__year": str(year)})
+        expected: int = sum(1 for post in self.posts if post.datePosted.year == year)
+        self.assertEqual(self.changelist.result_count, expected)
+        print("test_filtered_counts is ok")
+
+    def test_date_hierarchy(self) -> None:
+        """Checks the periods come from the first and the last post"""
+        response: HttpResponse = self.client.get(self.url)
+        first: int = timezone.localtime(self.posts[0].datePosted).year
+        last: int = timezone.localtime(self.posts[2].datePosted).year
+        for year in range(first, last + 1):
+            self.assertContains(response, f"datePosted__year={year}")
+        print("test_date_hierarchy is ok")
+
+    def test_author_autocomplete(self) -> None:
+        """Checks the author is picked by autocomplete"""
+        response: HttpResponse = self.client.get(reverse("admin:blog_post_add"))
+        self.assertContains(response, "admin-autocomplete")
+        print("test_author_autocomplete is ok")
+
+
+class RecentPostsTest(TestCase):
+    """Tests the newest posts kept in memory follow the writes"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.posts: List[Post] = []
+        for hours in range(1, 13):
+            post: Post = Post(
+                title=f"Recent {hours}",
+                content="x",
+                author=self.user,
+                datePosted=timezone.now() - timedelta(hours=hours),
+            )
+            post.save()
+            self.posts.append(post)
+        recent.recent.load()
+
+    def assertUpToDate(self) -> None:  # pylint: disable=invalid-name
+        """The window is the newest posts of the database, read without a query"""
+        with self.assertNumQueries(0):
+            posts, count = recent.recent.newest(recent.size())
+        expected: List[Post] = list(recent.newest_first()[: recent.size()])
+        self.assertEqual([post.pk for post in posts], [post.pk for post in expected])
+        self.assertEqual([post.title for post in posts], [post.title for post in expected])
+        self.assertEqual(count, Post.objects.count())
+
+    def test_pages_without_queries(self) -> None:
+        """Checks the latest posts and the first page are rendered from memory"""
+        for url in [reverse("posts-latest"), reverse("blog-home")]:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response: HttpRequest = self.client.get(url)
+            self.assertContains(response, self.posts[0].title)
+        self.assertNotContains(response, self.posts[5].title)
+        print("test_pages_without_queries is ok")
+
+    def test_backdating(self) -> None:
+        """Checks a post backdated out of the window leaves it and one dated into it enters"""
+        self.posts[0].datePosted = timezone.now() - timedelta(days=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].save()
+        self.assertUpToDate()
+        self.assertNotIn(self.posts[0].pk, [post.pk for post in recent.recent.posts])
+        self.posts[11].datePosted = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[11].save()
+        self.assertUpToDate()
+        self.assertEqual(recent.recent.posts[0].pk, self.posts[11].pk)
+        self.posts[3].title = "Edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[3].save()
+        self.assertUpToDate()
+        print("test_backdating is ok")
+
+    def test_create_and_delete(self) -> None:
+        """Checks a new post enters in front and a deleted one is replaced by the next"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Post(title="Brand new", content="x", author=self.user).save()
+        self.assertUpToDate()
+        self.assertEqual(recent.recent.posts[0].title, "Brand new")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[2].delete()
+        self.assertUpToDate()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.exclude(title="Brand new").delete()
+        self.assertUpToDate()
+        print("test_create_and_delete is ok")
+
+    def test_rolled_back_save(self) -> None:
+        """Checks a save that is rolled back never reaches the window"""
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Post(title="Phantom", content="x", author=self.user).save()
+                raise RuntimeError("rolled back")
+        posts, count = recent.recent.newest(4)
+        self.assertNotIn("Phantom", [post.title for post in posts])
+        self.assertEqual(count, Post.objects.count())
+        self.assertUpToDate()
+        print("test_rolled_back_save is ok")
+
+    def test_writes_without_signals(self) -> None:
+        """Checks the bumped generations reload the window"""
+        Post.objects.filter(pk=self.posts[0].pk).update(title="Bulk edit")
+        bump("posts")
+        self.assertEqual(recent.recent.newest(1)[0][0].title, "Bulk edit")
+        self.user.username = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(recent.recent.newest(1)[0][0].author.username, "renamed")
+        self.assertUpToDate()
+        print("test_writes_without_signals is ok")
+
+    def test_max_age(self) -> None:
+        """Checks the writes of the other processes show up once the window is old"""
+        Post.objects.filter(pk=self.posts[0].pk).update(title="Other process")
+        self.assertEqual(recent.recent.newest(1)[0][0].title, self.posts[0].title)
+        recent.recent.loaded_at -= recent.max_age() + 1
+        self.assertEqual(recent.recent.newest(1)[0][0].title, "Other process")
+        print("test_max_age is ok")
+
+
+@override_settings(ROOT_URLCONF="blog.tests")
+class AsyncViewTest(TestCase):
+    """Tests the async read only views render like the sync ones"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.post: Post = PostFactory(author=self.user)
+        self.post.save()
+        PostFactory(author=self.user).save()
+        AnnouncementFactory(author=self.user).save()
+        self.urls: List[str] = [
+            reverse("blog-home"),
+            reverse("post-detail", kwargs={"pk": self.post.pk}),
+            reverse("allposts-user", kwargs={"username": self.user.username}),
+            reverse("posts-latest"),
+            reverse("announcements"),
+        ]
+
+    def test_async_views_resolved(self) -> None:
+        """Checks the read only urls resolve to the async views"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertTrue(resolve(url).func.view_class.view_is_async)
+        print("test_async_views_resolved is ok")
+
+    async def test_async_views_match_sync(self) -> None:
+        """Checks every async page is the same html as its sync version"""
+        await self.async_client.aforce_login(self.user)
+        for url in self.urls:
+            with override_settings(ROOT_URLCONF="blogpage.urls"):
+                expected: HttpRequest = await self.async_client.get(url)
+            response: HttpRequest = await self.async_client.get(url)
+            with self.subTest(url=url):
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+        missing: HttpRequest = await self.async_client.get("/allposts/nobody/")
+        self.assertEqual(missing.status_code, 404)
+        print("test_async_views_match_sync is ok")
+
+    @override_settings(BLOG_PAGINATION_MODE="cursor")
+    async def test_async_cursor_pages(self) -> None:
+        """Checks cursor pagination works on the async list"""
+        response: HttpRequest = await self.async_client.get(reverse("blog-home"))
+        self.assertContains(response, self.post.title)
+        bad: HttpRequest = await self.async_client.get(reverse("blog-home"), {"cursor": "x"})
+        self.assertEqual(bad.status_code, 404)
+        print("test_async_cursor_pages is ok")
+
+    async def test_async_not_modified(self) -> None:
+        """Checks the async views answer 304 like the sync ones"""
+        for url in self.urls:
+            first: HttpRequest = await self.async_client.get(url)
+            again: HttpRequest = await self.async_client.get(
+                url, headers={"if-none-match": first["ETag"]}
+            )
+            with self.subTest(url=url):
+                self.assertEqual(again.status_code, 304)
+        print("test_async_not_modified is ok")
+
+
+@override_settings(BLOG_REPLICAS=["default"])
+class ReplicaTest(TestCase):
+    """Tests the read only pages read from the replicas and the writers don't"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = UserFactory()
+        self.user.save()
+        self.post: Post = PostFactory(author=self.user)
+        self.post.save()
+        self.router: replicas.ReplicaRouter = replicas.ReplicaRouter()
+
+    def replicas_of(self, method: str, url: str, **kwargs: Any) -> List[Any]:
+        """The replica of each query of a request"""
+        seen: List[Any] = []
+
+        def record(execute, sql, params, many, context):
+            seen.append(replicas.current.get())
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            getattr(self.client, method)(url, **kwargs)
+        return seen
+
+    def test_router(self) -> None:
+        """Checks the reads of a replica request go to it, unless they are auth's"""
+        token = replicas.current.set("replica1")
+        try:
+            self.assertEqual(self.router.db_for_read(Post), "replica1")
+            self.assertEqual(self.router.db_for_read(User), "default")
+            self.assertEqual(self.router.db_for_write(Post), "default")
+        finally:
+            replicas.current.reset(token)
+        self.assertIsNone(self.router.db_for_read(Post))
+        with override_settings(BLOG_REPLICAS=["replica1"]):
+            self.assertFalse(self.router.allow_migrate("replica1", "blog"))
+            self.assertTrue(self.router.allow_migrate("default", "blog"))
+        print("test_router is ok")
+
+    def test_read_only_views(self) -> None:
+        """Checks the list and detail pages use a replica and the others don't"""
+        # the first page and the latest posts come from blog/recent.py, loaded from the primary
+        for url in [reverse("blog-home"), reverse("posts-latest")]:
+            with self.subTest(url=url):
+                self.assertLessEqual(set(self.replicas_of("get", url)), {None})
+        for url in [
+            reverse("post-detail", kwargs={"pk": self.post.pk}),
+            reverse("allposts-user", kwargs={"username": self.user.username}),
+            reverse("announcements"),
+            reverse("posts-rss"),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(set(self.replicas_of("get", url)), {"default"})
+        self.client.force_login(self.user)
+        for url in [reverse("post-search") + "?q=x", reverse("post-create")]:
+            with self.subTest(url=url):
+                self.assertEqual(set(self.replicas_of("get", url)), {None})
+        print("test_read_only_views is ok")
+
+    def test_read_your_writes(self) -> None:
+        """Checks a client that wrote reads from the primary for a while"""
+        self.client.force_login(self.user)
+        response: HttpRequest = self.client.post(
+            reverse("post-create"), {"title": "new", "content": "new"}
+        )
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+        self.assertEqual(set(self.replicas_of("get", reverse("blog-home"))), {None})
+        self.assertEqual(set(self.replicas_of("get", reverse("posts-latest"))), {None})
+        with override_settings(BLOG_REPLICAS=[]):
+            response = self.client.post(reverse("post-create"), {"title": "b", "content": "b"})
+            self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        print("test_read_your_writes is ok")
+
+    def test_page_timeout(self) -> None:
+        """Checks the pages read from a replica aren't cached past the pin"""
+        token = replicas.current.set("default")
+        try:
+            self.assertEqual(page_timeout(), 10)
+        finally:
+            replicas.current.reset(token)
+        self.assertEqual(page_timeout(), 600)
+        print("test_page_timeout is ok")
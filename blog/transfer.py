@@ -0,0 +1,204 @@
+"""Bulk import and export of posts and announcements
+
+Rows are read and written one at a time as NDJSON (a JSON object per line)
+or CSV with a header, so memory stays flat whatever the size of the file.
+The author of a row is its username, see AuthorLookup.
+"""
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Type
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import announcements, cache, counters
+from .models import Announcement, Post
+
+FORMATS: List[str] = ["ndjson", "csv"]
+
+# text column of each model, the other columns are title, datePosted and author
+MODELS: Dict[str, Type[models.Model]] = {"post": Post, "announcement": Announcement}
+TEXT_FIELDS: Dict[Type[models.Model], str] = {Post: "content", Announcement: "context"}
+
+# posts can be far bigger than the default limit of 128KB per field
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+
+def columns(model: Type[models.Model]) -> List[str]:
+    return ["title", TEXT_FIELDS[model], "datePosted", "author"]
+
+
+class UnknownAuthor(LookupError):
+    """A row names a user that doesn't exist"""
+
+
+class AuthorLookup:
+    """Maps usernames to user ids, each username is queried once per run
+    and the usernames of a batch are queried together"""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, Optional[int]] = {}
+
+    def load(self, usernames: Iterable[str]) -> None:
+        missing: Set[str] = set(usernames) - self.ids.keys()
+        if missing:
+            self.ids.update(dict.fromkeys(missing))
+            self.ids.update(
+                User.objects.filter(username__in=missing).values_list("username", "id")
+            )
+
+    def __getitem__(self, username: str) -> int:
+        self.load([username])
+        if self.ids[username] is None:
+            raise UnknownAuthor(f"No user named {username!r}")
+        return self.ids[username]
+
+
+class Progress:
+    """Calls report with (rows, rows per second) at most every interval seconds"""
+
+    def __init__(self, report: Callable[[int, float], None], interval: float = 1.0) -> None:
+        self.report: Callable[[int, float], None] = report
+        self.interval: float = interval
+        self.rows: int = 0
+        self.start: float = time.perf_counter()
+        self.last: float = self.start
+
+    def rate(self) -> float:
+        return self.rows / max(time.perf_counter() - self.start, 1e-9)
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        now: float = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.report(self.rows, self.rate())
+
+    def done(self) -> None:
+        self.report(self.rows, self.rate())
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_rows(
+    stream: TextIO,
+    fmt: str,
+    names: List[str],
+    rows: Iterable[tuple],
+    progress: Optional[Progress] = None,
+) -> None:
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(names)
+    for row in rows:
+        if fmt == "csv":
+            writer.writerow(
+                [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            )
+        else:
+            stream.write(json.dumps(dict(zip(names, row)), default=datetime.isoformat))
+            stream.write("\n")
+        if progress:
+            progress.add(1)
+
+
+def parse_date(value: Optional[str]) -> datetime:
+    """The date of a row, naive dates are in the current time zone"""
+    if not value:
+        return timezone.now()
+    parsed: Optional[datetime] = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build(model: Type[models.Model], row: Dict[str, Any], authors: AuthorLookup) -> models.Model:
+    text: str = TEXT_FIELDS[model]
+    instance: models.Model = model(
+        title=row["title"],
+        datePosted=parse_date(row.get("datePosted")),
+        author_id=authors[row["author"]],
+        **{text: row.get(text) or ""},
+    )
+    if isinstance(instance, Post):
+        instance.fill_excerpt()  # bulk_create skips save()
+    return instance
+
+
+def import_rows(
+    model: Type[models.Model],
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = 1000,
+    transaction_size: int = 10000,
+    skip_unknown: bool = False,
+    progress: Optional[Progress] = None,
+) -> int:
+    """Creates the rows with bulk_create, transaction_size rows per transaction.
+    bulk_create sends no signals, so the post counters are added up in the same
+    transactions and the page cache is bumped at the end. Returns the skipped rows"""
+    authors: AuthorLookup = AuthorLookup()
+    skipped: int = 0
+    written: int = 0
+    usernames: Set[str] = set()
+    pending: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        nonlocal skipped, written
+        authors.load(row["author"] for row in pending)
+        objects: List[models.Model] = []
+        for row in pending:
+            try:
+                objects.append(build(model, row, authors))
+            except UnknownAuthor:
+                if not skip_unknown:
+                    raise
+                skipped += 1
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            if model is Post:
+                per_author: Dict[int, int] = {}
+                for post in objects:
+                    per_author[post.author_id] = per_author.get(post.author_id, 0) + 1
+                counters.add(counters.ALL_POSTS, len(objects))
+                for author_id, count in per_author.items():
+                    counters.add(counters.author_key(author_id), count)
+        written += len(objects)
+        usernames.update(row["author"] for row in pending if authors.ids[row["author"]])
+        if progress:
+            progress.add(len(pending))
+        pending.clear()
+
+    try:
+        for row in rows:
+            pending.append(row)
+            if len(pending) >= transaction_size:
+                flush()
+        if pending:
+            flush()
+    finally:
+        # the rows of the transactions that committed are on the pages already
+        if model is Post:
+            cache.bump("posts", *(f"author:{username}" for username in usernames))
+        else:
+            cache.bump("announcements")
+            if written:
+                announcements.evict()  # the times of the unread counts
+    return skipped
+
+
+def export_rows(model: Type[models.Model], chunk_size: int = 2000) -> Iterator[tuple]:
+    """Streams the rows in id order, chunk_size rows are fetched at a time"""
+    names: List[str] = columns(model)[:-1] + ["author__username"]
+    return model.objects.order_by("id").values_list(*names).iterator(chunk_size=chunk_size)
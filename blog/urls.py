@@ -9,7 +9,11 @@ from .views import (
     UserPostListView,
     LatestPostsView,
     AnnouncementsView,
+    PostSearchView,
+    RequestStatsView,
 )
+from .api import AnnouncementListAPIView, PostListAPIView, UserPostListAPIView
+from .feeds import LatestPostsAtomFeed, LatestPostsFeed, UserPostsAtomFeed, UserPostsFeed
 
 urlpatterns = [
     path("", PostListView.as_view(), name="blog-home"),
@@ -20,4 +24,13 @@ urlpatterns = [
     path("allposts/<str:username>/", UserPostListView.as_view(), name="allposts-user"),
     path("post/latests", LatestPostsView.as_view(), name="posts-latest"),
     path("announcements/", AnnouncementsView.as_view(), name="announcements"),
+    path("search/", PostSearchView.as_view(), name="post-search"),
+    path("stats/requests/", RequestStatsView.as_view(), name="request-stats"),
+    path("feed/rss/", LatestPostsFeed(), name="posts-rss"),
+    path("feed/atom/", LatestPostsAtomFeed(), name="posts-atom"),
+    path("allposts/<str:username>/rss/", UserPostsFeed(), name="user-posts-rss"),
+    path("allposts/<str:username>/atom/", UserPostsAtomFeed(), name="user-posts-atom"),
+    path("api/posts/", PostListAPIView.as_view(), name="api-posts"),
+    path("api/posts/<str:username>/", UserPostListAPIView.as_view(), name="api-user-posts"),
+    path("api/announcements/", AnnouncementListAPIView.as_view(), name="api-announcements"),
 ]
@@ -1,13 +1,17 @@
 # pylint: disable=relative-beyond-top-level
 
 """/"""
-from typing import Any, Dict, List
-from django.http import HttpResponse
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db.models.query import QuerySet
 from django.views.generic import (
+    TemplateView,
+    View,
     ListView,
     DetailView,
     CreateView,
@@ -15,16 +19,39 @@ from django.views.generic import (
     DeleteView,
 )
 from .models import Post, Announcement
+from .cache import PageCacheMixin
+from .conditional import ConditionalGetMixin
+from . import announcements, counters, instrumentation, recent
+from .pagination import CountedPaginator, CursorPage, CursorPaginationMixin, InvalidCursor
+from .search import SearchPaginator
 
 
-class PostListView(ListView):
+class PostListView(ConditionalGetMixin, PageCacheMixin, CursorPaginationMixin, ListView):
     """Shows all the post in the main page"""
 
+    replica_reads: bool = True  # see blog/replicas.py
     model: type = Post
     template_name: str = "blog/home.html"  # default <app>/<model>_<viewtype>.html
     context_object_name: str = "posts"
-    ordering: List[str] = ["-datePosted"]
+    ordering: List[str] = ["-datePosted", "-id"]
     paginate_by: int = 5
+    paginator_class: type = CountedPaginator
+
+    def get_cache_scopes(self) -> List[str]:
+        return ["posts", "users"]
+
+    def get_queryset(self) -> QuerySet[Post]:
+        return Post.objects.for_listing().order_by(*self.ordering)
+
+    def paginate_queryset(self, queryset: QuerySet[Post], page_size: int) -> Tuple[Any, ...]:
+        """The first page is made of the recent posts of the process"""
+        cursor: bool = self.get_pagination_mode() == "cursor"
+        if recent.is_first_page(self.request, cursor):
+            window: Optional[Tuple[List[Post], int]] = recent.recent.newest(page_size + 1)
+            if window is not None:
+                paginator, page = recent.first_page(queryset, page_size, cursor, window)
+                return (paginator, page, page.object_list, page.has_other_pages())
+        return super().paginate_queryset(queryset, page_size)
 
     def get_context_data(self, **kwargs) -> Dict[Any, Any]:
         context: Dict[Any, Any] = super().get_context_data(**kwargs)
@@ -32,17 +59,28 @@ class PostListView(ListView):
         return context
 
 
-class UserPostListView(ListView):
+class UserPostListView(ConditionalGetMixin, PageCacheMixin, CursorPaginationMixin, ListView):
     """Shows all the posts of an user"""
 
+    replica_reads: bool = True  # see blog/replicas.py
     model: type = Post
     template_name: str = "blog/allpostuser.html"
     context_object_name: str = "posts"
     paginate_by: int = 5
+    paginator_class: type = CountedPaginator
+
+    def get_cache_scopes(self) -> List[str]:
+        return [f"author:{self.kwargs.get('username')}", "users"]
 
     def get_queryset(self) -> QuerySet[Post]:
         self.user: User = get_object_or_404(User, username=self.kwargs.get("username"))
-        return Post.objects.filter(author=self.user).order_by("-datePosted")
+        return (
+            Post.objects.for_listing().filter(author=self.user).order_by("-datePosted", "-id")
+        )
+
+    def get_paginator(self, *args: Any, **kwargs: Any) -> CountedPaginator:
+        kwargs["count_key"] = counters.author_key(self.user.pk)
+        return super().get_paginator(*args, **kwargs)
 
     def get_context_data(self, **kwargs) -> Dict[Any, Any]:
         context: Dict[Any, Any] = super().get_context_data(**kwargs)
@@ -50,10 +88,12 @@ class UserPostListView(ListView):
         return context
 
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, DetailView):
     """Shows the details of a spesific post"""
 
+    replica_reads: bool = True  # see blog/replicas.py
     model: type = Post
+    queryset: QuerySet[Post] = Post.objects.select_related("author__profile")
     context_object_name: str = "post"
 
     def get_context_data(self, **kwargs) -> Dict[Any, Any]:
@@ -120,30 +160,91 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         context["title"]: str = "Delete Post"
         return context
 
-class LatestPostsView(ListView):
+class LatestPostsView(ConditionalGetMixin, PageCacheMixin, ListView):
     """Shows the last 4 for post posted"""
 
+    replica_reads: bool = True  # see blog/replicas.py
     model: type = Post
     template_name: str = "blog/latest_posts.html"
     context_object_name: str = "latest_posts"
 
+    def get_cache_scopes(self) -> List[str]:
+        return ["posts", "users"]
+
     def get_queryset(self) -> QuerySet[Post]:
-        return Post.objects.all().order_by("-datePosted")[:4]
+        return Post.objects.for_listing().order_by("-datePosted", "-id")[:4]
 
     def get_context_data(self, **kwargs) -> Dict[Any, Any]:
+        # the query only runs when the recent posts of the process don't have them
+        window: Optional[Tuple[List[Post], int]] = recent.recent.newest(4)
+        if window is not None:
+            kwargs["object_list"] = window[0]
         context: Dict[Any, Any] = super().get_context_data(**kwargs)
         context["title"]: str = "Latest Posts"
         return context
 
 
-class AnnouncementsView(ListView):
-    """Shows the announcements that admins announce"""
+class AnnouncementsView(ConditionalGetMixin, PageCacheMixin, CursorPaginationMixin, ListView):
+    """Shows the announcements that admins announce, newest first a window at a time"""
 
+    replica_reads: bool = True  # see blog/replicas.py
     model: type = Announcement
     template_name: str = "blog/announcements.html"
     context_object_name: str = "announcements"
+    paginate_by: int = announcements.WINDOW
+
+    def get_cache_scopes(self) -> List[str]:
+        return ["announcements", "users"]
+
+    def get_pagination_mode(self) -> str:
+        return "cursor"  # no counter to page by number
+
+    def get_queryset(self) -> QuerySet[Announcement]:
+        return announcements.newest_first()
 
     def get_context_data(self, **kwargs) -> Dict[Any, Any]:
         context: Dict[Any, Any] = super().get_context_data(**kwargs)
+        if not self.request.GET.get(self.cursor_kwarg):
+            announcements.mark_seen(self.request, context["announcements"])
         context["title"]: str = "Announcements"
         return context
+
+
+class PostSearchView(TemplateView):
+    """Shows the posts that match the search ordered by relevance"""
+
+    template_name: str = "blog/search.html"
+    paginate_by: int = 10
+
+    def get_context_data(self, **kwargs) -> Dict[Any, Any]:
+        context: Dict[Any, Any] = super().get_context_data(**kwargs)
+        query: str = self.request.GET.get("q", "").strip()
+        paginator: SearchPaginator = SearchPaginator(query, self.paginate_by)
+        try:
+            page: CursorPage = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor as error:
+            raise Http404(str(error)) from error
+        context["search_query"]: str = query
+        context["paginator"]: SearchPaginator = paginator
+        context["page_obj"]: CursorPage = page
+        context["is_paginated"]: bool = page.has_other_pages()
+        context["posts"]: List[Post] = page.object_list
+        context["title"]: str = f"Search {query}" if query else "Search"
+        return context
+
+
+class RequestStatsView(UserPassesTestMixin, View):
+    """Shows the request totals per url name of this process to the staff"""
+
+    def test_func(self) -> bool:
+        return self.request.user.is_staff
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> JsonResponse:
+        return JsonResponse(
+            {
+                "pid": os.getpid(),
+                "views": instrumentation.totals.snapshot(),
+                # hits, misses and evictions of the process, when the backend counts them
+                "cache": cache.stats() if hasattr(cache, "stats") else None,
+            }
+        )
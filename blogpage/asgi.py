@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogpage.settings')
 
 application = get_asgi_application()
+
+# the apps are loaded now, the recent posts are read before the first request
+from blog import recent  # pylint: disable=wrong-import-position
+
+recent.warm()
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +35,7 @@ ALLOWED_HOSTS = []
 INSTALLED_APPS = [
     'blog.apps.BlogConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.instrumentation.InstrumentationMiddleware',
+    'blog.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,33 +58,152 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'blogpage.urls'
 
+# engine of the read only blog pages: 'django', or 'jinja2' for the ports in
+# blog/jinja2/ (see manage.py bench_templates), the other pages stay on Django
+BLOG_TEMPLATE_ENGINE = os.environ.get('BLOG_TEMPLATE_ENGINE', 'django')
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that times the renders for the Server-Timing header
+        'NAME': 'django',
+        'BACKEND': 'blog.instrumentation.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.announcements',
+            ],
+            # the compiled templates are kept in memory, in DEBUG too the
+            # autoreloader empties it when a template changes
+            'loaders': [
+                (
+                    'django.template.loaders.cached.Loader',
+                    [
+                        'django.template.loaders.filesystem.Loader',
+                        'django.template.loaders.app_directories.Loader',
+                    ],
+                ),
+            ],
+        },
+    },
+    {
+        # Jinja2 that times the renders, finds the templates in <app>/jinja2/
+        'NAME': 'jinja2',
+        'BACKEND': 'blog.instrumentation.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'blog.jinja.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.announcements',
             ],
         },
     },
 ]
+# the first engine that has a template renders it
+if BLOG_TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES.reverse()
 
 WSGI_APPLICATION = 'blogpage.wsgi.application'
 
+# ShardedLRUCache (blog/sharded_cache.py) that counts its hits and misses for
+# the Server-Timing header, see manage.py bench_cache
+CACHES = {
+    'default': {
+        'BACKEND': 'blog.instrumentation.InstrumentedShardedCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('BLOG_CACHE_MAX_ENTRIES', 10000)),
+            'SHARDS': 16,
+        },
+    }
+}
+
+# POSTs allowed per sliding window of seconds on the login and register pages,
+# per client address and per username, the username rule locks the account out
+# while it is full, right password included (see users/ratelimit.py)
+BLOG_AUTH_RATE_LIMITS = {'ip': (20, 60), 'username': (5, 300)}
+# META key of the client address, the header of the proxy (e.g. 'HTTP_X_REAL_IP')
+# when there is one, or every client shares the address of the proxy
+BLOG_CLIENT_IP_HEADER = os.environ.get('BLOG_CLIENT_IP_HEADER', 'REMOTE_ADDR')
+
+# Trusted proxies that append to a list header like X-Forwarded-For, the
+# address is read that many entries from the right, the client writes the left
+BLOG_CLIENT_IP_HOPS = int(os.environ.get('BLOG_CLIENT_IP_HOPS', 1))
+
+# A JSON line per request at INFO, the SQL of the slow requests at WARNING
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('BLOG_REQUEST_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+# manage.py test keeps the request log out of its output, the tests that read
+# it use assertLogs
+if sys.argv[1:2] == ['test']:
+    LOGGING['handlers']['null'] = {'class': 'logging.NullHandler'}
+    LOGGING['loggers']['blog.instrumentation'].update(handlers=['null'], propagate=False)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 with the transaction_mode option of Django 5.1
+        'ENGINE': 'blog.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # atomic blocks wait for the write lock at BEGIN instead of
+            # failing with "database is locked" when they first write
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # seconds a connection is kept for the next requests, 0 closes it
+        # at the end of each request
+        'CONN_MAX_AGE': int(os.environ.get('BLOG_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas of the default database, comma separated SQLite files kept in
+# sync by the replication (or manage.py sync_replicas locally). The read only
+# pages read from them, see blog/replicas.py
+BLOG_REPLICA_DATABASES = os.environ.get('BLOG_REPLICA_DATABASES', '')
+for index, name in enumerate(filter(None, BLOG_REPLICA_DATABASES.split(','))):
+    DATABASES[f'replica{index + 1}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+
+BLOG_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# Seconds a client that wrote reads from the primary only, longer than the
+# lag of the replicas
+BLOG_REPLICA_PIN_SECONDS = int(os.environ.get('BLOG_REPLICA_PIN_SECONDS', 10))
+
+DATABASE_ROUTERS = ['blog.replicas.ReplicaRouter']
+
+# Run on every new SQLite connection by blog/sqlite.py
+BLOG_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers don't block the writer and the other way round
+    'synchronous': 'NORMAL',  # safe with WAL, fsyncs at checkpoints only
+    'busy_timeout': 5000,  # ms a writer waits for the lock before "database is locked"
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative is in KiB, so 64MB of page cache
+    'temp_store': 'MEMORY',
 }
 
 
@@ -120,6 +244,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Where collectstatic writes the bundled, hashed and compressed files, see blog/assets.py
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
 MEDIA_ROOT = os.path.join(BASE_DIR , 'media')
 MEDIA_URL =  '/media/'
 
@@ -129,6 +256,67 @@ LOGIN_URL = 'login'
 
 LOGIN_REDIRECT_URL = 'blog-home'
 
+# "offset" shows page numbers, "cursor" pages on (datePosted, id) without
+# OFFSET or COUNT(*) so deep pages cost the same as the first one
+BLOG_PAGINATION_MODE = os.environ.get('BLOG_PAGINATION_MODE', 'offset')
+
+# Seconds an anonymous page or a post fragment stays cached, saves evict them
+# earlier through the signals in blog/signals.py
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Newest posts each process keeps in memory for the latest posts page and the
+# first page of the post list (blog/recent.py), at least a page and one more
+BLOG_RECENT_POSTS = 10
+
+# Seconds before that window is read again, the writes of the other processes
+# only reach it then (the default cache is per process)
+BLOG_RECENT_POSTS_MAX_AGE = BLOG_PAGE_CACHE_TIMEOUT
+
+# Seconds the feed readers and the CDN may reuse a feed before they revalidate it
+BLOG_FEED_MAX_AGE = 5 * 60
+
+# Requests slower than this log the SQL they ran (blog/instrumentation.py),
+# off unless set: the logins and registrations are slow on purpose (PBKDF2)
+BLOG_SLOW_REQUEST_MS = (
+    int(os.environ['BLOG_SLOW_REQUEST_MS']) if os.environ.get('BLOG_SLOW_REQUEST_MS') else None
+)
+
+# Background threads per process that run the job queue (jobs/queue.py),
+# 0 leaves the jobs to `manage.py run_jobs`
+JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 2))
+
+# Seconds a claimed job may run, a job still running after that was lost with
+# its worker and is claimed again (jobs/queue.py)
+JOBS_LEASE_SECONDS = 10 * 60
+
+# Days the done and failed jobs are kept before the workers delete them
+JOBS_KEEP_DAYS = 7
+
+# Serve the read only blog pages with the native async views, only worth it
+# under ASGI (blogpage.asgi), under WSGI they would run in a new event loop
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS') == '1'
+
+# BLOG_PROFILE=production turns DEBUG off, reads the secrets and hosts from
+# the environment and keeps the database connections open between requests
+BLOG_PROFILE = os.environ.get('BLOG_PROFILE', 'development')
+
+if BLOG_PROFILE == 'production':
+    DEBUG = False
+    # the key above is in the repository, never sign production sessions with it
+    if not os.environ.get('SECRET_KEY'):
+        raise ImproperlyConfigured('Set SECRET_KEY in the environment with BLOG_PROFILE=production')
+    SECRET_KEY = os.environ['SECRET_KEY']
+    ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost').split(',')
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(os.environ.get('BLOG_CONN_MAX_AGE', 600))
+    # run collectstatic first, the templates then load the hashed bundles
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'blog.assets.BundledManifestStorage'},
+    }
+    if os.environ.get('BLOG_SERVE_STATIC', '1') == '1':
+        MIDDLEWARE.insert(0, 'blog.assets.StaticAssetMiddleware')
+
 
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = ''
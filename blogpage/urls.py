@@ -3,17 +3,20 @@ from django.urls import path, include
 from django.contrib.auth.views import LoginView
 
 from users import views as usersView
+from users.ratelimit import rate_limited
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("", include("blog.urls")),
+    path("", include("blog.async_urls" if settings.BLOG_ASYNC_VIEWS else "blog.urls")),
     path(
         "login/",
-        LoginView.as_view(
-            template_name="users/login.html", extra_context={"title": "Login"}
+        rate_limited("login")(
+            LoginView.as_view(
+                template_name="users/login.html", extra_context={"title": "Login"}
+            )
         ),
         name="login",
     ),
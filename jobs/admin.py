@@ -0,0 +1,11 @@
+from typing import Tuple
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display: Tuple[str, ...] = ("id", "name", "status", "attempts", "created", "finished")
+    list_filter: Tuple[str, ...] = ("status", "name")
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field: str = "django.db.models.BigAutoField"
+    name: str = "jobs"
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # the handlers register themselves in the tasks module of each app
+        autodiscover_modules("tasks")
@@ -0,0 +1,27 @@
+"""Runs the queued jobs outside of the web processes"""
+import time
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+from ... import queue
+
+
+class Command(BaseCommand):
+    """manage.py run_jobs"""
+
+    help: str = "Runs the queued jobs, forever or until the queue is empty with --once"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        while True:
+            done: int = queue.run_pending()
+            if done:
+                self.stdout.write(f"Ran {done} jobs")
+            purged: int = queue.purge_if_due()
+            if purged:
+                self.stdout.write(f"Deleted {purged} finished jobs")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
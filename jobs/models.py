@@ -0,0 +1,29 @@
+"""Models"""
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A function call waiting in the database for a worker"""
+
+    QUEUED: str = "queued"
+    RUNNING: str = "running"
+    DONE: str = "done"
+    FAILED: str = "failed"
+    STATUSES: list = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name: models.CharField = models.CharField(max_length=100)
+    payload: models.JSONField = models.JSONField(default=dict)
+    status: models.CharField = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField(default=0)
+    run_after: models.DateTimeField = models.DateTimeField(default=timezone.now)
+    created: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    finished: models.DateTimeField = models.DateTimeField(null=True, blank=True)
+    error: models.TextField = models.TextField(blank=True)
+
+    class Meta:
+        indexes: list = [models.Index(fields=["status", "run_after"], name="job_queue_idx")]
+
+    def __str__(self) -> str:
+        """Sets the display name of this object"""
+        return f"{self.name} ({self.status})"
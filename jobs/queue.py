@@ -0,0 +1,209 @@
+"""A small job queue stored in the database
+
+Handlers are plain functions registered with @job in the tasks module of an
+app. enqueue() stores a Job row and, once the transaction commits, wakes the
+in-process worker threads (settings.JOBS_WORKER_THREADS) so the request that
+enqueued never waits for the work. Jobs left over by a restart, or queued by
+a process without workers, are picked up by `manage.py run_jobs`.
+
+A claimed job holds a lease of settings.JOBS_LEASE_SECONDS, its run_after is
+moved to the end of it. A job still running past its lease was lost with its
+worker (a crash, a deploy), the next claim() takes it again and counts the
+lost run as a failed attempt. The lease must outlast the longest job, one
+running past it is run twice.
+
+Done and failed jobs are kept settings.JOBS_KEEP_DAYS days for the admin,
+the workers and run_jobs delete the older ones at most once an hour.
+"""
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+handlers: Dict[str, Callable[..., Any]] = {}
+
+
+def job(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Registers a function as the handler of the jobs with that name"""
+
+    def register(func: Callable[..., Any]) -> Callable[..., Any]:
+        handlers[name] = func
+        return func
+
+    return register
+
+
+def max_attempts() -> int:
+    return getattr(settings, "JOBS_MAX_ATTEMPTS", 3)
+
+
+def lease_seconds() -> int:
+    return getattr(settings, "JOBS_LEASE_SECONDS", 600)
+
+
+def keep_days() -> int:
+    return getattr(settings, "JOBS_KEEP_DAYS", 7)
+
+
+# seconds between two purges of a process
+PURGE_INTERVAL: float = 60 * 60
+
+
+def enqueue(name: str, **payload: Any) -> Job:
+    """Stores a job and wakes the workers after the current transaction commits"""
+    queued: Job = Job.objects.create(name=name, payload=payload)
+    transaction.on_commit(worker.wake)
+    return queued
+
+
+def claim() -> Optional[Job]:
+    """Marks the oldest due job (queued, or running past its lease) as running
+    and returns it, None if there is none. The status and run_after checks in
+    the UPDATE keep two workers off the same job"""
+    while True:
+        now: datetime = timezone.now()
+        candidate: Optional[Tuple[int, str, datetime]] = (
+            Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING], run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("id", "status", "run_after")
+            .first()
+        )
+        if candidate is None:
+            return None
+        job_id, status, run_after = candidate
+        changes: Dict[str, Any] = {
+            "status": Job.RUNNING,
+            "run_after": now + timedelta(seconds=lease_seconds()),
+        }
+        if status == Job.RUNNING:
+            changes.update(attempts=F("attempts") + 1, error="Lost with its worker (lease expired)")
+        claimed: int = Job.objects.filter(id=job_id, status=status, run_after=run_after).update(
+            **changes
+        )
+        if not claimed:
+            continue
+        found: Job = Job.objects.get(id=job_id)
+        if found.attempts < max_attempts():
+            return found
+        found.status = Job.FAILED
+        found.finished = now
+        found.save(update_fields=["status", "finished"])
+
+
+def run(claimed: Job) -> None:
+    """Runs a claimed job, failed jobs are retried later until max_attempts"""
+    claimed.attempts += 1
+    handler: Optional[Callable[..., Any]] = handlers.get(claimed.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for {claimed.name}")
+        handler(**claimed.payload)
+    except Exception:  # pylint: disable=broad-except
+        claimed.error = traceback.format_exc()
+        logger.exception("Job %s %s failed", claimed.id, claimed.name)
+        if handler is not None and claimed.attempts < max_attempts():
+            claimed.status = Job.QUEUED
+            claimed.run_after = timezone.now() + timedelta(seconds=2**claimed.attempts)
+        else:
+            claimed.status = Job.FAILED
+            claimed.finished = timezone.now()
+    else:
+        claimed.status = Job.DONE
+        claimed.finished = timezone.now()
+        claimed.error = ""
+    claimed.save(update_fields=["status", "attempts", "run_after", "finished", "error"])
+
+
+def run_pending(limit: Optional[int] = None) -> int:
+    """Runs due jobs until there are none left (or limit ran), returns how many ran"""
+    done: int = 0
+    while limit is None or done < limit:
+        claimed: Optional[Job] = claim()
+        if claimed is None:
+            break
+        run(claimed)
+        done += 1
+    return done
+
+
+def purge_finished() -> int:
+    """Deletes the done and failed jobs that finished over keep_days() ago,
+    returns how many"""
+    cutoff: datetime = timezone.now() - timedelta(days=keep_days())
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished__lt=cutoff
+    ).delete()
+    return deleted
+
+
+last_purge: Optional[float] = None
+purge_lock: threading.Lock = threading.Lock()
+
+
+def purge_if_due() -> int:
+    """purge_finished() unless this process ran it in the last PURGE_INTERVAL"""
+    global last_purge  # pylint: disable=global-statement
+    with purge_lock:
+        now: float = time.monotonic()
+        if last_purge is not None and now - last_purge < PURGE_INTERVAL:
+            return 0
+        last_purge = now
+    return purge_finished()
+
+
+class Worker:
+    """Runs the queue on a few background threads of this process"""
+
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.busy: int = 0
+        self.pending: bool = False
+
+    def threads(self) -> int:
+        return getattr(settings, "JOBS_WORKER_THREADS", 2)
+
+    def wake(self) -> None:
+        """Starts a drain on a free thread, a busy one runs the new job otherwise"""
+        if self.threads() <= 0:
+            return
+        with self.lock:
+            self.pending = True
+            if self.busy >= self.threads():
+                return
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.threads(), thread_name_prefix="jobs")
+            self.busy += 1
+        self.executor.submit(self.drain)
+
+    def drain(self) -> None:
+        try:
+            while True:
+                with self.lock:
+                    self.pending = False
+                run_pending()
+                purge_if_due()
+                with self.lock:
+                    # a job enqueued while the last claim() found nothing
+                    if not self.pending:
+                        self.busy -= 1
+                        return
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Job worker crashed")
+            with self.lock:
+                self.busy -= 1
+        finally:
+            connections.close_all()
+
+
+worker: Worker = Worker()
@@ -0,0 +1,97 @@
+# pylint: disable=relative-beyond-top-level
+"""Tests"""
+from datetime import timedelta
+from typing import List
+from django.test import TestCase
+from django.utils import timezone
+from .models import Job
+from .queue import claim, enqueue, handlers, job, purge_finished, run_pending
+
+calls: List[int] = []
+
+
+@job("jobs.tests.record")
+def record(value: int) -> None:
+    calls.append(value)
+
+
+@job("jobs.tests.broken")
+def broken() -> None:
+    raise ValueError("broken")
+
+
+class QueueTest(TestCase):
+    """Tests for the job queue"""
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_job_runs(self) -> None:
+        """Checks a queued job runs once and is marked done"""
+        queued: Job = enqueue("jobs.tests.record", value=7)
+        self.assertEqual(queued.status, Job.QUEUED)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [7])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.DONE)
+        self.assertEqual(queued.attempts, 1)
+        print("test_job_runs is ok")
+
+    def test_job_retried(self) -> None:
+        """Checks a failing job is retried later and fails after the last attempt"""
+        queued: Job = enqueue("jobs.tests.broken")
+        for attempt in range(1, 4):
+            run_pending()
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, attempt)
+            self.assertIn("ValueError", queued.error)
+            # runs the retry now instead of waiting for the backoff
+            Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        self.assertEqual(queued.status, Job.FAILED)
+        self.assertEqual(run_pending(), 0)
+        print("test_job_retried is ok")
+
+    def test_unknown_job(self) -> None:
+        """Checks a job without handler fails at once"""
+        self.assertNotIn("jobs.tests.missing", handlers)
+        queued: Job = enqueue("jobs.tests.missing")
+        run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.FAILED)
+        self.assertEqual(queued.attempts, 1)
+        print("test_unknown_job is ok")
+
+    def test_lost_job_claimed_again(self) -> None:
+        """Checks a job left running by a dead worker is run again once its lease ends"""
+        queued: Job = enqueue("jobs.tests.record", value=3)
+        self.assertEqual(claim().pk, queued.pk)  # the worker dies here
+        self.assertEqual(run_pending(), 0)
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, calls), (Job.DONE, 2, [3]))
+        print("test_lost_job_claimed_again is ok")
+
+    def test_lost_job_fails_after_last_attempt(self) -> None:
+        """Checks a job that keeps killing its worker ends up failed"""
+        queued: Job = enqueue("jobs.tests.record", value=4)
+        Job.objects.filter(pk=queued.pk).update(status=Job.RUNNING, attempts=2)
+        self.assertEqual(run_pending(), 0)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, calls), (Job.FAILED, 3, []))
+        self.assertIn("lease expired", queued.error)
+        print("test_lost_job_fails_after_last_attempt is ok")
+
+    def test_finished_jobs_purged(self) -> None:
+        """Checks only the jobs that finished over JOBS_KEEP_DAYS ago are deleted"""
+        old: Job = enqueue("jobs.tests.record", value=1)
+        recent: Job = enqueue("jobs.tests.record", value=2)
+        waiting: Job = enqueue("jobs.tests.record", value=3)
+        run_pending(limit=2)
+        Job.objects.filter(pk=old.pk).update(finished=timezone.now() - timedelta(days=30))
+        self.assertEqual(purge_finished(), 1)
+        self.assertEqual(
+            set(Job.objects.values_list("pk", flat=True)), {recent.pk, waiting.pk}
+        )
+        print("test_finished_jobs_purged is ok")
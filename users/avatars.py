@@ -0,0 +1,56 @@
+"""Resized copies of the profile pictures
+
+The uploaded file is kept as it is. Its derivatives are stored under
+avatars/<hash of the file>/<size>.webp so a picture is only processed the
+first time its content is seen, whoever uploads it and however often.
+"""
+import hashlib
+from typing import Tuple
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+SIZES: Tuple[int, ...] = (60, 150, 300)
+
+
+def derivative_name(digest: str, size: int) -> str:
+    return f"avatars/{digest}/{size}.webp"
+
+
+def content_hash(file: File) -> str:
+    """Hashes the content of a file in chunks"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def pick_size(size: int) -> int:
+    """The smallest derivative that is at least size pixels wide"""
+    for candidate in SIZES:
+        if candidate >= size:
+            return candidate
+    return SIZES[-1]
+
+
+def build(file: File) -> str:
+    """Writes the missing derivatives of a picture and returns its hash"""
+    with file.open("rb"):
+        digest: str = content_hash(file)
+        missing = [
+            size
+            for size in SIZES
+            if not default_storage.exists(derivative_name(digest, size))
+        ]
+        if missing:
+            file.seek(0)
+            with Image.open(file) as img:
+                img = ImageOps.exif_transpose(img)
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+                for size in missing:
+                    square: Image.Image = ImageOps.fit(img, (size, size), Image.LANCZOS)
+                    output = ContentFile(b"")
+                    square.save(output, "WEBP", quality=80, method=6)
+                    default_storage.save(derivative_name(digest, size), output)
+    return digest
@@ -0,0 +1,19 @@
+"""Builds the resized profile pictures of the profiles that miss them"""
+from typing import Any
+from django.core.management.base import BaseCommand
+from ...models import Profile
+from ...tasks import process_profile_image
+
+
+class Command(BaseCommand):
+    """manage.py build_avatars"""
+
+    help: str = "Builds the resized copies of the profile pictures that have none yet"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        built: int = 0
+        for profile in Profile.objects.filter(image_hash="").only("id", "image").iterator():
+            # a picture shared by many profiles is only processed once, see avatars.py
+            process_profile_image(profile.id, profile.image.name)
+            built += 1
+        self.stdout.write(f"Built the pictures of {built} profiles")
@@ -1,27 +1,58 @@
 """Models"""
-from typing import Tuple
 from factory import Factory, Faker
 from django.db import models
-from PIL import Image
 from django.contrib.auth.models import User
+from jobs.queue import enqueue
+
+DEFAULT_IMAGE: str = "default.png"
 
 
 class Profile(models.Model):
     """Profile for users that they can change their informations"""
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    image = models.ImageField(default="default.png", upload_to="profile_pics")
+    image = models.ImageField(default=DEFAULT_IMAGE, upload_to="profile_pics")
+    # content hash of the image, names its resized copies (see avatars.py)
+    image_hash = models.CharField(max_length=32, blank=True, default="")
 
     def __str__(self) -> str:
         return f"{self.user.username} Profile"
 
+    @classmethod
+    def from_db(cls, db: str, field_names: list, values: list) -> "Profile":
+        instance: Profile = super().from_db(db, field_names, values)
+        # remembers the stored file and hash to tell if a save changes the picture
+        instance._saved_image = instance.__dict__.get("image")
+        instance._saved_hash = instance.__dict__.get("image_hash")
+        return instance
+
+    def image_changed(self) -> bool:
+        """True if the image is not the one loaded from the database"""
+        return getattr(self, "_saved_image", None) != self.image.name
+
+    def image_hash_changed(self) -> bool:
+        """True if the hash, so the resized copies, is not the one loaded from the database"""
+        return getattr(self, "_saved_hash", None) != self.image_hash
+
     def save(self, *args: any, **kwargs: any) -> None:
+        """Saves the profile, the sizes of a new picture are built later by
+        a job (users/tasks.py) so the request never decodes the image"""
+        changed: bool = self.image_changed()
+        if changed:
+            self.image_hash = ""  # the original is served until the job is done
+            if self.image.name == DEFAULT_IMAGE:
+                # every new user shares the default picture, its copies are built once
+                self.image_hash = (
+                    Profile.objects.filter(image=DEFAULT_IMAGE)
+                    .exclude(image_hash="")
+                    .values_list("image_hash", flat=True)
+                    .first()
+                    or ""
+                )
         super(Profile, self).save(*args, **kwargs)
-        img: Image.Image = Image.open(self.image.path)
-        if img.height > 300 or img.width > 300:
-            output_size: Tuple[int, int] = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)
+        self._saved_image, self._saved_hash = self.image.name, self.image_hash
+        if changed and not self.image_hash:
+            enqueue("users.process_profile_image", profile_id=self.pk, image=self.image.name)
 
 
 class UserFactory(Factory):
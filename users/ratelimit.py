@@ -0,0 +1,145 @@
+"""Sliding window rate limits of the login and register POSTs
+
+Checking a password runs PBKDF2 on purpose, so a burst of guesses can keep
+every worker busy hashing. The login and register views are wrapped in
+rate_limited(), which counts the POSTs per client address and per username
+in this process and answers 429 past the limits of
+settings.BLOG_AUTH_RATE_LIMITS, before the session, the user or the
+password are looked at. A POST takes its slots before the view runs, so a
+burst of parallel guesses is limited as well as a sequence of them. A
+successful POST (a redirect) then gives back the slot of its username and
+forgets the attempts before it, so only the failed attempts stay counted.
+
+The username rule is a lockout: once a username has `limit` failed
+attempts in the window, every POST for it is refused, the right password
+too, since the password isn't checked past the limit. Anyone who sends
+that many wrong passwords per window, from any address, can keep a user
+out of the login form for as long as they keep going. That is the price of
+capping the guesses on one account from many addresses; a deployment that
+would rather not pay it drops "username" from settings.BLOG_AUTH_RATE_LIMITS
+and relies on the address rule.
+
+A key keeps the times of its last `limit` hits, a hit is allowed when the
+oldest of them left the window, so the window slides with every request and
+a check costs a dict lookup under a lock.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+# key, limit, window in seconds
+Rule = Tuple[str, int, float]
+
+DEFAULT_LIMITS: Dict[str, Tuple[int, float]] = {"ip": (20, 60), "username": (5, 300)}
+
+
+class SlidingWindowLimiter:
+    """Allows limit hits per window per key, remembers the max_keys keys hit last"""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self.max_keys: int = max_keys
+
+    def hit(self, rules: List[Rule], now: Optional[float] = None) -> float:
+        """Counts a hit on every key unless one of them is over its limit,
+        returns 0 or the seconds until that key allows a hit again"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            wait: float = 0.0
+            for key, limit, window in rules:
+                times: Optional[Deque[float]] = self.hits.get(key)
+                if times is not None and len(times) >= limit and now - times[0] < window:
+                    wait = max(wait, window - (now - times[0]))
+            if wait:
+                return wait
+            for key, limit, _ in rules:
+                times = self.hits.get(key)
+                if times is None or times.maxlen != limit:
+                    times = self.hits[key] = deque(times or (), maxlen=limit)
+                    if len(self.hits) > self.max_keys:
+                        self.hits.popitem(last=False)
+                else:
+                    self.hits.move_to_end(key)
+                times.append(now)
+            return 0.0
+
+    def forget(self, rules: List[Rule]) -> None:
+        with self.lock:
+            for key, _, _ in rules:
+                self.hits.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.hits.clear()
+
+
+limiter: SlidingWindowLimiter = SlidingWindowLimiter()
+
+
+def client_ip(request: HttpRequest) -> str:
+    """Address of the client, from the header of the proxy when there is one.
+    A header like X-Forwarded-For lists the addresses each hop saw, the client
+    writes the first ones as it likes, so this takes the one added by the
+    first of the settings.BLOG_CLIENT_IP_HOPS trusted proxies from the right"""
+    header: str = getattr(settings, "BLOG_CLIENT_IP_HEADER", "REMOTE_ADDR")
+    hops: int = getattr(settings, "BLOG_CLIENT_IP_HOPS", 1)
+    addresses: List[str] = [
+        address.strip() for address in request.META.get(header, "").split(",") if address.strip()
+    ]
+    if not addresses:
+        return "unknown"
+    # fewer addresses than proxies, the first one was still written by a proxy
+    return addresses[-min(hops, len(addresses))]
+
+
+def rules(scope: str, request: HttpRequest) -> Tuple[List[Rule], List[Rule]]:
+    """The rules of the client address, and of the username (forgotten on success)"""
+    limits: Dict[str, Tuple[int, float]] = getattr(
+        settings, "BLOG_AUTH_RATE_LIMITS", DEFAULT_LIMITS
+    )
+    address: List[Rule] = []
+    if "ip" in limits:
+        address.append((f"{scope}:ip:{client_ip(request)}", *limits["ip"]))
+    username: str = request.POST.get("username", "").strip().lower()
+    attempts: List[Rule] = []
+    if username and "username" in limits:
+        attempts.append((f"{scope}:username:{username}", *limits["username"]))
+    return address, attempts
+
+
+def rate_limited(scope: str) -> Callable[[Callable], Callable]:
+    """Limits the POSTs of a view, scope keeps the counts of the views apart"""
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def limited(request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+            if request.method != "POST":
+                return view(request, *args, **kwargs)
+            address, attempts = rules(scope, request)
+            # both slots at once, before the password is hashed; a full username
+            # refuses its right password as well (see the lockout above)
+            wait: float = limiter.hit(address + attempts)
+            if wait:
+                seconds: int = int(wait) + 1
+                response: HttpResponse = HttpResponse(
+                    f"Too many attempts, try again in {seconds} seconds.",
+                    status=429,
+                    content_type="text/plain",
+                )
+                response["Retry-After"] = str(seconds)
+                return response
+            response = view(request, *args, **kwargs)
+            # the forms redirect once the user is logged in or registered
+            if 300 <= response.status_code < 400:
+                limiter.forget(attempts)
+            return response
+
+        return limited
+
+    return decorator
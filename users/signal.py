@@ -14,11 +14,14 @@ from .models import Profile
 
 
 @receiver(post_save, sender=User)
-def save_profile(sender: type, instance: User, **kwargs: Any) -> None:
-    """If there is action in user it comes here
-    if the profile exist updates profile if not creates it"""
+def save_profile(sender: type, instance: User, created: bool, **kwargs: Any) -> None:
+    """Creates the profile of new users and of old ones that miss it,
+    the profile itself is saved by whoever changes it"""
 
-    if hasattr(instance, "profile"):
-        instance.profile.save()
-    else:
+    if created:
         Profile.objects.create(user=instance)
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return  # the login of an user, nothing to check
+    Profile.objects.get_or_create(user=instance)
@@ -0,0 +1,18 @@
+# pylint: disable=relative-beyond-top-level
+"""Background jobs of the users app, run by the jobs queue"""
+from jobs.queue import job
+from . import avatars
+from .models import Profile
+
+
+@job("users.process_profile_image")
+def process_profile_image(profile_id: int, image: str) -> None:
+    """Builds the derivatives of a profile picture, see avatars.py"""
+    profile: Profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None or profile.image.name != image:
+        return  # the profile is gone or got another picture since
+    digest: str = avatars.build(profile.image)
+    if digest == profile.image_hash:
+        return  # a job run again, the pages already show these copies
+    profile.image_hash = digest
+    profile.save(update_fields=["image_hash"])
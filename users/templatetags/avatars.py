@@ -0,0 +1,17 @@
+# pylint: disable=relative-beyond-top-level
+"""Template tags for the profile pictures"""
+from django import template
+from django.core.files.storage import default_storage
+from ..avatars import derivative_name, pick_size
+from ..models import Profile
+
+register: template.Library = template.Library()
+
+
+@register.simple_tag
+def avatar_url(profile: Profile, size: int) -> str:
+    """Url of the smallest resized picture that fills size pixels,
+    the original one while it is not built yet"""
+    if profile.image_hash:
+        return default_storage.url(derivative_name(profile.image_hash, pick_size(size)))
+    return profile.image.url
@@ -1,17 +1,26 @@
 # pylint: disable=relative-beyond-top-level
 """Tests"""
 import os
+import shutil
+import tempfile
 from typing import Any, List
+from unittest import mock
 from faker import Faker
-from django.test import TestCase, Client
+from PIL import Image
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.template import Context, Template
 from django.urls import reverse, resolve
 from django.contrib.auth.views import LoginView
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.http import HttpRequest
+from jobs.models import Job
+from jobs.queue import run_pending
+from blogpage.settings import MEDIA_ROOT
 from .models import Profile, UserFactory
-from . import views
+from . import avatars, views
+from .ratelimit import SlidingWindowLimiter, client_ip, limiter
 
 
 class UserTest(TestCase):
@@ -122,12 +131,18 @@ class ViewTest(TestCase):
 
     def test_view_profile(self) -> None:
         """Tests the profile for updating and creating"""
+        media_root: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        # the upload and the copies its job writes stay out of the real media
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
         self.client.force_login(self.user)
         url: str = reverse("profile")
         response_get: HttpRequest = self.client.get(url)
         self.assertEqual(response_get.status_code, 200)
 
-        file_path: str = os.path.join(settings.MEDIA_ROOT, "test.png")
+        file_path: str = os.path.join(MEDIA_ROOT, "test.png")
         with open(file_path, "rb") as picture:
             image: bytes = SimpleUploadedFile(
                 "test.png", picture.read(), content_type="image/png"
@@ -178,3 +193,225 @@ class ViewTest(TestCase):
         self.assertEqual(response_post.status_code, 302)
         self.assertRedirects(response_post, reverse("blog-home"))
         print("test_view_reset_password is ok")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProfileImageJobTest(TestCase):
+    """Tests the profile pictures are resized by a job, not by the request"""
+
+    def setUp(self) -> None:
+        shutil.copy(os.path.join(MEDIA_ROOT, "default.png"), settings.MEDIA_ROOT)
+        self.user: User = UserFactory.create()
+        self.user.set_password("abc12345")
+        self.user.save()
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, "profile_pics"), exist_ok=True)
+        self.path: str = os.path.join(settings.MEDIA_ROOT, "profile_pics", "big.png")
+        Image.new("RGB", (900, 600)).save(self.path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(settings.MEDIA_ROOT)
+        super().tearDownClass()
+
+    def test_login_skips_image(self) -> None:
+        """Checks a login neither saves the profile nor opens the picture"""
+        with mock.patch("PIL.Image.open") as image_open, mock.patch.object(
+            Profile, "save"
+        ) as profile_save:
+            self.assertTrue(Client().login(username=self.user.username, password="abc12345"))
+        image_open.assert_not_called()
+        profile_save.assert_not_called()
+        print("test_login_skips_image is ok")
+
+    def test_image_resized_by_job(self) -> None:
+        """Checks a new picture is queued without decoding, the job keeps the
+        original and writes the resized copies"""
+        profile: Profile = Profile.objects.get(user=self.user)
+        profile.image = "profile_pics/big.png"
+        with mock.patch("PIL.Image.open") as image_open:
+            profile.save()
+            self.user.save()
+        image_open.assert_not_called()
+        self.assertEqual(profile.image_hash, "")
+        self.assertEqual(
+            render_avatar(profile, 60), f"{settings.MEDIA_URL}profile_pics/big.png"
+        )
+
+        run_pending()
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+        profile.refresh_from_db()
+        with Image.open(self.path) as original:
+            self.assertEqual(original.size, (900, 600))
+        for size in avatars.SIZES:
+            name: str = avatars.derivative_name(profile.image_hash, size)
+            with Image.open(os.path.join(settings.MEDIA_ROOT, name)) as resized:
+                self.assertEqual((resized.format, resized.size), ("WEBP", (size, size)))
+        self.assertEqual(
+            render_avatar(profile, 100),
+            f"{settings.MEDIA_URL}avatars/{profile.image_hash}/150.webp",
+        )
+        print("test_image_resized_by_job is ok")
+
+    def test_same_picture_not_rebuilt(self) -> None:
+        """Checks a picture that was seen before is not decoded again"""
+        other: User = UserFactory.create()
+        other.save()
+        run_pending()
+        profiles: List[Profile] = list(Profile.objects.all())
+        self.assertEqual(profiles[0].image_hash, profiles[1].image_hash)
+        profile: Profile = profiles[0]
+        profile.image = "profile_pics/big.png"
+        profile.save()
+        run_pending()
+        shutil.copy(self.path, os.path.join(settings.MEDIA_ROOT, "profile_pics", "copy.png"))
+        other.profile.image = "profile_pics/copy.png"
+        other.profile.save()
+        with mock.patch("PIL.Image.open") as image_open:
+            run_pending()
+        image_open.assert_not_called()
+        profile.refresh_from_db()
+        other.profile.refresh_from_db()
+        self.assertEqual(profile.image_hash, other.profile.image_hash)
+        print("test_same_picture_not_rebuilt is ok")
+
+    def test_default_picture_not_queued_again(self) -> None:
+        """Checks a new user reuses the built copies of the default picture"""
+        run_pending()
+        built: str = Profile.objects.get(user=self.user).image_hash
+        self.assertNotEqual(built, "")
+        newcomer: User = UserFactory.create()
+        newcomer.save()
+        self.assertEqual(newcomer.profile.image_hash, built)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+        print("test_default_picture_not_queued_again is ok")
+
+
+@override_settings(BLOG_AUTH_RATE_LIMITS={"ip": (4, 60), "username": (2, 300)})
+class RateLimitTest(TestCase):
+    """Tests the rate limits of the login and register POSTs"""
+
+    def setUp(self) -> None:
+        limiter.clear()
+        self.user: User = UserFactory.create()
+        self.user.set_password("abc12345")
+        self.user.save()
+
+    def login(self, username: str, address: str = "10.0.0.1") -> HttpRequest:
+        return self.client.post(
+            reverse("login"),
+            {"username": username, "password": "wrong"},
+            REMOTE_ADDR=address,
+        )
+
+    def test_username_limited(self) -> None:
+        """Checks the guesses on a username stop before any query or hashing"""
+        self.assertEqual(self.login(self.user.username).status_code, 200)
+        self.assertEqual(self.login(self.user.username.upper()).status_code, 200)
+        with self.assertNumQueries(0), mock.patch(
+            "django.contrib.auth.forms.authenticate"
+        ) as authenticate:
+            response: HttpRequest = self.login(self.user.username, "10.0.0.2")
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 300)
+        self.assertEqual(self.login("someone").status_code, 200)
+        self.assertEqual(self.client.get(reverse("login")).status_code, 200)
+        print("test_username_limited is ok")
+
+    def test_address_limited(self) -> None:
+        """Checks an address is limited across usernames and views"""
+        for number in range(3):
+            self.assertEqual(self.login(f"guess{number}").status_code, 200)
+        response: HttpRequest = self.client.post(
+            reverse("register"), {"username": "new"}, REMOTE_ADDR="10.0.0.1"
+        )
+        self.assertEqual(response.status_code, 200)  # its own counts
+        self.assertEqual(self.login("guess3").status_code, 200)
+        self.assertEqual(self.login("guess4").status_code, 429)
+        self.assertEqual(self.login("guess4", "10.0.0.9").status_code, 200)
+        print("test_address_limited is ok")
+
+    @override_settings(BLOG_AUTH_RATE_LIMITS={"username": (2, 300)})
+    def test_success_forgets_failures(self) -> None:
+        """Checks the logins that succeed don't count and clear the failures"""
+        self.assertEqual(self.login(self.user.username).status_code, 200)
+        for _ in range(3):
+            response: HttpRequest = self.client.post(
+                reverse("login"),
+                {"username": self.user.username, "password": "abc12345"},
+                REMOTE_ADDR="10.0.0.1",
+            )
+            self.assertEqual(response.status_code, 302)
+        for _ in range(2):
+            self.assertEqual(self.login(self.user.username).status_code, 200)
+        self.assertEqual(self.login(self.user.username).status_code, 429)
+        print("test_success_forgets_failures is ok")
+
+    @override_settings(BLOG_AUTH_RATE_LIMITS={"username": (2, 300)})
+    def test_full_username_locks_out(self) -> None:
+        """Checks the right password is refused too once the failures fill the window"""
+        for address in ("10.0.0.8", "10.0.0.9"):
+            self.assertEqual(self.login(self.user.username, address).status_code, 200)
+        response: HttpRequest = self.client.post(
+            reverse("login"),
+            {"username": self.user.username, "password": "abc12345"},
+            REMOTE_ADDR="10.0.0.1",
+        )
+        self.assertEqual(response.status_code, 429)
+        print("test_full_username_locks_out is ok")
+
+    @override_settings(BLOG_AUTH_RATE_LIMITS={"username": (1, 300)})
+    def test_parallel_guesses_limited(self) -> None:
+        """Checks a guess sent while another one is hashing already counts"""
+        nested: List[Any] = []
+
+        def hashing(*args: Any, **kwargs: Any) -> None:
+            if not nested:
+                nested.append(self.login(self.user.username, "10.0.0.7"))
+
+        with mock.patch("django.contrib.auth.forms.authenticate", side_effect=hashing):
+            self.assertEqual(self.login(self.user.username).status_code, 200)
+        self.assertEqual(nested[0].status_code, 429)
+        print("test_parallel_guesses_limited is ok")
+
+    @override_settings(
+        BLOG_CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR", BLOG_AUTH_RATE_LIMITS={"ip": (2, 60)}
+    )
+    def test_forwarded_address(self) -> None:
+        """Checks the addresses the client writes in X-Forwarded-For are ignored"""
+        for number in range(3):
+            response: HttpRequest = self.client.post(
+                reverse("login"),
+                {"username": f"guess{number}", "password": "wrong"},
+                HTTP_X_FORWARDED_FOR=f"1.2.3.{number}, 10.0.0.1",
+            )
+        self.assertEqual(response.status_code, 429)
+        request: HttpRequest = RequestFactory().get(
+            "/", HTTP_X_FORWARDED_FOR="1.2.3.4, 10.0.0.1, 10.0.0.2"
+        )
+        self.assertEqual(client_ip(request), "10.0.0.2")
+        with override_settings(BLOG_CLIENT_IP_HOPS=2):
+            self.assertEqual(client_ip(request), "10.0.0.1")
+        with override_settings(BLOG_CLIENT_IP_HOPS=5):
+            self.assertEqual(client_ip(request), "1.2.3.4")
+        print("test_forwarded_address is ok")
+
+    def test_window_slides(self) -> None:
+        """Checks a hit is allowed again once the oldest one left the window"""
+        sliding: SlidingWindowLimiter = SlidingWindowLimiter(max_keys=2)
+        rule: List[Any] = [("key", 2, 10.0)]
+        self.assertEqual(sliding.hit(rule, now=0.0), 0)
+        self.assertEqual(sliding.hit(rule, now=6.0), 0)
+        self.assertEqual(sliding.hit(rule, now=9.0), 1.0)
+        self.assertEqual(sliding.hit(rule, now=10.0), 0)
+        self.assertEqual(sliding.hit(rule, now=12.0), 4.0)
+        sliding.hit([("other", 1, 10.0)], now=12.0)
+        sliding.hit([("third", 1, 10.0)], now=12.0)
+        self.assertEqual(list(sliding.hits), ["other", "third"])
+        print("test_window_slides is ok")
+
+
+def render_avatar(profile: Profile, size: int) -> str:
+    return Template("{% load avatars %}{% avatar_url profile size %}").render(
+        Context({"profile": profile, "size": size})
+    )
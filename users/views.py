@@ -14,8 +14,10 @@ from .forms import (
     ProfileUpdateForm,
     UserUpdateForm,
 )
+from .ratelimit import rate_limited
 
 
+@rate_limited("register")
 def register_user(request: HttpRequest) -> HttpResponse:
     """Registers user"""
     if request.method == "POST":